@@ -0,0 +1,185 @@
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app, g
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app import db
+from engine_profile import is_sqlite
+
+ANALYTICS_BIND = 'analytics'
+
+_refresh_lock = threading.Lock()
+_follow_lock = threading.Lock()  # not _refresh_lock, so a request never waits out a copy
+_opened_inodes = {}  # snapshot path -> inode of the file this process's pool has open
+
+
+def configure_analytics_bind(app):
+    """
+    Adds the read-only 'analytics' bind that charts and reports query, so
+    they never share a connection (or SQLite's lock) with checkout writes.
+
+    ANALYTICS_DATABASE_URI points it at a replica kept up to date elsewhere.
+    Without one, a SQLite primary is copied with the backup API into a
+    snapshot file (ANALYTICS_SNAPSHOT_PATH, default "<database>.analytics")
+    that is opened read-only and refreshed by the background job (or the
+    refresh-analytics command) to stay within ANALYTICS_MAX_STALENESS_SECONDS;
+    requests only ever open the snapshot already on disk. Anything else (in-memory SQLite, a
+    server database without a replica) reads the primary. Call before
+    db.init_app, and init_analytics after it.
+    """
+    app.teardown_appcontext(close_analytics_session)
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    app.config['ANALYTICS_SNAPSHOT'] = False
+
+    replica_uri = os.getenv('ANALYTICS_DATABASE_URI')
+    primary_uri = app.config['SQLALCHEMY_DATABASE_URI']
+    if replica_uri:
+        binds[ANALYTICS_BIND] = replica_uri
+        return
+
+    if not is_sqlite(primary_uri):
+        return
+    primary_url = make_url(primary_uri)
+    if primary_url.database in (None, '', ':memory:'):
+        return
+
+    snapshot_path = os.getenv('ANALYTICS_SNAPSHOT_PATH', f"{primary_url.database}.analytics")
+    binds[ANALYTICS_BIND] = primary_url.set(
+        database=f"file:{snapshot_path}",
+        query={'mode': 'ro', 'uri': 'true'},
+    ).render_as_string(hide_password=False)
+    app.config['ANALYTICS_SNAPSHOT'] = True
+
+
+def init_analytics(app):
+    """
+    Takes the first snapshot, so the read-only bind has a file to open, and
+    takes a new one when the snapshot on disk is from an older schema (the
+    primary has been migrated since), so reports do not query tables it lacks.
+    """
+    if not app.config['ANALYTICS_SNAPSHOT']:
+        return
+    with app.app_context():
+        primary, snapshot = _snapshot_paths()
+        if snapshot_age() == float('inf') or _schema_revision(snapshot) != _schema_revision(primary):
+            refresh_snapshot(max_age=0)
+
+
+def _schema_revision(path):
+    """The alembic revision a database file is at, None when it has none."""
+    try:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        return connection.execute("SELECT version_num FROM alembic_version").fetchone()
+    except sqlite3.Error:
+        return None
+    finally:
+        connection.close()
+
+
+def _snapshot_paths():
+    # Flask-SQLAlchemy has already resolved relative paths against the instance folder
+    primary = db.engines[None].url.database
+    snapshot = db.engines[ANALYTICS_BIND].url.database[len('file:'):]
+    return primary, snapshot
+
+
+def snapshot_age():
+    """Seconds since the analytics snapshot was taken, None when there is no snapshot."""
+    if not current_app.config['ANALYTICS_SNAPSHOT']:
+        return None
+    _, snapshot = _snapshot_paths()
+    try:
+        return time.time() - os.path.getmtime(snapshot)
+    except OSError:
+        return float('inf')
+
+
+def refresh_snapshot(max_age=None):
+    """
+    Copies the primary into the snapshot file if it is older than max_age
+    seconds (default: the staleness bound; 0 forces a copy). The copy is a
+    single read transaction on the primary, which WAL lets run alongside
+    writers; it is written to a temporary file and swapped in, so readers
+    never see a half-written snapshot.
+    Returns True if a new snapshot was taken.
+    """
+    if not current_app.config['ANALYTICS_SNAPSHOT']:
+        return False
+
+    with _refresh_lock:
+        if max_age is None:
+            max_age = current_app.config['ANALYTICS_MAX_STALENESS_SECONDS']
+        if snapshot_age() < max_age:
+            return False
+
+        primary_path, snapshot_path = _snapshot_paths()
+        temp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+        source = sqlite3.connect(primary_path)
+        target = sqlite3.connect(temp_path)
+        try:
+            source.backup(target)
+            # the copy inherits WAL mode, which a read-only connection cannot open without -shm
+            target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+            source.close()
+        os.replace(temp_path, snapshot_path)
+        return True
+
+
+def _follow_snapshot():
+    """
+    Drops this process's pooled connections once the snapshot file has been
+    replaced, by this process or another one: they still have the old,
+    unlinked file open. Returns the stat of the file now being served.
+    """
+    _, snapshot_path = _snapshot_paths()
+    with _follow_lock:
+        stat = os.stat(snapshot_path)
+        if _opened_inodes.get(snapshot_path) != stat.st_ino:
+            db.engines[ANALYTICS_BIND].dispose()
+            _opened_inodes[snapshot_path] = stat.st_ino
+    return stat
+
+
+def analytics_tag():
+    """
+    What identifies the data the analytics bind serves: ('snapshot', file
+    time) for the snapshot on disk; ('primary',) when reports read the primary; None for a replica, whose
+    lag is unknown.
+    """
+    if ANALYTICS_BIND not in db.engines:
+        return ('primary',)
+    if not current_app.config['ANALYTICS_SNAPSHOT']:
+        return None
+    return ('snapshot', _follow_snapshot().st_mtime_ns)
+
+
+def analytics_session():
+    """
+    Read-only session for reporting queries, one per app context. Reads the
+    snapshot as it is on disk; it is never refreshed here. Falls back to the
+    primary when no analytics bind is configured.
+    """
+    if 'analytics_session' not in g:
+        if ANALYTICS_BIND in db.engines:
+            if current_app.config['ANALYTICS_SNAPSHOT']:
+                _follow_snapshot()
+            engine = db.engines[ANALYTICS_BIND]
+        else:
+            engine = db.engine
+        g.analytics_session = Session(bind=engine, autoflush=False)
+    return g.analytics_session
+
+
+def close_analytics_session(exception=None):
+    session = g.pop('analytics_session', None)
+    if session is not None:
+        session.close()
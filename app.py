@@ -6,10 +6,9 @@ from flask_bcrypt import Bcrypt
 from flask_login import LoginManager
 from flask_mail import Mail
 import os
-from sqlalchemy import MetaData,func
+import threading
+from sqlalchemy import MetaData
 from apscheduler.schedulers.background import BackgroundScheduler
-from datetime import datetime, timezone
-import json
 
 load_dotenv()
 
@@ -30,14 +29,40 @@ def create_app():
     
     # set up file upload folder
     app.config['UPLOAD_FOLDER'] = 'static/uploads/'
+
+    # uploads are kept once each under their content hash, up to this size
+    app.config['BLOB_FOLDER'] = os.getenv('BLOB_FOLDER', os.path.join(app.config['UPLOAD_FOLDER'], 'blobs'))
+    app.config['UPLOAD_MAX_BYTES'] = int(os.getenv('UPLOAD_MAX_BYTES', 10 * 1024 * 1024))
+    
+    # how long stock stays held for a customer after reaching delivery details
+    app.config['STOCK_HOLD_MINUTES'] = int(os.getenv('STOCK_HOLD_MINUTES', 10))
+
+    # how old the stock figures served from the cached menu catalog may get
+    app.config['MENU_STOCK_MAX_AGE_SECONDS'] = float(os.getenv('MENU_STOCK_MAX_AGE_SECONDS', 5))
+    
+    # finished orders older than this move to the archive tables, this many per transaction
+    app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', 180))
+    app.config['ARCHIVE_CHUNK_SIZE'] = int(os.getenv('ARCHIVE_CHUNK_SIZE', 500))
     
     # change databse what we use
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URI')
-    
+
+    # engine profile: SQLite pragmas (WAL, busy timeout, mmap, ...) or pool sizing for server databases
+    from engine_profile import engine_options, sqlite_pragmas, configure_engine
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['SQLITE_PRAGMAS'] = sqlite_pragmas()
+
+    # read-only bind for charts and reports; how old its data may get
+    app.config['ANALYTICS_MAX_STALENESS_SECONDS'] = int(os.getenv('ANALYTICS_MAX_STALENESS_SECONDS', 300))
+    from analytics_db import configure_analytics_bind, init_analytics, refresh_snapshot
+    configure_analytics_bind(app)
+
     app.secret_key = os.getenv('SECRET_KEY')
-    
+
     db.init_app(app)
-    migrate = Migrate(app, db)
+    configure_engine(app, db)
+    init_analytics(app)
+    migrate = Migrate(app, db, render_as_batch=True)  # SQLite needs batch mode for ALTER
     bcrypt = Bcrypt(app) # for hasing the password
     
     # login manager
@@ -45,7 +70,37 @@ def create_app():
     login_manager.init_app(app)
     
     # models
-    from models import Customer, Admin, DeliveryAgent,MenuItem, Category, Subcategory
+    from models import Customer, Admin, DeliveryAgent,MenuItem, Category, Subcategory, Order
+
+    # prefixed display form of raw order keys (e.g. 7 -> O007) for query rows in templates
+    app.add_template_filter(Order.format_id, 'order_ref')
+
+    # how long a data version read by this process is trusted before it is read again
+    from data_versions import version_cache
+    version_cache.max_age = float(os.getenv('DATA_VERSION_MAX_AGE_SECONDS', 1))
+    # a customer's cart is written only through their own requests, so its version is trusted for longer
+    version_cache.local_max_age = float(os.getenv('DATA_VERSION_LOCAL_MAX_AGE_SECONDS', 30))
+    version_cache.max_entries = int(os.getenv('DATA_VERSION_MAX_ENTRIES', 10000))
+
+    # ready-to-serve menu payloads, rebuilt when the menu version moves
+    from catalog_cache import MenuCatalog
+    app.extensions['menu_catalog'] = MenuCatalog(stock_max_age=app.config['MENU_STOCK_MAX_AGE_SECONDS'])
+
+    # cart badge figures of recently seen customers, replaced on every cart write
+    from cart_summary import CartSummaries
+    app.extensions['cart_summaries'] = CartSummaries(max_entries=int(os.getenv('CART_SUMMARY_MAX_ENTRIES', 10000)))
+
+    # priced carts of the customers checking out, reused until the cart or the menu changes
+    from pricing import QuoteCache
+    app.extensions['quote_cache'] = QuoteCache(max_entries=int(os.getenv('QUOTE_CACHE_MAX_ENTRIES', 1000)))
+
+    # order status changes pushed to the customers watching them; each open stream holds a worker thread
+    from order_events import OrderEventBus
+    app.config['ORDER_STREAM_HEARTBEAT_SECONDS'] = float(os.getenv('ORDER_STREAM_HEARTBEAT_SECONDS', 15))
+    app.config['ORDER_STREAM_MAX_SECONDS'] = float(os.getenv('ORDER_STREAM_MAX_SECONDS', 300))
+    app.config['ORDER_STREAM_RETRY_MS'] = int(os.getenv('ORDER_STREAM_RETRY_MS', 3000))
+    app.extensions['order_event_bus'] = OrderEventBus(max_streams=int(os.getenv('ORDER_STREAM_MAX_CONNECTIONS', 200)))
+
     @login_manager.user_loader
     def load_user(user_id):
         try:
@@ -54,12 +109,13 @@ def create_app():
             # Return None if the id is not in the expected format
             return None
 
+        # parse_id also accepts the old prefixed form (e.g. "customer:U001")
         if user_type == "customer":
-            return Customer.query.get(id_str)
+            return Customer.query.get(Customer.parse_id(id_str))
         elif user_type == "admin":
-            return Admin.query.get(id_str)
+            return Admin.query.get(Admin.parse_id(id_str))
         elif user_type == "delivery":
-            return DeliveryAgent.query.get(id_str)
+            return DeliveryAgent.query.get(DeliveryAgent.parse_id(id_str))
         return None
 
 
@@ -77,82 +133,167 @@ def create_app():
     app.config['MAIL_PORT'] = os.getenv('MAIL_PORT')
     app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
     app.config['MAIL_PASSWORD'] = os.getenv('MAIL_APP_PASSWORD')
-    app.config['MAIL_USE_TLS'] = True
+    app.config['MAIL_USE_TLS'] = os.getenv('MAIL_USE_TLS', 'true').lower() in ('true', '1', 'yes')  # off for a local debugging server
     app.config['MAIL_USE_SSL'] = False
     mail = Mail(app)
+
+    # mail is queued in the database and sent on a background thread, one SMTP connection per batch
+    from mail_queue import MailSender
+    mail_sender = MailSender(
+        app, mail,
+        batch_size=int(os.getenv('MAIL_QUEUE_BATCH_SIZE', 50)),
+        max_attempts=int(os.getenv('MAIL_QUEUE_MAX_ATTEMPTS', 6)),
+        retry_delay=int(os.getenv('MAIL_QUEUE_RETRY_SECONDS', 30)),
+        poll_seconds=int(os.getenv('MAIL_QUEUE_POLL_SECONDS', 30)),
+    )
+    app.extensions['mail_sender'] = mail_sender
     
     # routes 
     from routes.admin_routes import admin_routes
     from routes.delivery_agent_routes import delivery_agent_routes
     from routes.customer_routes import customer_routes
     from routes.auth_routes import register_routes
+    from routes.inventory_utils import release_expired_holds
+    from routes.archive_utils import archive_orders
+    from routes.schedule_utils import apply_due_rules, apply_due_updates, pending_due_times
+    from data_versions import MENU, bump_version
     
     register_routes(app, db, bcrypt, mail)
     admin_routes(app, db)
     delivery_agent_routes(app, db)
     customer_routes(app, db)
     
-    # Function to apply scheduled updates
-    def apply_scheduled_updates():
+    # uploaded originals and their resized images, served with far-future caching (their names carry their content hash)
+    from blob_store import BlobStore
+    app.extensions['blob_store'] = BlobStore(app.config['BLOB_FOLDER'], max_bytes=app.config['UPLOAD_MAX_BYTES'])
+    app.add_url_rule('/blobs/<digest>', 'blob', lambda digest: app.extensions['blob_store'].send(digest))
+    from image_pipeline import DERIVED_DIR, send_variant
+    app.add_url_rule(f"{app.static_url_path.rstrip('/')}/{DERIVED_DIR}/<path:filename>", 'image_variant', send_variant)
+    
+    # flask CLI commands
+    from commands import register_commands
+    register_commands(app, db)
+    
+    # Apply the scheduled updates that are due by `now` (naive UTC)
+    def apply_scheduled_updates(now):
         with app.app_context():
             try:
-                now = datetime.now(timezone.utc)
-                print(f"Checking updates at {now} UTC")
-
-                pending_items = db.session.query(MenuItem).filter(
-                    MenuItem.scheduled_update_time <= now,
-                    MenuItem.pending_update.isnot(None)
-                ).all()
-                print(f"Found {len(pending_items)} items to update")
-
-                if not pending_items:
-                    all_pending = db.session.query(MenuItem).filter(MenuItem.pending_update.isnot(None)).all()
-                    print(f"All items with pending updates: {len(all_pending)}")
-                    for item in all_pending:
-                        print(f"Excluded item {item.menu_item_id}: scheduled_update_time={item.scheduled_update_time}")
-
-                for item in pending_items:
-                    updates = json.loads(item.pending_update)
-                    print(f"Updating item {item.menu_item_id} with {updates}")
-                    for key, value in updates.items():
-                        if key == "price":
-                            item.price = float(value)
-                        elif key == "stock_available":
-                            item.stock_available = int(value)
-                            item.is_out_of_stock = int(value) == 0
-                        elif key == "discount_percentage":
-                            item.discount_percentage = float(value)
-                        elif key == "is_best_seller":
-                            item.is_best_seller = bool(value)
-                        elif key == "name":
-                            item.name = value
-                        elif key == "description":
-                            item.description = value
-                        elif key == "category_name":
-                            category = db.session.query(Category).filter(func.lower(Category.name) == value.lower()).first()
-                            if category:
-                                item.category_id = category.category_id
-                        elif key == "subcategory_name":
-                            subcategory = db.session.query(Subcategory).filter(func.lower(Subcategory.name) == value.lower()).first()
-                            if subcategory:
-                                item.subcategory_id = subcategory.subcategory_id
-                    item.pending_update = None
-                    item.scheduled_update_time = None
+                updated = apply_due_updates(now)
+                # rules see the item changes due at the same time
+                ruled = apply_due_rules(now)
+                if updated or ruled:
+                    bump_version(MENU)
+                db.session.commit()
+                if updated or ruled:
+                    print(f"Applied scheduled updates to {updated} items and scheduled rules to {ruled} items")
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error applying scheduled updates: {e}")
+                raise  # the update scheduler retries shortly
 
+    # Due times of every pending change, to (re)fill the update scheduler
+    def load_scheduled_update_times():
+        with app.app_context():
+            return pending_due_times()
+
+    # Give the stock of abandoned checkouts back to the menu
+    def release_expired_stock_holds():
+        with app.app_context():
+            try:
+                released = release_expired_holds()
                 db.session.commit()
-                print(f"Applied scheduled updates to {len(pending_items)} items")
+                if released:
+                    print(f"Released {released} expired stock holds")
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error releasing stock holds: {e}")
 
+    # Move cold orders out of the live order tables
+    def archive_cold_orders():
+        with app.app_context():
+            try:
+                archived = archive_orders()
+                if archived:
+                    print(f"Archived {archived} orders")
             except Exception as e:
                 db.session.rollback()
-                print(f"Error applying scheduled updates: {e}")
+                print(f"Error archiving orders: {e}")
+
+    # Keep the analytics snapshot inside its staleness bound without making a request wait for the copy
+    def refresh_analytics_snapshot():
+        with app.app_context():
+            try:
+                refresh_snapshot(max_age=app.config['ANALYTICS_MAX_STALENESS_SECONDS'] / 2)
+            except Exception as e:
+                print(f"Error refreshing analytics snapshot: {e}")
+
+    # Only one process of the deployment (the lease holder) runs the jobs below
+    from job_leader import JobLeader
+    leader = JobLeader(
+        app,
+        lease_seconds=int(os.getenv('JOB_LEASE_SECONDS', 15)),
+        wake_poll_seconds=float(os.getenv('JOB_WAKE_POLL_SECONDS', 1)),
+    )
+    app.extensions['job_leader'] = leader
 
     # Initialize and start the scheduler
     scheduler = BackgroundScheduler()
-    scheduler.add_job(apply_scheduled_updates, 'interval', minutes=1)
-    scheduler.start()
+    scheduler.add_job(leader.leader_only(release_expired_stock_holds), 'interval', minutes=1)
+    scheduler.add_job(leader.leader_only(archive_cold_orders), 'interval', hours=1)
+    if app.config['ANALYTICS_SNAPSHOT']:
+        scheduler.add_job(leader.leader_only(refresh_analytics_snapshot), 'interval',
+                          seconds=max(app.config['ANALYTICS_MAX_STALENESS_SECONDS'] // 2, 1))
+    app.extensions['job_scheduler'] = scheduler
 
-    # Ensure scheduler shuts down when app exits
-    import atexit
-    atexit.register(lambda: scheduler.shutdown())
-    
-    return app
\ No newline at end of file
+    # Scheduled menu updates are applied as they fall due rather than polled for
+    from update_scheduler import DueTimeScheduler
+    update_scheduler = DueTimeScheduler(
+        load_scheduled_update_times,
+        leader.leader_only(apply_scheduled_updates),
+        resync_seconds=int(os.getenv('SCHEDULER_RESYNC_SECONDS', 300)),
+    )
+    app.extensions['menu_update_scheduler'] = update_scheduler
+
+    # a new leader catches up on everything due, and hears about changes scheduled elsewhere
+    leader.on_elected.append(update_scheduler.resync_now)
+    leader.on_wake.append(update_scheduler.schedule)
+
+    # The threads are started by the process that serves requests (after any fork or reloader),
+    # never by flask CLI commands such as db upgrade, which only build the app
+    @app.before_request
+    def start_background_once():
+        start_background(app)
+
+    return app
+
+
+_background_lock = threading.Lock()
+
+
+def start_background(app):
+    """
+    Starts the app's background machinery once: the job leader, the job and
+    menu update schedulers and the mail sender, and stops them at exit.
+    """
+    if app.extensions.get('background_started'):
+        return
+    with _background_lock:
+        if app.extensions.get('background_started'):
+            return
+        app.extensions['background_started'] = True
+
+        scheduler = app.extensions['job_scheduler']
+        update_scheduler = app.extensions['menu_update_scheduler']
+        leader = app.extensions['job_leader']
+        mail_sender = app.extensions['mail_sender']
+        scheduler.start()
+        update_scheduler.start()
+        leader.start()
+        mail_sender.start()
+
+        # Ensure scheduler shuts down when app exits
+        import atexit
+        atexit.register(lambda: scheduler.shutdown())
+        atexit.register(update_scheduler.stop)
+        atexit.register(leader.stop)
+        atexit.register(mail_sender.stop)
@@ -0,0 +1,111 @@
+"""
+Schedules a happy-hour discount for every item in a category, once as a
+single scheduled rule and once the old way (one /update_item call per
+item), and compares request count, time spent scheduling and the
+statements it takes to apply.
+
+    python benchmarks/bench_bulk_rules.py [items]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{db_file}'
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from sqlalchemy import event, insert
+
+from app import create_app, db, start_background
+from models import Admin, Category, MenuItem, ScheduledChange, ScheduledRule, Subcategory
+
+
+def seed(items):
+    db.session.add(Admin(username='bench', email='bench@example.com', password='x', phone=1))
+    category = Category(name='Happy Hour')
+    db.session.add(category)
+    db.session.flush()
+    subcategory = Subcategory(name='Drinks', category_id=category.category_id)
+    db.session.add(subcategory)
+    db.session.flush()
+    db.session.execute(insert(MenuItem), [{
+        'menu_item_id': i + 1,
+        'name': f'Item {i}', 'description': 'bench', 'price': 100 + i % 50, 'image_url': '',
+        'category_id': category.category_id, 'subcategory_id': subcategory.subcategory_id,
+        'nutrient_value': 'N/A', 'calorie_count': 0, 'stock_available': 10,
+        'is_best_seller': False, 'is_out_of_stock': False, 'discount_percentage': 0,
+    } for i in range(items)])
+    db.session.commit()
+
+
+def wait_applied(app, model):
+    while True:
+        with app.app_context():
+            if not db.session.query(model).filter(model.status == 'Pending').count():
+                return
+        time.sleep(0.01)
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        app.extensions['job_leader'].renew()  # the lease table did not exist when the app started
+        start_background(app)  # as the first request to a server would
+        seed(items)
+        statements = {'count': 0}
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements['count'] += 1
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = 'admin:1'
+
+    due_at = datetime.now(timezone.utc) + timedelta(seconds=2)
+    started = time.perf_counter()
+    for i in range(items):
+        client.post('/update_item', json={
+            'menu_item_id': MenuItem.format_id(i + 1), 'discount_percentage': 20,
+            'scheduled_update_time': due_at.isoformat(),
+        })
+    per_item = time.perf_counter() - started
+    scheduling_statements = statements['count']
+    time.sleep(max((due_at - datetime.now(timezone.utc)).total_seconds(), 0))
+    statements['count'] = 0
+    wait_applied(app, ScheduledChange)
+    per_item_apply = statements['count']
+
+    due_at = datetime.now(timezone.utc) + timedelta(seconds=2)
+    statements['count'] = 0
+    started = time.perf_counter()
+    response = client.post('/api/admin/scheduled_rules', json={
+        'field': 'discount_percentage', 'operation': 'set', 'value': 30,
+        'category_name': 'happy hour', 'due_at': due_at.isoformat(),
+    }).get_json()
+    rule = time.perf_counter() - started
+    rule_statements = statements['count']
+    time.sleep(max((due_at - datetime.now(timezone.utc)).total_seconds(), 0))
+    statements['count'] = 0
+    wait_applied(app, ScheduledRule)
+    rule_apply = statements['count']
+
+    with app.app_context():
+        wrong = db.session.query(MenuItem).filter(MenuItem.discount_percentage != 30).count()
+
+    print(f"{items}-item discount")
+    print(f"    per item: {items} requests, {per_item * 1000:.0f} ms, "
+          f"{scheduling_statements} statements to schedule, ~{per_item_apply} to apply")
+    print(f"    one rule: 1 request, {rule * 1000:.0f} ms, "
+          f"{rule_statements} statements to schedule, ~{rule_apply} to apply ({response['matches']} items matched)")
+    assert wrong == 0, f"{wrong} items missed the rule"
+
+
+if __name__ == '__main__':
+    main()
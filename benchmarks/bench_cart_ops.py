@@ -0,0 +1,127 @@
+"""
+Changes one line of a cart with a PATCH of that line alone, reporting
+latency, request bytes and statements per change; the request stays the
+same size however many lines the cart has (the pages used to POST the
+whole cart back, which deleted and re-inserted every line). Then has
+several clients add the same item at once and checks that none of the
+additions is lost.
+
+    python benchmarks/bench_cart_ops.py [changes] [lines] [clients]
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{db_file}'
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from sqlalchemy import event, func, insert, select
+
+from app import create_app, db
+from models import Cart, Category, Customer, MenuItem, Subcategory
+
+
+def seed(lines, clients):
+    db.session.add_all([
+        Customer(username=f'diner{i}', email=f'diner{i}@example.com', password='x', phone=i + 1)
+        for i in range(clients)
+    ])
+    category = Category(name='Mains')
+    db.session.add(category)
+    db.session.flush()
+    subcategory = Subcategory(name='Curries', category_id=category.category_id)
+    db.session.add(subcategory)
+    db.session.flush()
+    db.session.execute(insert(MenuItem), [{
+        'menu_item_id': i + 1,
+        'name': f'Item {i}', 'description': 'bench', 'price': 100 + i, 'image_url': '',
+        'category_id': category.category_id, 'subcategory_id': subcategory.subcategory_id,
+        'nutrient_value': 'N/A', 'calorie_count': 0, 'stock_available': 10,
+        'is_best_seller': False, 'is_out_of_stock': False, 'discount_percentage': 0,
+    } for i in range(lines)])
+    db.session.add_all([Cart(customer_id=1, menu_item_id=i + 1, quantity=1) for i in range(lines)])
+    db.session.commit()
+
+
+def client_for(app, customer_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = f'customer:{customer_id}'
+    return client
+
+
+def run(client, changes, make_request, statements):
+    size = 0
+    statements['count'] = 0
+    started = time.perf_counter()
+    for i in range(changes):
+        method, body = make_request(i)
+        size += len(body)
+        response = client.open('/api/cart', method=method, data=body, content_type='application/json')
+        assert response.status_code == 200, response.get_json()
+    elapsed = time.perf_counter() - started
+    return elapsed / changes * 1000, size / changes, statements['count'] / changes
+
+
+def main():
+    changes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    clients = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    app = create_app()
+    statements = {'count': 0}
+    with app.app_context():
+        db.create_all()
+        seed(lines, clients)
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements['count'] += 1
+
+    client = client_for(app, 1)
+    cart = client.get('/api/cart').get_json()['data']
+
+    def patch_line(i):
+        return 'PATCH', json.dumps({'op': 'set', 'menu_item_id': cart[0]['menu_item_id'], 'quantity': 1 + i % 5})
+
+    print(f"{changes} changes to one line of a {lines}-line cart; statements include the login user lookup")
+    ms, size, queries = run(client, changes, patch_line, statements)
+    print(f"    PATCH one line: {ms:.2f} ms, {size:.0f} request bytes, {queries:.1f} statements")
+
+    # every client adds the same item to customer 1's cart at once, as double taps and two tabs do
+    adds = 25
+    item = MenuItem.format_id(lines)
+    with app.app_context():
+        before = db.session.execute(
+            select(Cart.quantity).where(Cart.customer_id == 1, Cart.menu_item_id == lines)
+        ).scalar()
+    errors = []
+
+    def add_many():
+        tab = client_for(app, 1)
+        for _ in range(adds):
+            response = tab.patch('/api/cart', json={'op': 'add', 'menu_item_id': item})
+            if response.status_code != 200:
+                errors.append(response.get_json())
+
+    threads = [threading.Thread(target=add_many) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with app.app_context():
+        quantity, rows = db.session.execute(
+            select(func.sum(Cart.quantity), func.count())
+            .where(Cart.customer_id == 1, Cart.menu_item_id == lines)
+        ).one()
+    print(f"{clients} clients x {adds} concurrent adds of {item}: quantity {before} -> {quantity} "
+          f"in {rows} line(s), {len(errors)} failed requests")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Renders the pages that show the cart badge and reports latency and
+statements per render, then shows where the badge figures come from: once
+summed per render as get_the_cart_count used to, once from the cart
+summary cache. Also checks that the badge follows cart writes, price
+changes and writes made behind this process's back.
+
+    python benchmarks/bench_cart_summary.py [renders] [lines]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{db_file}'
+os.environ.setdefault('SECRET_KEY', 'bench')
+os.environ.setdefault('DATA_VERSION_LOCAL_MAX_AGE_SECONDS', '2')
+
+from sqlalchemy import event, func, insert, update
+
+from app import create_app, db
+from cart_summary import cart_summaries, cart_summary
+from data_versions import MENU, bump_version, cart_key, version_cache
+from models import Cart, Category, Customer, MenuItem, Subcategory
+
+PAGES = ['/', '/user/profile', '/show_menu']
+
+
+def seed(lines):
+    db.session.add(Customer(username='diner', email='diner@example.com', password='x', phone=1))
+    category = Category(name='Mains')
+    db.session.add(category)
+    db.session.flush()
+    subcategory = Subcategory(name='Curries', category_id=category.category_id)
+    db.session.add(subcategory)
+    db.session.flush()
+    db.session.execute(insert(MenuItem), [{
+        'menu_item_id': i + 1,
+        'name': f'Item {i}', 'description': 'bench', 'price': 100, 'image_url': '',
+        'category_id': category.category_id, 'subcategory_id': subcategory.subcategory_id,
+        'nutrient_value': 'N/A', 'calorie_count': 0, 'stock_available': 10,
+        'is_best_seller': False, 'is_out_of_stock': False, 'discount_percentage': 0,
+    } for i in range(lines)])
+    db.session.add_all([Cart(customer_id=1, menu_item_id=i + 1, quantity=2) for i in range(lines)])
+    db.session.commit()
+
+
+def old_cart_count():
+    return db.session.query(func.sum(Cart.quantity)).filter(Cart.customer_id == 1).scalar() or 0
+
+
+def time_calls(call, renders, statements):
+    statements['count'] = 0
+    started = time.perf_counter()
+    for _ in range(renders):
+        call()
+    elapsed = time.perf_counter() - started
+    return elapsed / renders * 1000, statements['count'] / renders
+
+
+def main():
+    renders = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    app = create_app()
+    statements = {'count': 0}
+    with app.app_context():
+        db.create_all()
+        seed(lines)
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements['count'] += 1
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = 'customer:1'
+
+    print(f"{renders} renders, {lines}-line cart; statements include the login user lookup")
+    for page in PAGES:
+        ms, queries = time_calls(lambda: client.get(page), renders, statements)
+        print(f"    {page}: {ms:.2f} ms, {queries:.2f} statements")
+
+    with app.app_context():
+        for name, call in (('SUM per render', old_cart_count), ('cart summary', lambda: cart_summary(1))):
+            ms, queries = time_calls(call, renders, statements)
+            print(f"    badge from {name}: {ms * 1000:.1f} us, {queries:.3f} statements")
+        print(f"    cache: {cart_summaries().stats()}")
+
+    def badge():
+        with app.app_context():
+            return cart_summary(1)
+
+    expected = lines * 2
+    assert badge()['item_count'] == expected
+    client.patch('/api/cart', json={'op': 'increment', 'menu_item_id': 'MI001', 'quantity': 3})
+    assert badge()['item_count'] == expected + 3, badge()
+    print(f"    after PATCH +3: {badge()}")
+
+    with app.app_context():  # a price change moves the menu version, and the subtotal with it
+        db.session.execute(update(MenuItem).where(MenuItem.menu_item_id == 1).values(price=200))
+        bump_version(MENU)
+        db.session.commit()
+    assert badge()['subtotal'] == (expected + 3) * 100 + 5 * 100, badge()
+    print(f"    after a price change: {badge()}")
+
+    # another process empties the cart; this one learns of it once its copy of the cart version is local_max_age old
+    with sqlite3.connect(db_file) as other:
+        other.execute("DELETE FROM cart WHERE customer_id = 1")
+        other.execute("UPDATE data_version SET version = version + 1 WHERE name = ?", (cart_key(1),))
+    time.sleep(version_cache.local_max_age)
+    assert badge()['item_count'] == 0, badge()
+    print(f"    after another process emptied the cart: {badge()}")
+
+
+if __name__ == '__main__':
+    main()
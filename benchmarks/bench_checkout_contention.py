@@ -0,0 +1,104 @@
+"""
+Flash-sale stress test: several hundred customers check out the same
+best-seller at once. Asserts the item is never oversold and reports
+throughput. Half of the customers go through /delivery_details first so
+checkout consumes their stock hold.
+
+    python benchmarks/bench_checkout_contention.py [customers] [stock] [threads]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{db_file}'
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from sqlalchemy import func
+
+from app import create_app, db
+from models import Cart, Category, Customer, MenuItem, OrderItem, StockReservation, Subcategory
+
+
+def seed(customers, stock):
+    category = Category(name='Bench')
+    db.session.add(category)
+    db.session.flush()
+    subcategory = Subcategory(name='Bench', category_id=category.category_id)
+    db.session.add(subcategory)
+    db.session.flush()
+    item = MenuItem(name='Best Seller', description='bench', price=100, image_url='',
+                    category_id=category.category_id, subcategory_id=subcategory.subcategory_id,
+                    nutrient_value='N/A', calorie_count=0, is_best_seller=True, stock_available=stock)
+    db.session.add(item)
+    people = [Customer(username=f'c{i}', email=f'c{i}@example.com', phone=i + 1, password='x')
+              for i in range(customers)]
+    db.session.add_all(people)
+    db.session.flush()
+    db.session.add_all([Cart(customer_id=person.customer_id, menu_item_id=item.menu_item_id, quantity=1)
+                        for person in people])
+    db.session.commit()
+    return item.menu_item_id, [person.customer_id for person in people]
+
+
+def main():
+    customers = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    stock = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        item_id, customer_ids = seed(customers, stock)
+
+    payload = {'delivery_details': {'street': 'S', 'city': 'C', 'state': 'ST', 'pincode': '1'}}
+    results = Counter()
+    lock = threading.Lock()
+    start_gate = threading.Barrier(threads)
+
+    def checkout(batch):
+        client = app.test_client()
+        start_gate.wait()
+        for index, customer_id in batch:
+            with client.session_transaction() as session:
+                session['_user_id'] = f'customer:{customer_id}'
+            if index % 2 == 0:
+                client.get('/delivery_details')
+            response = client.post('/api/orders', json=payload)
+            with lock:
+                results[response.status_code] += 1
+
+    batches = [[] for _ in range(threads)]
+    for index, customer_id in enumerate(customer_ids):
+        batches[index % threads].append((index, customer_id))
+    workers = [threading.Thread(target=checkout, args=(batch,)) for batch in batches]
+
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        remaining = db.session.query(MenuItem.stock_available).filter_by(menu_item_id=item_id).scalar()
+        sold = db.session.query(func.coalesce(func.sum(OrderItem.quantity), 0)).scalar()
+        held = db.session.query(func.coalesce(func.sum(StockReservation.quantity), 0)).scalar()
+
+    print(f"{customers} checkouts on {threads} threads in {elapsed:.2f}s "
+          f"({customers / elapsed:.1f} checkouts/sec)")
+    print(f"responses: {dict(sorted(results.items()))}")
+    print(f"stock {stock}: sold {sold}, held {held}, remaining {remaining}")
+
+    assert remaining >= 0, "stock went negative"
+    assert sold + held + remaining == stock, "stock does not add up"
+    assert sold == results[201], "orders placed do not match units sold"
+    assert sold <= stock, "oversold"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Polls the read APIs the dashboards and customer pages refetch, once
+re-downloading the body every time and once revalidating with
+If-None-Match, and reports latency, bytes and queries per poll.
+
+    python benchmarks/bench_conditional_get.py [polls] [items]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{db_file}'
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from sqlalchemy import event, insert
+
+from analytics_db import refresh_snapshot
+from app import create_app, db
+from models import Admin, Cart, Category, Customer, MenuItem, Order, Subcategory
+
+CUSTOMER_URLS = ['/api/menu_items', '/api/cart', '/api/order_status/O001']
+ADMIN_URLS = ['/api/admin/summary', '/api/admin/order_status_chart']
+
+
+def seed(items):
+    db.session.add(Admin(username='bench', email='bench@example.com', password='x', phone=1))
+    db.session.add(Customer(username='diner', email='diner@example.com', password='x', phone=2))
+    category = Category(name='Mains')
+    db.session.add(category)
+    db.session.flush()
+    subcategory = Subcategory(name='Curries', category_id=category.category_id)
+    db.session.add(subcategory)
+    db.session.flush()
+    db.session.execute(insert(MenuItem), [{
+        'menu_item_id': i + 1,
+        'name': f'Item {i}', 'description': 'bench', 'price': 100 + i % 50, 'image_url': '',
+        'category_id': category.category_id, 'subcategory_id': subcategory.subcategory_id,
+        'nutrient_value': 'N/A', 'calorie_count': 0, 'stock_available': 10,
+        'is_best_seller': False, 'is_out_of_stock': False, 'discount_percentage': 0,
+    } for i in range(items)])
+    db.session.add_all([Cart(customer_id=1, menu_item_id=i + 1, quantity=1) for i in range(5)])
+    db.session.add_all([Order(customer_id=1, total_price=100, subtotal=42.37, discount=0, tax=7.63, delivery_charge=50,
+                               delivery_location='x', delivery_status='Pending')
+                        for _ in range(2000)])
+    db.session.commit()
+    refresh_snapshot(max_age=0)
+
+
+def poll(client, url, polls, revalidate, statements):
+    etag = client.get(url).headers.get('ETag')
+    headers = {'If-None-Match': etag} if revalidate and etag else {}
+    size = 0
+    statements['count'] = 0
+    started = time.perf_counter()
+    for _ in range(polls):
+        response = client.get(url, headers=headers)
+        size += len(response.data)
+    elapsed = time.perf_counter() - started
+    return elapsed / polls * 1000, size / polls, statements['count'] / polls, response.status_code
+
+
+def main():
+    polls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    items = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    app = create_app()
+    statements = {'count': 0}
+    with app.app_context():
+        db.create_all()
+        seed(items)
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements['count'] += 1
+
+    customer = app.test_client()
+    with customer.session_transaction() as session:
+        session['_user_id'] = 'customer:1'
+    admin = app.test_client()
+    with admin.session_transaction() as session:
+        session['_user_id'] = 'admin:1'
+
+    print(f"{polls} polls per endpoint ({items} menu items); queries include the login user lookup")
+    for client, urls in ((customer, CUSTOMER_URLS), (admin, ADMIN_URLS)):
+        for url in urls:
+            full = poll(client, url, polls, False, statements)
+            cond = poll(client, url, polls, True, statements)
+            print(f"    {url}")
+            print(f"        full body: {full[0]:.2f} ms, {full[1]:.0f} bytes, {full[2]:.1f} queries")
+            print(f"        revalidate: {cond[0]:.2f} ms, {cond[1]:.0f} bytes, {cond[2]:.1f} queries ({cond[3]})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Runs a local SMTP sink that takes connect_ms to accept each connection (a
+slow relay's TCP + TLS handshake) and compares /forget_password sending
+its mail inline, as it used to, with queueing it for the background
+sender. Then checks that mail queued while the relay is down goes out
+once it comes back.
+
+    python benchmarks/bench_mail_queue.py [requests] [connect_ms]
+"""
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, connect_delay, port=0):
+        super().__init__(('127.0.0.1', port), SMTPHandler)
+        self.connect_delay = connect_delay
+        self.connections = 0
+        self.messages = 0
+        self.lock = threading.Lock()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line + b"\r\n")
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        time.sleep(self.server.connect_delay)
+        self.reply(b"220 sink ESMTP")
+        while line := self.rfile.readline():
+            command = line[:4].upper()
+            if command == b"EHLO":
+                self.reply(b"250 sink")
+            elif command == b"DATA":
+                self.reply(b"354 go ahead")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.messages += 1
+                self.reply(b"250 queued")
+            elif command == b"QUIT":
+                self.reply(b"221 bye")
+                return
+            else:
+                self.reply(b"250 ok")
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    connect_ms = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    sink = SMTPSink(connect_ms / 1000)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    port = sink.server_address[1]
+
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ.setdefault('SECRET_KEY', 'bench')
+    os.environ.update(MAIL_SERVER='127.0.0.1', MAIL_PORT=str(port), MAIL_USE_TLS='false',
+                      MAIL_USERNAME='eats@example.com', MAIL_QUEUE_RETRY_SECONDS='1')
+
+    from flask_mail import Message
+
+    from app import create_app, db
+    from mail_queue import queue_counts
+    from models import Customer
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(Customer(username='diner', email='diner@example.com', password='x', phone=2))
+        db.session.commit()
+    client = app.test_client()
+    sender = app.extensions['mail_sender']
+    mail = app.extensions['mail']
+
+    # before: each request opened its own connection and sent inline
+    started = time.perf_counter()
+    with app.app_context():
+        for _ in range(min(requests, 10)):
+            with mail.connect() as connection:
+                connection.send(Message('Password Reset Request', sender='eats@example.com',
+                                        recipients=['diner@example.com'], body='...'))
+    inline = (time.perf_counter() - started) / min(requests, 10)
+
+    sink.connections = sink.messages = 0
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        request_started = time.perf_counter()
+        response = client.post('/forget_password', data={'email': 'diner@example.com'})
+        latencies.append(time.perf_counter() - request_started)
+        assert response.get_json()['success'], response.get_data()
+    while sink.messages < requests and time.perf_counter() - started < 60:
+        time.sleep(0.01)
+    drained = time.perf_counter() - started
+    latencies.sort()
+
+    print(f"{requests} /forget_password requests, relay takes {connect_ms} ms to accept a connection")
+    print(f"    sent inline: {inline * 1000:.0f} ms per request, one connection each")
+    print(f"    queued: request p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+    print(f"    all {sink.messages} delivered {drained:.2f}s after the first request "
+          f"over {sink.connections} SMTP connections")
+
+    # relay down: the mail waits in the queue and goes out after the retry delay
+    sink.shutdown()
+    sink.server_close()
+    client.post('/forget_password', data={'email': 'diner@example.com'})
+    time.sleep(0.5)
+    with app.app_context():
+        waiting = queue_counts()
+    revived = SMTPSink(0, port)
+    threading.Thread(target=revived.serve_forever, daemon=True).start()
+    deadline = time.perf_counter() + 10
+    while revived.messages < 1 and time.perf_counter() < deadline:
+        sender.wake()
+        time.sleep(0.2)
+    with app.app_context():
+        print(f"    relay down: queue {waiting}; after it came back: {queue_counts()}")
+    assert revived.messages == 1, "queued mail was not retried"
+
+
+if __name__ == '__main__':
+    main()
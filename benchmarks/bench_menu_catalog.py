@@ -0,0 +1,95 @@
+"""
+Serves /api/menu_items repeatedly with an admin edit every so often and
+reports the catalog cache hit ratio, rebuild time and request latency,
+next to the cost of building the payload on every request.
+
+    python benchmarks/bench_menu_catalog.py [items] [requests] [edit_every]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{db_file}'
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from flask import jsonify
+from sqlalchemy import insert
+
+from app import create_app, db
+from catalog_cache import _customer_view, _load_items
+from models import Admin, Category, Customer, MenuItem, Subcategory
+
+
+def seed(items):
+    db.session.add(Admin(username='bench', email='bench@example.com', password='x', phone=1))
+    db.session.add(Customer(username='diner', email='diner@example.com', password='x', phone=2))
+    category = Category(name='Mains')
+    db.session.add(category)
+    db.session.flush()
+    subcategory = Subcategory(name='Curries', category_id=category.category_id)
+    db.session.add(subcategory)
+    db.session.flush()
+    db.session.execute(insert(MenuItem), [{
+        'menu_item_id': i + 1,
+        'name': f'Item {i}', 'description': 'A generous description of the dish ' * 3, 'price': 100 + i % 50,
+        'image_url': f'https://example.com/{i}.png',
+        'category_id': category.category_id, 'subcategory_id': subcategory.subcategory_id,
+        'nutrient_value': 'N/A', 'calorie_count': 0, 'stock_available': 10,
+        'is_best_seller': i % 5 == 0, 'is_out_of_stock': False, 'discount_percentage': 0,
+    } for i in range(items)])
+    db.session.commit()
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    edit_every = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed(items)
+
+    # building the payload on every request, as the route did before
+    with app.test_request_context():
+        started = time.perf_counter()
+        for _ in range(50):
+            jsonify(_customer_view(_load_items())).get_data()
+        uncached = (time.perf_counter() - started) / 50
+
+    customer = app.test_client()
+    with customer.session_transaction() as session:
+        session['_user_id'] = 'customer:1'
+    admin = app.test_client()
+    with admin.session_transaction() as session:
+        session['_user_id'] = 'admin:1'
+
+    latencies = []
+    for i in range(requests):
+        if i and i % edit_every == 0:
+            admin.post('/update_item', json={'menu_item_id': 'MI001', 'price': 100 + i % 7})
+        started = time.perf_counter()
+        response = customer.get('/api/menu_items')
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200
+
+    with app.app_context():
+        price = float(db.session.get(MenuItem, 1).price)
+    served = next(item for item in customer.get('/api/menu_items').get_json()['data'] if item['menu_item_id'] == 'MI001')
+    assert served['price'] == price, "catalog served a stale price after an edit"
+
+    stats = admin.get('/api/admin/catalog_cache').get_json()['data']
+    latencies.sort()
+    print(f"{items} items, {requests} requests, an edit every {edit_every}")
+    print(f"    payload built per request: {uncached * 1000:.2f} ms")
+    print(f"    hit ratio {stats['hit_ratio']:.3f} ({stats['hits']} hits, {stats['rebuilds']} rebuilds, "
+          f"{stats['stock_refreshes']} stock refreshes), last rebuild {stats['last_rebuild_ms']} ms")
+    print(f"    request latency p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
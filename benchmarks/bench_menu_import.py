@@ -0,0 +1,95 @@
+"""
+Imports a generated menu through the bulk importer, imports it again (all
+updates), streams it back out, and compares against adding items one
+/add_item post at a time.
+
+    python benchmarks/bench_menu_import.py [items] [add_item_sample]
+"""
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{db_file}'
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from app import create_app, db
+from models import Admin, Category, MenuItem, Subcategory
+from routes.menu_io import MENU_FIELDS
+
+
+def seed():
+    db.session.add(Admin(username='bench', email='bench@example.com', password='x', phone=1))
+    for i in range(10):
+        category = Category(name=f'Category {i}')
+        db.session.add(category)
+        db.session.flush()
+        for j in range(5):
+            db.session.add(Subcategory(name=f'Sub {i}-{j}', category_id=category.category_id))
+    db.session.commit()
+
+
+def menu_csv(items, price_offset=0):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=MENU_FIELDS)
+    writer.writeheader()
+    for i in range(items):
+        writer.writerow({
+            'name': f'Item {i}', 'description': 'bench', 'price': 100 + i % 50 + price_offset,
+            'category_name': f'Category {i % 10}', 'subcategory_name': f'Sub {i % 10}-{i % 5}',
+            'nutrient_value': 'N/A', 'calorie_count': 200, 'discount_percentage': 0, 'image_url': '',
+            'is_best_seller': i % 7 == 0, 'stock_available': 50,
+        })
+    # two broken rows to exercise the per-row errors
+    writer.writerow({'name': 'Broken price', 'description': 'x', 'price': 'abc',
+                     'category_name': 'Category 0', 'subcategory_name': 'Sub 0-0'})
+    writer.writerow({'name': 'Unknown category', 'description': 'x', 'price': 1,
+                     'category_name': 'Nope', 'subcategory_name': 'Sub 0-0'})
+    return buffer.getvalue().encode()
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    sample = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = 'admin:1'
+
+    for label, offset in (('insert', 0), ('update', 5)):
+        started = time.perf_counter()
+        result = client.post('/api/admin/menu/import', data={
+            'file': (io.BytesIO(menu_csv(items, offset)), 'menu.csv'),
+        }).get_json()
+        elapsed = time.perf_counter() - started
+        print(f"bulk import ({label}): {items} rows in {elapsed:.2f}s "
+              f"({result['inserted']} inserted, {result['updated']} updated, {len(result['errors'])} rejected)")
+
+    started = time.perf_counter()
+    response = client.get('/api/admin/menu/export?format=csv', buffered=False)
+    lines = sum(chunk.count(b'\n') for chunk in response.response)
+    print(f"streamed export: {lines - 1} rows in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    for i in range(sample):
+        client.post('/add_item', data={
+            'item_name': f'Single {i}', 'description': 'bench', 'price': '100',
+            'category': 'Category 0', 'subcategory': 'Sub 0-0',
+        })
+    per_item = (time.perf_counter() - started) / sample
+    print(f"/add_item: {per_item * 1000:.1f} ms per item, ~{per_item * items:.1f}s for {items} items")
+
+    with app.app_context():
+        assert db.session.query(MenuItem).count() == items + sample
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Searches /api/menu_items with a mix of text queries and filters and reports
+request latency and response size, next to downloading the whole menu and
+filtering it in the browser as show_menu.js did before.
+
+    python benchmarks/bench_menu_search.py [items] [requests]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{db_file}'
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from sqlalchemy import insert
+
+from app import create_app, db
+from models import Category, Customer, MenuItem, Subcategory
+
+WORDS = ['paneer', 'chicken', 'masala', 'tikka', 'butter', 'garlic', 'naan', 'biryani', 'dal', 'spicy',
+         'creamy', 'tandoori', 'mango', 'lassi', 'soup', 'salad', 'kulfi', 'roti', 'korma', 'saag']
+QUERIES = [
+    {'q': 'paneer'}, {'q': 'chicken tik'}, {'q': 'garlic naan'}, {'category': 'veg', 'sort': 'price_asc'},
+    {'subcategory': 'main course', 'min_price': '150', 'max_price': '250'}, {'best_seller': 'true', 'sort': 'discount'},
+    {'q': 'spicy', 'max_calories': '400'}, {'q': 'mango', 'category': 'veg', 'min_discount': '5'},
+]
+
+
+def seed(items):
+    db.session.add(Customer(username='diner', email='diner@example.com', password='x', phone=2))
+    subcategory_ids = []
+    for name in ('Veg', 'Non-Veg'):
+        category = Category(name=name)
+        db.session.add(category)
+        db.session.flush()
+        for sub in ('Starter', 'Main Course', 'Bread', 'Beverage'):
+            subcategory = Subcategory(name=sub, category_id=category.category_id)
+            db.session.add(subcategory)
+            db.session.flush()
+            subcategory_ids.append((category.category_id, subcategory.subcategory_id))
+    rng = random.Random(7)
+    rows = []
+    for i in range(items):
+        category_id, subcategory_id = rng.choice(subcategory_ids)
+        rows.append({
+            'menu_item_id': i + 1,
+            'name': ' '.join(rng.sample(WORDS, 2)).title() + f' {i}',
+            'description': ' '.join(rng.choices(WORDS, k=12)), 'price': rng.randint(50, 400),
+            'image_url': f'https://example.com/{i}.png',
+            'category_id': category_id, 'subcategory_id': subcategory_id,
+            'nutrient_value': 'N/A', 'calorie_count': rng.randint(100, 900), 'stock_available': 10,
+            'is_best_seller': i % 9 == 0, 'is_out_of_stock': False, 'discount_percentage': rng.choice([0, 0, 5, 10, 20]),
+        })
+    db.session.execute(insert(MenuItem), rows)
+    db.session.commit()
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 800
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed(items)
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = 'customer:1'
+
+    full = client.get('/api/menu_items')
+    full_bytes = len(full.get_data())
+
+    latencies, sizes, pages = [], [], 0
+    for i in range(requests):
+        params = dict(QUERIES[i % len(QUERIES)], limit='24')
+        started = time.perf_counter()
+        response = client.get('/api/menu_items', query_string=params)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.get_data()
+        body = response.get_json()
+        sizes.append(len(response.get_data()))
+        pages += 1
+        cursor = body['next_cursor']
+        seen = {item['menu_item_id'] for item in body['data']}
+        while cursor and i < len(QUERIES):  # walk every page once per query, checking none repeats
+            body = client.get('/api/menu_items', query_string=dict(params, cursor=cursor)).get_json()
+            ids = {item['menu_item_id'] for item in body['data']}
+            assert not ids & seen, "a cursor page repeated items"
+            seen |= ids
+            cursor = body['next_cursor']
+        if i < len(QUERIES):
+            assert len(seen) == body['total'], "the pages did not add up to the total"
+
+    first = client.get('/api/menu_items', query_string={'q': 'paneer'})
+    again = client.get('/api/menu_items', query_string={'q': 'paneer'}, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304, "an unchanged search was not answered with 304"
+    latencies.sort()
+    sizes.sort()
+    print(f"{items} items, {requests} searches (first page of 24)")
+    print(f"    whole menu download: {full_bytes / 1024:.1f} KiB, {items} items rendered and filtered in the browser")
+    print(f"    search response: median {sizes[len(sizes) // 2] / 1024:.1f} KiB, max {sizes[-1] / 1024:.1f} KiB")
+    print(f"    search latency p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
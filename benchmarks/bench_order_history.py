@@ -0,0 +1,167 @@
+"""
+Times /api/orders/history for customers with short and long histories,
+part of each archived, against loading the whole history as the endpoint
+used to. Then walks every page of the longest history and checks that
+each order comes back exactly once, newest first, including orders that
+share a created_at.
+
+    python benchmarks/bench_order_history.py [requests]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{db_file}'
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from sqlalchemy import event, insert, select
+
+from app import create_app, db
+from menu_search import encode_cursor
+from models import Category, Customer, MenuItem, Order, OrderItem, Subcategory, order_item_archive, orders_archive
+
+HISTORY_SIZES = (10, 1000, 20000)
+ARCHIVED_SHARE = 0.3
+ITEMS_PER_ORDER = 3
+
+
+def seed():
+    db.session.add_all([
+        Customer(username=f'diner{i}', email=f'diner{i}@example.com', password='x', phone=i + 1)
+        for i in range(len(HISTORY_SIZES))
+    ])
+    category = Category(name='Mains')
+    db.session.add(category)
+    db.session.flush()
+    subcategory = Subcategory(name='Curries', category_id=category.category_id)
+    db.session.add(subcategory)
+    db.session.flush()
+    db.session.execute(insert(MenuItem), [{
+        'menu_item_id': i + 1,
+        'name': f'Item {i}', 'description': 'bench', 'price': 100, 'image_url': '',
+        'category_id': category.category_id, 'subcategory_id': subcategory.subcategory_id,
+        'nutrient_value': 'N/A', 'calorie_count': 0, 'stock_available': 10,
+        'is_best_seller': False, 'is_out_of_stock': False, 'discount_percentage': 0,
+    } for i in range(50)])
+
+    order_id = item_id = 0
+    start = datetime(2024, 1, 1)
+    for customer, size in enumerate(HISTORY_SIZES, start=1):
+        archived = int(size * ARCHIVED_SHARE)
+        live_orders, archived_orders, live_items, archived_items = [], [], [], []
+        for n in range(size):
+            order_id += 1
+            order = {
+                'order_id': order_id, 'customer_id': customer, 'delivery_status': 'Delivered',
+                'total_price': 404, 'subtotal': 300, 'discount': 0, 'tax': 54, 'delivery_charge': 50,
+                'delivery_location': 'x',
+                'created_at': start + timedelta(minutes=n // 2),  # two orders a minute, so created_at ties
+            }
+            items = [{
+                'order_item_id': item_id + k + 1, 'order_id': order_id,
+                'menu_item_id': (order_id + k) % 50 + 1, 'quantity': 1 + k, 'price': 100,
+            } for k in range(ITEMS_PER_ORDER)]
+            item_id += ITEMS_PER_ORDER
+            (archived_orders if n < archived else live_orders).append(order)
+            (archived_items if n < archived else live_items).extend(items)
+        for table, rows in ((Order.__table__, live_orders), (orders_archive, archived_orders),
+                            (OrderItem.__table__, live_items), (order_item_archive, archived_items)):
+            if rows:
+                db.session.execute(insert(table), rows)
+    db.session.commit()
+
+
+def old_history(customer_id):
+    """The endpoint as it was: every order, and the items of every order."""
+    from routes.archive_utils import all_order_items, all_orders
+    history = all_orders()
+    orders = (
+        db.session.query(history)
+        .filter(history.c.customer_id == customer_id)
+        .order_by(history.c.created_at.desc())
+        .all()
+    )
+    items = all_order_items()
+    return (
+        db.session.query(items.c.order_id, MenuItem.name, MenuItem.image_url)
+        .join(MenuItem, items.c.menu_item_id == MenuItem.menu_item_id)
+        .filter(items.c.order_id.in_([order.order_id for order in orders]))
+        .order_by(items.c.order_item_id)
+        .all()
+    )
+
+
+def client_for(app, customer_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = f'customer:{customer_id}'
+    return client
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    app = create_app()
+    statements = {'count': 0}
+    with app.app_context():
+        db.create_all()
+        seed()
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements['count'] += 1
+
+    print(f"{requests} requests each; {ARCHIVED_SHARE:.0%} of every history archived, {ITEMS_PER_ORDER} items per order")
+    for customer, size in enumerate(HISTORY_SIZES, start=1):
+        client = client_for(app, customer)
+        url = '/api/orders/history?summary=1'
+        # a page near the end of the history, which an offset would make the slowest
+        with app.app_context():
+            oldest = sorted(
+                tuple(row) for table in (Order.__table__, orders_archive)
+                for row in db.session.execute(
+                    select(table.c.created_at, table.c.order_id).where(table.c.customer_id == customer)
+                    .order_by(table.c.created_at, table.c.order_id).limit(21)
+                )
+            )[min(20, size - 1)]
+        deep_cursor = encode_cursor([oldest[0].isoformat(), oldest[1]])
+        for name, page_url in (('first page', url), ('near the end', f'{url}&cursor={deep_cursor}')):
+            statements['count'] = 0
+            started = time.perf_counter()
+            for _ in range(requests):
+                response = client.get(page_url)
+            elapsed = time.perf_counter() - started
+            assert response.status_code == 200, response.get_json()
+            print(f"    {size:>6} orders, {name}: {elapsed / requests * 1000:7.2f} ms, "
+                  f"{statements['count'] / requests:.1f} statements, {len(response.data)} bytes")
+        with app.app_context():
+            started = time.perf_counter()
+            for _ in range(max(requests // 10, 1)):
+                old_history(customer)
+            elapsed = time.perf_counter() - started
+        print(f"    {size:>6} orders, whole history (before): {elapsed / max(requests // 10, 1) * 1000:7.2f} ms")
+
+    # every page of the longest history, in the smallest pages the endpoint allows to make the most boundaries
+    customer = len(HISTORY_SIZES)
+    client = client_for(app, customer)
+    seen, cursor, pages = [], None, 0
+    while True:
+        response = client.get('/api/orders/history?limit=7' + (f'&cursor={cursor}' if cursor else '')).get_json()
+        seen.extend((order['date'], Order.parse_id(order['order_id'])) for order in response['orders'])
+        pages += 1
+        cursor = response['next_cursor']
+        if not cursor:
+            break
+    assert len(seen) == HISTORY_SIZES[-1] == len(set(seen)), (len(seen), len(set(seen)))
+    assert seen == sorted(seen, reverse=True)
+    print(f"walked {pages} pages: all {len(seen)} orders once each, newest first")
+    assert client.get('/api/orders/history?cursor=nonsense').status_code == 400
+    assert client.get('/api/orders/history?limit=0').status_code == 400
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Holds many idle order status streams open against a threaded server in
+this process and reports what each one costs the worker: threads, memory
+and database statements per second, against the polling it replaces.
+Then pushes a status change to every stream and times the fan-out, checks
+the heartbeats, a reconnect with Last-Event-ID, and that a stream past the
+cap is refused with 503.
+
+    python benchmarks/bench_order_stream.py [connections]
+"""
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{db_file}'
+os.environ.setdefault('SECRET_KEY', 'bench')
+os.environ.setdefault('ORDER_STREAM_HEARTBEAT_SECONDS', '1')
+
+from sqlalchemy import event, insert
+from werkzeug.serving import make_server
+
+from app import create_app, db
+from models import Customer, Order
+from order_events import record_status_change
+
+IDLE_SECONDS = 5
+POLL_SECONDS = 5  # how often the confirmation page polled
+
+
+def seed(orders):
+    db.session.add(Customer(username='diner', email='diner@example.com', password='x', phone=1))
+    db.session.flush()
+    db.session.execute(insert(Order), [{
+        'order_id': i + 1, 'customer_id': 1, 'delivery_status': 'Preparing',
+        'total_price': 404, 'subtotal': 300, 'discount': 0, 'tax': 54, 'delivery_charge': 50,
+        'delivery_location': 'x',
+    } for i in range(orders)])
+    db.session.commit()
+
+
+def rss_kb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+
+
+class Stream:
+    """One browser's connection to /api/order_status/<id>/events, read on a thread of its own."""
+
+    def __init__(self, port, cookie, order_id, last_event_id=None):
+        self.sock = socket.create_connection(('127.0.0.1', port))
+        headers = [f"GET /api/order_status/O{order_id:03d}/events HTTP/1.1", "Host: localhost",
+                   f"Cookie: session={cookie}", "Accept: text/event-stream"]
+        if last_event_id is not None:
+            headers.append(f"Last-Event-ID: {last_event_id}")
+        self.sock.sendall(("\r\n".join(headers) + "\r\n\r\n").encode())
+        self.data = b''
+        self.received = {}  # number of events read -> when
+        self.closed = threading.Event()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        while True:
+            try:
+                chunk = self.sock.recv(65536)
+            except OSError:
+                chunk = b''
+            if not chunk:
+                self.closed.set()
+                return
+            self.data += chunk
+            self.received.setdefault(self.data.count(b'\n\n'), time.perf_counter())
+
+    def wait_for(self, text, timeout=10):
+        deadline = time.monotonic() + timeout
+        while text.encode() not in self.data:
+            if time.monotonic() > deadline:
+                raise AssertionError(f"no {text!r} in {self.data[-300:]!r}")
+            time.sleep(0.005)
+
+    def arrived(self, text):
+        """When the chunk that holds text arrived."""
+        index = self.data.index(text.encode())
+        return self.received[self.data[:index].count(b'\n\n') + 1]
+
+    def close(self):
+        self.sock.close()
+
+
+def main():
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    os.environ['ORDER_STREAM_MAX_CONNECTIONS'] = str(connections)
+    app = create_app()
+    bus = app.extensions['order_event_bus']
+    statements = {'count': 0}
+    with app.app_context():
+        db.create_all()
+        seed(connections + 1)
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements['count'] += 1
+
+    cookie = app.session_interface.get_signing_serializer(app).dumps({'_user_id': 'customer:1', '_fresh': True})
+    client = app.test_client()
+    client.set_cookie('session', cookie)
+
+    # what a poll cost
+    statements['count'] = 0
+    started = time.perf_counter()
+    for order_id in range(1, connections + 1):
+        assert client.get(f'/api/order_status/O{order_id:03d}').status_code == 200
+    poll_ms = (time.perf_counter() - started) / connections * 1000
+    poll_statements = statements['count'] / connections
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    threads_before, rss_before = threading.active_count(), rss_kb()
+    statements['count'] = 0
+    streams = [Stream(port, cookie, order_id) for order_id in range(1, connections + 1)]
+    for stream in streams:
+        stream.wait_for('"delivery_status": "Preparing"')
+    open_statements = statements['count']
+    threads_open, rss_open = threading.active_count(), rss_kb()
+    # the reader threads belong to the benchmark's clients, not the server
+    server_threads = threads_open - threads_before - connections
+
+    statements['count'] = 0
+    time.sleep(IDLE_SECONDS)
+    idle_statements = statements['count']
+    heartbeats = min(stream.data.count(b': heartbeat') for stream in streams)
+    assert heartbeats >= IDLE_SECONDS - 2, heartbeats
+
+    print(f"{connections} idle streams, heartbeat every {app.config['ORDER_STREAM_HEARTBEAT_SECONDS']:g} s")
+    print(f"    server threads: {server_threads} ({server_threads / connections:.2f} per stream)")
+    print(f"    memory: {(rss_open - rss_before) / 1024:.1f} MiB, {(rss_open - rss_before) / connections:.1f} KiB per stream "
+          f"(includes the client reader threads)")
+    print(f"    opening: {open_statements / connections:.1f} statements per stream")
+    print(f"    idle: {idle_statements / IDLE_SECONDS:.1f} statements/s for all of them, "
+          f"at least {heartbeats} heartbeats each in {IDLE_SECONDS} s")
+    print(f"    polling instead: {connections / POLL_SECONDS:.0f} requests/s, {poll_ms:.2f} ms and "
+          f"{poll_statements:.1f} statements each = {connections / POLL_SECONDS * poll_statements:.0f} statements/s")
+    print(f"    bus: {bus.stats()}")
+
+    # past the cap the page is told to poll instead
+    refused = client.get(f'/api/order_status/O{connections + 1:03d}/events')
+    assert refused.status_code == 503 and refused.headers['Retry-After'], refused.status_code
+    print(f"    stream {connections + 1}: {refused.status_code} {refused.get_json()['error']}")
+
+    # one commit changes every order; time until each stream has it
+    with app.app_context():
+        for order in Order.query.filter(Order.order_id <= connections):
+            order.delivery_status = 'Accepted'
+            record_status_change(order)
+        committed = time.perf_counter()
+        db.session.commit()
+    for stream in streams:
+        stream.wait_for('"delivery_status": "Accepted"')
+    delays = sorted((stream.arrived('"delivery_status": "Accepted"') - committed) * 1000 for stream in streams)
+    print(f"    fan-out of {connections} changes: median {delays[len(delays) // 2]:.2f} ms, "
+          f"slowest {delays[-1]:.2f} ms after the commit")
+
+    # a browser that lost the stream after Accepted reconnects and misses nothing
+    with app.app_context():
+        order = db.session.get(Order, 1)
+        for status in ('Picked Up', 'Out for Delivery', 'Delivered'):
+            order.delivery_status = status
+            record_status_change(order)
+            db.session.commit()
+    first = streams[0]
+    first.wait_for('event: end')
+    first.closed.wait(5)
+    accepted_id = int(first.data.split(b'"Accepted"')[0].rsplit(b'id: ', 1)[1].split(b'\n')[0])
+    for stream in streams:
+        stream.close()
+    resumed = Stream(port, cookie, 1, last_event_id=accepted_id)
+    resumed.wait_for('event: end')
+    replayed = [line for line in resumed.data.split(b'\n') if line.startswith(b'data: {"order_id"')]
+    assert b'Accepted' not in resumed.data and len(replayed) == 4, resumed.data  # 3 changes, then the end
+    assert b'"Picked Up"' in replayed[0] and b'"Delivered"' in replayed[2]
+    print(f"    reconnect after event {accepted_id}: {len(replayed) - 1} missed changes replayed, then the end")
+    resumed.close()
+
+    # streams whose browser went away are let go once a heartbeat fails to send
+    deadline = time.monotonic() + app.config['ORDER_STREAM_HEARTBEAT_SECONDS'] * 5
+    while bus.stats()['streams'] and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert bus.stats()['streams'] == 0, bus.stats()
+    print(f"    after the browsers left: {bus.stats()}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
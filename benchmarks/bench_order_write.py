@@ -0,0 +1,83 @@
+"""
+Orders/sec through POST /api/orders for 1, 10 and 50 item carts.
+
+Runs against a throwaway SQLite file, refills the cart outside the timed
+section and also counts the SQL statements each checkout sends.
+
+    python benchmarks/bench_order_write.py [orders_per_size]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{db_file}'
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from sqlalchemy import event
+
+from app import create_app, db
+from models import Cart, Category, Customer, MenuItem, Subcategory
+
+CART_SIZES = (1, 10, 50)
+
+
+def seed():
+    category = Category(name='Bench')
+    db.session.add(category)
+    db.session.flush()
+    subcategory = Subcategory(name='Bench', category_id=category.category_id)
+    db.session.add(subcategory)
+    db.session.flush()
+    items = [
+        MenuItem(name=f'Item {i}', description='bench', price=100, image_url='',
+                 category_id=category.category_id, subcategory_id=subcategory.subcategory_id,
+                 nutrient_value='N/A', calorie_count=0, stock_available=10 ** 7)
+        for i in range(max(CART_SIZES))
+    ]
+    customer = Customer(username='bench', email='bench@example.com', phone=1, password='x')
+    db.session.add_all(items + [customer])
+    db.session.commit()
+    return customer.customer_id, [item.menu_item_id for item in items]
+
+
+def main():
+    orders_per_size = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        customer_id, item_ids = seed()
+
+        counter = {'active': False, 'statements': 0}
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count_statement(*args):
+            if counter['active']:
+                counter['statements'] += 1
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = f'customer:{customer_id}'
+        payload = {'delivery_details': {'street': 'S', 'city': 'C', 'state': 'ST', 'pincode': '1'}}
+
+        for size in CART_SIZES:
+            elapsed = 0.0
+            counter['statements'] = 0
+            for _ in range(orders_per_size):
+                db.session.add_all([Cart(customer_id=customer_id, menu_item_id=item_id, quantity=1)
+                                    for item_id in item_ids[:size]])
+                db.session.commit()
+                counter['active'] = True
+                start = time.perf_counter()
+                response = client.post('/api/orders', json=payload)
+                elapsed += time.perf_counter() - start
+                counter['active'] = False
+                assert response.status_code == 201, response.get_data(as_text=True)
+            print(f"{size:>3} items: {orders_per_size / elapsed:8.1f} orders/sec, "
+                  f"{counter['statements'] / orders_per_size:5.1f} statements/order")
+
+
+if __name__ == '__main__':
+    main()
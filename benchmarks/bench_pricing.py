@@ -0,0 +1,138 @@
+"""
+Walks customers through the checkout funnel (order page, delivery details,
+place order) and reports statements and latency per step, with the quote
+priced once and reused between the steps. Then checks the Decimal
+breakdown stored on the order, and that a price change between the
+delivery page and checkout is refused rather than charged.
+
+    python benchmarks/bench_pricing.py [customers] [lines]
+"""
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{db_file}'
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from sqlalchemy import event, insert, update
+
+from app import create_app, db
+from data_versions import MENU, bump_version
+from models import Cart, Category, Customer, MenuItem, Order, Subcategory
+from pricing import quote_cache
+
+# prices that float arithmetic gets wrong in the last paisa
+PRICES = [Decimal('33.33'), Decimal('19.99'), Decimal('0.10'), Decimal('149.95')]
+DISCOUNTS = [Decimal('15'), Decimal('0'), Decimal('12.5'), Decimal('7')]
+STEPS = (('GET /order', 'get', '/order'), ('GET /delivery_details', 'get', '/delivery_details'))
+DELIVERY = {'street': 'S', 'city': 'C', 'state': 'ST', 'pincode': '1'}
+
+
+def seed(customers, lines):
+    db.session.add_all([
+        Customer(username=f'diner{i}', email=f'diner{i}@example.com', password='x', phone=i + 1)
+        for i in range(customers + 1)
+    ])
+    category = Category(name='Mains')
+    db.session.add(category)
+    db.session.flush()
+    subcategory = Subcategory(name='Curries', category_id=category.category_id)
+    db.session.add(subcategory)
+    db.session.flush()
+    db.session.execute(insert(MenuItem), [{
+        'menu_item_id': i + 1,
+        'name': f'Item {i}', 'description': 'bench', 'price': PRICES[i % len(PRICES)], 'image_url': '',
+        'category_id': category.category_id, 'subcategory_id': subcategory.subcategory_id,
+        'nutrient_value': 'N/A', 'calorie_count': 0, 'stock_available': 100000,
+        'is_best_seller': False, 'is_out_of_stock': False, 'discount_percentage': DISCOUNTS[i % len(DISCOUNTS)],
+    } for i in range(lines)])
+    db.session.add_all([
+        Cart(customer_id=customer + 1, menu_item_id=i + 1, quantity=3)
+        for customer in range(customers + 1) for i in range(lines)
+    ])
+    db.session.commit()
+
+
+def expected_breakdown(lines):
+    subtotal = discount = Decimal('0')
+    for i in range(lines):
+        amount = PRICES[i % len(PRICES)] * 3
+        subtotal += amount
+        discount += (amount * DISCOUNTS[i % len(DISCOUNTS)] / 100).quantize(Decimal('0.01'), 'ROUND_HALF_UP')
+    tax = ((subtotal - discount) * Decimal('0.18')).quantize(Decimal('0.01'), 'ROUND_HALF_UP')
+    return subtotal, discount, tax, subtotal - discount + tax + 50
+
+
+def main():
+    customers = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    app = create_app()
+    statements = {'count': 0}
+    with app.app_context():
+        db.create_all()
+        seed(customers, lines)
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements['count'] += 1
+
+    totals = {name: [0.0, 0] for name, _, _ in STEPS}
+    totals['POST /api/orders'] = [0.0, 0]
+    order_ids = []
+    for customer in range(1, customers + 1):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = f'customer:{customer}'
+        for name, method, url in STEPS:
+            statements['count'] = 0
+            started = time.perf_counter()
+            response = getattr(client, method)(url)
+            totals[name][0] += time.perf_counter() - started
+            totals[name][1] += statements['count']
+            assert response.status_code == 200, (name, response.status_code)
+        statements['count'] = 0
+        started = time.perf_counter()
+        response = client.post('/api/orders', json={'total': float(expected_breakdown(lines)[3]), 'delivery_details': DELIVERY})
+        totals['POST /api/orders'][0] += time.perf_counter() - started
+        totals['POST /api/orders'][1] += statements['count']
+        assert response.status_code == 201, response.get_json()
+        order_ids.append(Order.parse_id(response.get_json()['order_id']))
+
+    print(f"{customers} customers, {lines}-line carts; statements include the login user lookup")
+    for name, (seconds, count) in totals.items():
+        print(f"    {name}: {seconds / customers * 1000:.2f} ms, {count / customers:.1f} statements")
+    with app.app_context():
+        print(f"    quotes: {quote_cache().stats()}")
+        order = db.session.get(Order, order_ids[0])
+        stored = (order.subtotal, order.discount, order.tax, order.total_price)
+    assert stored == expected_breakdown(lines), (stored, expected_breakdown(lines))
+    print(f"    stored breakdown: subtotal {stored[0]}, discount {stored[1]}, tax {stored[2]}, "
+          f"delivery {order.delivery_charge}, total {stored[3]}")
+
+    # the last customer opens the delivery page, then the price of one item goes up
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = f'customer:{customers + 1}'
+    client.get('/delivery_details')
+    shown = float(expected_breakdown(lines)[3])
+    with app.app_context():
+        db.session.execute(update(MenuItem).where(MenuItem.menu_item_id == 1).values(price=Decimal('40.00')))
+        bump_version(MENU)
+        db.session.commit()
+    response = client.post('/api/orders', json={'total': shown, 'delivery_details': DELIVERY})
+    assert response.status_code == 409, response.status_code
+    print(f"    after a price change: {response.status_code} {response.get_json()}")
+    response = client.post('/api/orders', json={'total': response.get_json()['total'], 'delivery_details': DELIVERY})
+    assert response.status_code == 201, response.get_json()
+    confirmation = client.get(f"/order_confirmation?order_id={response.get_json()['order_id']}")
+    assert confirmation.status_code == 200
+    print(f"    re-confirmed at the new total: {response.status_code}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Schedules a price/category change for thousands of menu items at the same
+instant and measures how long the update scheduler takes to apply all of
+them once they fall due, and how many statements it sends.
+
+    python benchmarks/bench_scheduled_updates.py [items] [categories]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{db_file}'
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from sqlalchemy import event, insert
+
+from app import create_app, db, start_background
+from models import Category, MenuItem, ScheduledChange, Subcategory
+from update_scheduler import notify_scheduled
+
+
+def seed(items, categories):
+    category_rows = [Category(name=f'Category {i}') for i in range(categories)]
+    db.session.add_all(category_rows)
+    db.session.flush()
+    subcategory_rows = [Subcategory(name=f'Subcategory {i}', category_id=category.category_id)
+                        for i, category in enumerate(category_rows)]
+    db.session.add_all(subcategory_rows)
+    db.session.flush()
+
+    due_at = datetime.utcnow() + timedelta(seconds=2)
+    rows, changes = [], []
+    for i in range(items):
+        target = i % categories
+        rows.append({
+            'menu_item_id': i + 1,
+            'name': f'Item {i}', 'description': 'bench', 'price': 100, 'image_url': '',
+            'category_id': category_rows[0].category_id, 'subcategory_id': subcategory_rows[0].subcategory_id,
+            'nutrient_value': 'N/A', 'calorie_count': 0, 'stock_available': 10,
+            'is_best_seller': False, 'is_out_of_stock': False, 'discount_percentage': 0,
+        })
+        changes.append({
+            'change_id': i + 1, 'menu_item_id': i + 1, 'due_at': due_at, 'status': 'Pending',
+            'price': 90 + i % 20,
+            'category_id': category_rows[target].category_id,
+            'subcategory_id': subcategory_rows[target].subcategory_id,
+            'discount_percentage': 10, 'is_best_seller': i % 2 == 0, 'stock_available': i % 3,
+            'created_at': datetime.utcnow(),
+        })
+    db.session.execute(insert(MenuItem), rows)
+    db.session.execute(insert(ScheduledChange), changes)
+    db.session.commit()
+    return due_at
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    categories = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        app.extensions['job_leader'].renew()  # the lease table did not exist when the app started
+        start_background(app)  # as the first request to a server would
+        due_at = seed(items, categories)
+        notify_scheduled(due_at)
+
+        statements = {'count': 0}
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements['count'] += 1
+
+    # poll on a separate raw connection so the polling is not counted
+    monitor = sqlite3.connect(db_file)
+    while True:
+        pending = monitor.execute("SELECT COUNT(*) FROM scheduled_change WHERE status = 'Pending'").fetchone()[0]
+        if pending == 0:
+            break
+        time.sleep(0.01)
+    finished = datetime.utcnow()
+    monitor.close()
+
+    with app.app_context():
+        wrong = db.session.query(MenuItem).filter(
+            MenuItem.category_id != MenuItem.subcategory_id  # seeded so category i pairs with subcategory i
+        ).count()
+
+    print(f"{items} items due at the same instant")
+    print(f"    applied {(finished - due_at).total_seconds():.3f}s after the due time")
+    print(f"    {statements['count']} statements")
+    assert wrong == 0, f"{wrong} items got the wrong category/subcategory"
+
+
+if __name__ == '__main__':
+    main()
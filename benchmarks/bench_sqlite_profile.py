@@ -0,0 +1,134 @@
+"""
+Mixed read/write load against SQLite, once with the stock pysqlite settings
+(rollback journal, synchronous=FULL, small page cache) and once with the
+engine profile from engine_profile.py (WAL, synchronous=NORMAL, mmap, ...).
+Reader threads browse the menu and their cart while writer threads keep
+changing lines of their carts. Reports requests/sec and failed requests
+per profile.
+
+    python benchmarks/bench_sqlite_profile.py [seconds] [readers] [writers]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+# SQLite's own defaults, i.e. what the app ran with before the engine profile
+STOCK_SETTINGS = {
+    'SQLITE_JOURNAL_MODE': 'DELETE',
+    'SQLITE_SYNCHRONOUS': 'FULL',
+    'SQLITE_BUSY_TIMEOUT_MS': '5000',
+    'SQLITE_MMAP_SIZE': '0',
+    'SQLITE_CACHE_SIZE': '-2000',
+    'SQLITE_TEMP_STORE': 'DEFAULT',
+}
+
+MENU_ITEMS = 200
+
+
+def seed(db, customers):
+    from models import Cart, Category, Customer, MenuItem, Subcategory
+
+    category = Category(name='Bench')
+    db.session.add(category)
+    db.session.flush()
+    subcategory = Subcategory(name='Bench', category_id=category.category_id)
+    db.session.add(subcategory)
+    db.session.flush()
+    items = [MenuItem(name=f'Item {i}', description='bench', price=100 + i, image_url='',
+                      category_id=category.category_id, subcategory_id=subcategory.subcategory_id,
+                      nutrient_value='N/A', calorie_count=0, stock_available=1000)
+             for i in range(MENU_ITEMS)]
+    people = [Customer(username=f'c{i}', email=f'c{i}@example.com', phone=i + 1, password='x')
+              for i in range(customers)]
+    db.session.add_all(items + people)
+    db.session.flush()
+    db.session.add_all([Cart(customer_id=person.customer_id, menu_item_id=items[0].menu_item_id, quantity=1)
+                        for person in people])
+    db.session.commit()
+    return [item.menu_item_id for item in items], [person.customer_id for person in people]
+
+
+def run(label, seconds, readers, writers):
+    db_file = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['DATABASE_URI'] = f'sqlite:///{db_file}'
+
+    from app import create_app, db
+    from engine_profile import effective_settings
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        item_ids, customer_ids = seed(db, readers + writers)
+        applied = effective_settings(db.engine)
+
+    results = Counter()
+    lock = threading.Lock()
+    start_gate = threading.Barrier(readers + writers + 1)
+    stop = threading.Event()
+
+    def worker(customer_id, writes):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = f'customer:{customer_id}'
+        start_gate.wait()
+        counter = 0
+        while not stop.is_set():
+            counter += 1
+            if writes:
+                response = client.patch('/api/cart', json={
+                    'op': 'set', 'menu_item_id': item_ids[counter % MENU_ITEMS], 'quantity': 1 + counter % 5})
+                kind = 'write'
+            elif counter % 2:
+                response = client.get('/api/menu_items')
+                kind = 'read'
+            else:
+                response = client.get('/api/cart')
+                kind = 'read'
+            with lock:
+                results[kind] += 1
+                if response.status_code >= 400:
+                    results['failed'] += 1
+
+    threads = [threading.Thread(target=worker, args=(customer_id, index < writers))
+               for index, customer_id in enumerate(customer_ids)]
+    for thread in threads:
+        thread.start()
+    start_gate.wait()
+    started = time.perf_counter()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"{label}: {applied}")
+    print(f"    reads  {results['read'] / elapsed:8.1f}/sec")
+    print(f"    writes {results['write'] / elapsed:8.1f}/sec")
+    print(f"    failed {results['failed']}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        # child process: one profile, configured through the environment
+        run(sys.argv[2], *map(float, sys.argv[3:4]), *map(int, sys.argv[4:6]))
+        return
+
+    seconds = sys.argv[1] if len(sys.argv) > 1 else '10'
+    readers = sys.argv[2] if len(sys.argv) > 2 else '8'
+    writers = sys.argv[3] if len(sys.argv) > 3 else '4'
+
+    # A fresh process per profile, so no connection or cached id block carries over
+    profile_env = {name: value for name, value in os.environ.items() if name not in STOCK_SETTINGS}
+    for label, env in (('stock settings', {**profile_env, **STOCK_SETTINGS}), ('engine profile', profile_env)):
+        subprocess.run([sys.executable, __file__, '--run', label, seconds, readers, writers], env=env, check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Compares storing uploads the old way (saved under their own file name and
+read back whole) with the content-addressed blob store: peak Python memory
+for one large upload, and disk used by many uploads of a few distinct
+images under different names. Also checks the caching headers blobs are
+served with.
+
+    python benchmarks/bench_uploads.py [upload_mb] [uploads] [distinct]
+"""
+import hashlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+work_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(work_dir, 'bench.db')}"
+os.environ['BLOB_FOLDER'] = os.path.join(work_dir, 'blobs')
+os.environ['UPLOAD_MAX_BYTES'] = str(512 * 1024 * 1024)
+os.environ.setdefault('SECRET_KEY', 'bench')
+
+from app import create_app
+from blob_store import blob_store
+
+
+def peak_memory(function):
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def folder_bytes(folder):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(folder) for f in files)
+
+
+def main():
+    upload_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    uploads = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    distinct = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    app = create_app()
+    big = os.path.join(work_dir, 'big.bin')
+    with open(big, 'wb') as out:
+        for _ in range(upload_mb):
+            out.write(os.urandom(1024 * 1024))
+
+    old_folder = os.path.join(work_dir, 'uploads')
+    os.makedirs(old_folder)
+
+    def old_way():
+        path = os.path.join(old_folder, 'big.bin')
+        with open(big, 'rb') as source, open(path, 'wb') as out:
+            shutil.copyfileobj(source, out)
+        with open(path, 'rb') as saved:
+            hashlib.sha256(saved.read()).hexdigest()
+
+    def blob_way():
+        with open(big, 'rb') as source:
+            blob_store().put(source)
+
+    with app.app_context():
+        old_peak = peak_memory(old_way)
+        new_peak = peak_memory(blob_way)
+        os.unlink(os.path.join(old_folder, 'big.bin'))
+        shutil.rmtree(os.environ['BLOB_FOLDER'])
+
+        images = [os.urandom(300 * 1024) for _ in range(distinct)]
+        for i in range(uploads):
+            data = images[i % distinct]
+            with open(os.path.join(old_folder, f'upload-{i}.jpg'), 'wb') as out:
+                out.write(data)
+            blob_store().put(io.BytesIO(data))
+        blobs, blob_bytes = blob_store().usage()
+
+    client = app.test_client()
+    digest = hashlib.sha256(images[0]).hexdigest()
+    response = client.get(f'/blobs/{digest}')
+    revalidated = client.get(f'/blobs/{digest}', headers={'If-None-Match': f'"{digest}"'})
+    assert response.status_code == 200 and revalidated.status_code == 304
+
+    print(f"one {upload_mb} MB upload, peak Python memory:")
+    print(f"    saved by name, read back to hash: {old_peak / 1e6:.1f} MB")
+    print(f"    blob store (streamed, hashed in chunks): {new_peak / 1e6:.2f} MB")
+    print(f"{uploads} uploads of {distinct} distinct 300 KB files under different names:")
+    print(f"    saved by name: {uploads} files, {folder_bytes(old_folder) / 1e6:.1f} MB")
+    print(f"    blob store: {blobs} blobs, {blob_bytes / 1e6:.1f} MB")
+    print(f"    served with: {response.headers['Cache-Control']}, ETag {response.headers['ETag'][:12]}...")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import tempfile
+
+from flask import abort, current_app, send_file
+
+CHUNK_SIZE = 64 * 1024
+
+# a blob's name is its digest, so clients may keep it for a year without asking
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# leading bytes -> media type, for the kinds of file the routes accept
+SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"%PDF-", "application/pdf"),
+)
+
+
+class BlobTooLarge(ValueError):
+    pass
+
+
+def sniff_mimetype(head):
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mimetype in SIGNATURES:
+        if head.startswith(signature):
+            return mimetype
+    return "application/octet-stream"
+
+
+class BlobStore:
+    """
+    Uploaded files, stored once each under the SHA-256 of their content.
+
+    put() copies a stream to a temporary file in fixed-size chunks, hashing
+    as it goes, so memory use does not grow with the upload. The finished
+    file is renamed into place under its digest; if that blob already
+    exists the copy is dropped, so the same file uploaded for ten items
+    takes the disk space of one. A blob is never modified once written.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def path(self, digest):
+        # two levels of fan-out keep any one directory small
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest):
+        return os.path.isfile(self.path(digest))
+
+    def put(self, stream):
+        """Stores a readable binary stream and returns its digest; raises BlobTooLarge past max_bytes."""
+        temp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(temp_dir, exist_ok=True)
+        sha256 = hashlib.sha256()
+        size = 0
+        handle, temp_path = tempfile.mkstemp(dir=temp_dir)
+        try:
+            with os.fdopen(handle, "wb") as temp:
+                while chunk := stream.read(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise BlobTooLarge(f"file is larger than {self.max_bytes // 1024} KB")
+                    sha256.update(chunk)
+                    temp.write(chunk)
+            digest = sha256.hexdigest()
+            path = self.path(digest)
+            if os.path.exists(path):
+                return digest  # already stored
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+            return digest
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def send(self, digest):
+        """The blob as a response that clients and proxies may cache forever."""
+        if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest) or not self.exists(digest):
+            abort(404)
+        path = self.path(digest)
+        with open(path, "rb") as blob:
+            mimetype = sniff_mimetype(blob.read(16))
+        response = send_file(path, mimetype=mimetype, etag=digest, max_age=IMMUTABLE_MAX_AGE, conditional=True)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    def usage(self):
+        """(blobs, bytes) currently stored."""
+        count = size = 0
+        for directory, _, files in os.walk(self.root):
+            if os.path.basename(directory) == "tmp":
+                continue
+            for name in files:
+                count += 1
+                size += os.path.getsize(os.path.join(directory, name))
+        return count, size
+
+
+def blob_store():
+    return current_app.extensions["blob_store"]
+
+
+def blob_url(digest):
+    return f"/blobs/{digest}" if digest else None
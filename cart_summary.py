@@ -0,0 +1,144 @@
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app import db
+from data_versions import MENU, bump_version, cart_key, version_cache, version_subquery
+from models import Cart, MenuItem
+
+
+def summary_query(customer_id):
+    return (
+        select(
+            func.sum(Cart.quantity),
+            func.sum(Cart.quantity * MenuItem.price),
+            version_subquery(cart_key(customer_id)),
+            version_subquery(MENU),
+        )
+        .select_from(Cart)
+        .join(MenuItem, Cart.menu_item_id == MenuItem.menu_item_id)
+        .where(Cart.customer_id == customer_id)
+    )
+
+
+def _load_summary(customer_id):
+    """
+    The customer's item count and subtotal with the cart and menu versions
+    they belong to, read in one statement so they agree with each other.
+    """
+    item_count, subtotal, version, menu_version = db.session.execute(summary_query(customer_id)).one()
+    return {
+        "item_count": int(item_count or 0),
+        "subtotal": float(subtotal or 0),  # before discounts, tax and delivery
+        "version": version or 0,
+        "menu_version": menu_version or 0,
+    }
+
+
+def bump_cart(customer_id):
+    """
+    Moves the customer's cart version forward inside the caller's transaction
+    and works out the new summary, which replaces the cached one once the
+    caller commits. Every write to a cart goes through here. Returns the
+    summary.
+    """
+    bump_version(cart_key(customer_id))
+    summary = _load_summary(customer_id)
+    db.session.info.setdefault("cart_summaries", {})[customer_id] = summary
+    return summary
+
+
+@event.listens_for(Session, "after_commit")
+def _store_cart_summaries(session):
+    # data_versions remembers the bumped cart versions on the same commit
+    summaries = session.info.pop("cart_summaries", None)
+    if summaries:
+        cache = current_app.extensions.get("cart_summaries")
+        if cache is not None:
+            for customer_id, summary in summaries.items():
+                cache.put(customer_id, summary)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_cart_summaries(session):
+    session.info.pop("cart_summaries", None)
+
+
+class CartSummaries:
+    """
+    The cart badge figures (item count, subtotal, version) of the customers
+    seen most recently, so a page render does not sum the cart.
+
+    An entry is good while the cart version and the menu version (prices)
+    are unchanged, both checked through data_versions.VersionCache, so a
+    render costs no query at all until a version has to be re-read (the
+    menu's every max_age, a cart's every local_max_age). Writes made by
+    this process hand over their new summary on commit (see bump_cart); a
+    cart changed by another process is summed again once this process
+    re-reads its version. The least recently used entry goes once there are
+    max_entries.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # customer_id -> summary
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, customer_id, summary):
+        with self._lock:
+            current = self._entries.get(customer_id)
+            if current is not None and current["version"] > summary["version"]:
+                return  # a write committed while this one was being read
+            self._entries[customer_id] = summary
+            self._entries.move_to_end(customer_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, customer_id):
+        cart_version, menu_version = version_cache.get(cart_key(customer_id), MENU)
+        with self._lock:
+            summary = self._entries.get(customer_id)
+            # the versions read here may lag the ones the summary was read at, never the other way round
+            if summary is not None and summary["version"] >= cart_version and summary["menu_version"] >= menu_version:
+                self._entries.move_to_end(customer_id)
+                self.hits += 1
+                return summary
+            self.misses += 1
+        summary = _load_summary(customer_id)
+        self.put(customer_id, summary)
+        return summary
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "requests": requests,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / requests, 4) if requests else None,
+            }
+
+
+def cart_summaries():
+    return current_app.extensions["cart_summaries"]
+
+
+def cart_summary(customer_id):
+    """{"item_count", "subtotal", "version"} of a customer's cart."""
+    summary = cart_summaries().get(customer_id)
+    return {field: summary[field] for field in ("item_count", "subtotal", "version")}
+
+
+def cart_badge_count(user):
+    """The number of items in a customer's cart for the nav badge; 0 for anyone else."""
+    customer_id = getattr(user, "customer_id", None) if user.is_authenticated else None
+    if customer_id is None:
+        return 0
+    return cart_summary(customer_id)["item_count"]
@@ -0,0 +1,211 @@
+import threading
+import time
+import zlib
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from blob_store import blob_url
+from data_versions import MENU, current_versions
+from image_pipeline import variant_urls
+from menu_search import MenuIndex
+from models import Category, MenuItem, ScheduledChange, Subcategory
+
+
+def _load_items():
+    """Every menu item with its category names and next pending scheduled change."""
+    next_change = (
+        select(
+            ScheduledChange.menu_item_id,
+            func.min(ScheduledChange.due_at).label("due_at"),
+            func.count().label("pending"),
+        )
+        .where(ScheduledChange.status == "Pending")
+        .group_by(ScheduledChange.menu_item_id)
+        .subquery()
+    )
+    rows = db.session.execute(
+        select(
+            MenuItem.menu_item_id, MenuItem.name, MenuItem.description, MenuItem.price,
+            MenuItem.nutrient_value, MenuItem.calorie_count, MenuItem.discount_percentage,
+            MenuItem.image_url, MenuItem.image_key, MenuItem.is_best_seller, MenuItem.is_out_of_stock, MenuItem.stock_available,
+            Category.name.label("category_name"), Subcategory.name.label("subcategory_name"),
+            next_change.c.due_at, next_change.c.pending,
+        )
+        .outerjoin(Category, MenuItem.category_id == Category.category_id)
+        .outerjoin(Subcategory, MenuItem.subcategory_id == Subcategory.subcategory_id)
+        .outerjoin(next_change, next_change.c.menu_item_id == MenuItem.menu_item_id)
+        .order_by(MenuItem.menu_item_id)
+    ).all()
+    return [
+        {
+            "menu_item_id": MenuItem.format_id(row.menu_item_id),
+            "name": row.name,
+            "description": row.description,
+            "price": float(row.price),  # Convert DECIMAL to float for JSON
+            "category_name": row.category_name if row.category_name else "Uncategorized",
+            "subcategory_name": row.subcategory_name if row.subcategory_name else "Uncategorized",
+            "nutrient_value": row.nutrient_value,
+            "calorie_count": row.calorie_count,
+            "discount_percentage": float(row.discount_percentage) if row.discount_percentage else 0.0,
+            "image_url": row.image_url,
+            "images": variant_urls(row.image_key),  # thumb / card / full in WebP and JPEG, None until processed
+            "original_image_url": blob_url(row.image_key),
+            "is_best_seller": row.is_best_seller,
+            "is_out_of_stock": row.is_out_of_stock,
+            "stock_available": row.stock_available,
+            "scheduled_update_time": row.due_at.isoformat() if row.due_at else None,  # next pending change
+            "pending_changes": row.pending or 0,
+        }
+        for row in rows
+    ]
+
+
+def _load_stock():
+    return {
+        MenuItem.format_id(menu_item_id): stock
+        for menu_item_id, stock in db.session.execute(select(MenuItem.menu_item_id, MenuItem.stock_available))
+    }
+
+
+def _stock_checksum(items):
+    return zlib.crc32(",".join(str(item["stock_available"]) for item in items).encode())
+
+
+# The fields each view serves, and which items it shows
+CUSTOMER_FIELDS = (
+    "menu_item_id", "name", "description", "price", "category_name", "subcategory_name", "image_url", "images",
+    "is_best_seller", "is_out_of_stock", "stock_available", "discount_percentage",
+)
+
+
+def _customer_view(items):
+    return {
+        "data": [{field: item[field] for field in CUSTOMER_FIELDS} for item in items if not item["is_out_of_stock"]],
+        "ok": True,
+    }
+
+
+def _admin_view(items):
+    return items
+
+
+VIEWS = {"customer": _customer_view, "admin": _admin_view}
+
+
+class MenuCatalog:
+    """
+    The encoded /api/menu_items and /get_items payloads, and the search
+    index behind /api/menu_items queries, kept per process.
+
+    Each request checks the menu version (see data_versions.VersionCache)
+    and serves the cached bytes while it is unchanged. Every write that
+    changes what the catalog shows bumps the version in its own transaction,
+    so all processes rebuild on their next look at it.
+
+    Stock moves on every checkout, so it is not part of the version: the
+    stock figures are re-read (one narrow query, no joins) once they are
+    older than stock_max_age seconds. Checkout re-checks stock atomically,
+    so a few seconds of staleness only affects the quantity the menu offers.
+    """
+
+    def __init__(self, stock_max_age=5):
+        self.stock_max_age = stock_max_age
+        self._lock = threading.Lock()
+        self._version = None
+        self._items = []
+        self._stock_read_at = 0.0
+        self._stock_tag = 0  # checksum of the stock figures, so every process tags the same payload alike
+        self._payloads = {}  # view -> encoded JSON
+        self._index = None  # MenuIndex over self._items
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.stock_refreshes = 0
+        self.index_builds = 0
+        self.rebuild_seconds = 0.0
+        self.last_rebuild_seconds = None
+
+    def _stock_stale(self):
+        return time.monotonic() - self._stock_read_at > self.stock_max_age
+
+    def _refresh(self, version):
+        """Brings the items up to `version` and re-reads stale stock; called with the lock held."""
+        if version != self._version:
+            self._items = _load_items()
+            self._version = version
+            self._stock_read_at = time.monotonic()
+            self._stock_tag = _stock_checksum(self._items)
+            self._payloads = {}
+            self._index = None
+            self.rebuilds += 1
+        elif self._stock_stale():
+            stock = _load_stock()
+            self._stock_read_at = time.monotonic()
+            if any(stock.get(item["menu_item_id"], item["stock_available"]) != item["stock_available"]
+                   for item in self._items):
+                self._items = [
+                    {**item, "stock_available": stock.get(item["menu_item_id"], item["stock_available"])}
+                    for item in self._items
+                ]
+                self._payloads = {}
+                self._index = None
+                self._stock_tag = _stock_checksum(self._items)
+            self.stock_refreshes += 1
+
+    def get(self, view):
+        """
+        The tag and encoded JSON for a view ('customer' or 'admin'), rebuilt
+        only when out of date. The tag changes whenever the payload does.
+        """
+        version, = current_versions(MENU)  # read before the items, so a concurrent write is never cached as current
+        with self._lock:
+            if version == self._version and not self._stock_stale() and view in self._payloads:
+                self.hits += 1
+                return self._tag(view), self._payloads[view]
+
+            self.misses += 1
+            started = time.perf_counter()
+            self._refresh(version)
+            if view not in self._payloads:
+                self._payloads[view] = current_app.json.dumps(VIEWS[view](self._items))
+            elapsed = time.perf_counter() - started
+            self.rebuild_seconds += elapsed
+            self.last_rebuild_seconds = elapsed
+            return self._tag(view), self._payloads[view]
+
+    def search_index(self):
+        """The tag and MenuIndex of the current items, built on first use after each rebuild."""
+        version, = current_versions(MENU)
+        with self._lock:
+            if version != self._version or self._stock_stale():
+                self._refresh(version)
+            if self._index is None:
+                self._index = MenuIndex(self._items)
+                self.index_builds += 1
+            return self._tag("search"), self._index
+
+    def _tag(self, view):
+        return f"{view}-{self._version}-{self._stock_tag:08x}"
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "version": self._version,
+                "items": len(self._items),
+                "requests": requests,
+                "hits": self.hits,
+                "misses": self.misses,
+                "rebuilds": self.rebuilds,
+                "stock_refreshes": self.stock_refreshes,
+                "index_builds": self.index_builds,
+                "hit_ratio": round(self.hits / requests, 4) if requests else None,
+                "last_rebuild_ms": round(self.last_rebuild_seconds * 1000, 2) if self.last_rebuild_seconds is not None else None,
+                "rebuild_ms_total": round(self.rebuild_seconds * 1000, 2),
+            }
+
+
+def menu_catalog():
+    return current_app.extensions["menu_catalog"]
@@ -0,0 +1,254 @@
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import click
+from sqlalchemy import bindparam, func, select, update
+
+from analytics_db import refresh_snapshot, snapshot_age
+from blob_store import BlobTooLarge, blob_store
+from cart_summary import summary_query
+from data_versions import MENU, bump_version
+from engine_profile import effective_settings
+from image_pipeline import ENCODINGS, VARIANTS, ImageError, derived_folder, process_blob, source_images, variant_name
+from mail_queue import due_mail_query, mail_queue, queue_counts
+from models import DeliveryFeedback, Earnings, MenuItem, Order, ScheduledChange, orders_archive
+from order_events import events_after_query
+from pricing import cart_lines_query
+from routes.archive_utils import archive_orders
+from routes.history_utils import DEFAULT_LIMIT, delivery_feedback_query, history_page_query, order_lines_query
+from routes.menu_io import FORMATS, MenuImporter, export_menu, guess_format, read_rows
+from routes.schedule_utils import due_changes_query, due_rules_query
+
+
+def hot_queries():
+    """
+    The queries run on every page load or job pass, with sample parameters.
+    Where a helper runs the query, its statement comes from the same
+    factory the helper uses, so the plan checked here is the one served.
+    The dashboard filters the routes write inline are copied here instead:
+    a change to one of those filters has to be made here as well.
+    Queries marked expect_scan read the whole table on purpose (totals for
+    the admin dashboards) and are reported without being flagged.
+    """
+    now = datetime.utcnow()
+    return [
+        # inline in routes/delivery_agent_routes.py and routes/admin_routes.py; keep in step with them
+        ("agent dashboard: orders by agent and status",
+         select(Order.order_id).where(Order.delivery_agent_id == 1, Order.delivery_status == "Preparing"), False),
+        ("agent dashboard: today's deliveries",
+         select(func.count()).select_from(Order).where(
+             Order.delivery_agent_id == 1,
+             func.date(Order.created_at) == date.today(),
+             Order.delivery_status.in_(["Delivered", "Preparing", "Accepted"])), False),
+        ("admin pending orders",
+         select(Order.order_id).where(Order.delivery_status == "Pending"), False),
+        ("admin summary: orders by status",
+         select(func.count(Order.order_id)).where(Order.delivery_status == "Cancelled"), False),
+        ("admin order status chart",
+         select(Order.delivery_status, func.count()).group_by(Order.delivery_status), False),
+        ("admin recent orders",
+         select(Order.order_id).order_by(Order.created_at.desc()).limit(10), False),
+        ("admin totals",
+         select(func.count(Order.order_id), func.sum(Order.total_price)), True),
+        ("agent ratings chart",
+         select(func.count()).select_from(DeliveryFeedback).where(
+             DeliveryFeedback.delivery_agent_id == 1, DeliveryFeedback.rating == 5), False),
+        ("agent earnings today",
+         select(func.sum(Earnings.base_pay)).where(
+             Earnings.delivery_agent_id == 1, func.date(Earnings.earned_at) == date.today()), False),
+        ("agent latest earnings",
+         select(Earnings.earnings_id).where(Earnings.delivery_agent_id == 1)
+         .order_by(Earnings.earned_at.desc()).limit(1), False),
+        ("upcoming scheduled changes",
+         select(ScheduledChange.change_id, ScheduledChange.due_at).where(ScheduledChange.status == "Pending")
+         .order_by(ScheduledChange.due_at).limit(50), False),
+        # built by the helpers themselves
+        ("customer order history",
+         history_page_query(Order.__table__, 1, DEFAULT_LIMIT + 1), False),
+        ("customer order history: archive",
+         history_page_query(orders_archive, 1, DEFAULT_LIMIT + 1), False),
+        ("order confirmation: order items", order_lines_query(1), False),
+        ("order confirmation: feedback", delivery_feedback_query(1), False),
+        ("cart summary", summary_query(1), False),
+        ("cart with menu items", cart_lines_query(1), False),
+        ("scheduled menu changes due", due_changes_query(now), False),
+        ("scheduled rules due", due_rules_query(now), False),
+        ("mail queue: due messages", due_mail_query(now, 50), False),
+        ("order stream: changes since last event", events_after_query(1, 0), False),
+    ]
+
+
+def explain(connection, statement):
+    """Returns the plan lines and whether any of them is a full table scan."""
+    sql = statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+        lines = [row[-1] for row in rows]
+        # "SCAN orders" is a full scan, "SCAN orders USING INDEX ..." walks an index; a scan of a
+        # subquery's materialized rows (the live/archive unions) reads only what its own plan found
+        subqueries = {line.split()[1] for line in lines if line.startswith(("MATERIALIZE ", "CO-ROUTINE "))}
+        full_scan = any(
+            line.startswith("SCAN ") and "INDEX" not in line and line.split()[1] not in subqueries
+            for line in lines
+        )
+    else:
+        rows = connection.exec_driver_sql(f"EXPLAIN {sql}").all()
+        lines = [row[0] for row in rows]
+        full_scan = any("Seq Scan" in line for line in lines)
+    return lines, full_scan
+
+
+def register_commands(app, db):
+    @app.cli.command("explain-queries")
+    def explain_queries():
+        """Show the query plan of every hot query and flag full table scans."""
+        flagged = 0
+        with db.engine.connect() as connection:
+            for name, statement, expect_scan in hot_queries():
+                lines, full_scan = explain(connection, statement)
+                if full_scan and not expect_scan:
+                    flagged += 1
+                    status = "SCAN"
+                elif full_scan:
+                    status = "scan (expected)"
+                else:
+                    status = "ok"
+                click.echo(f"[{status}] {name}")
+                for line in lines:
+                    click.echo(f"    {line}")
+
+        if flagged:
+            click.echo(f"\n{flagged} hot queries do a full table scan")
+            sys.exit(1)
+        click.echo("\nNo unexpected full table scans")
+
+    @app.cli.command("engine-settings")
+    def engine_settings():
+        """Show the settings the database engine is actually running with."""
+        click.echo(f"dialect: {db.engine.dialect.name}")
+        for name, value in effective_settings(db.engine).items():
+            click.echo(f"{name}: {value}")
+
+    @app.cli.command("refresh-analytics")
+    def refresh_analytics():
+        """Take a fresh snapshot for the analytics bind now."""
+        if refresh_snapshot(max_age=0):
+            click.echo("Analytics snapshot refreshed")
+        else:
+            click.echo("No analytics snapshot configured (replica or primary in use)")
+        age = snapshot_age()
+        if age is not None:
+            click.echo(f"snapshot age: {age:.1f}s")
+
+    @app.cli.command("archive-orders")
+    @click.option("--days", type=int, default=None, help="Archive finished orders older than this many days.")
+    @click.option("--chunk-size", type=int, default=None, help="Orders moved per transaction.")
+    def archive_orders_command(days, chunk_size):
+        """Move finished orders past the archival horizon into the archive tables."""
+        before = datetime.utcnow() - timedelta(days=days) if days is not None else None
+        archived = archive_orders(before=before, chunk_size=chunk_size)
+        click.echo(f"Archived {archived} orders")
+
+    @app.cli.command("job-leader")
+    def job_leader_status():
+        """Show which process runs the background jobs and when it last ran one."""
+        for name, value in app.extensions['job_leader'].status().items():
+            click.echo(f"{name}: {value}")
+
+    @app.cli.command("import-menu")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "fmt", type=click.Choice(FORMATS), default=None, help="Defaults to the file extension.")
+    @click.option("--batch-size", type=int, default=500, help="Rows written per statement.")
+    @click.option("--dry-run", is_flag=True, help="Validate and report without saving.")
+    def import_menu_command(path, fmt, batch_size, dry_run):
+        """Upsert menu items by name from a CSV, JSON Lines or JSON file."""
+        started = time.perf_counter()
+        with open(path, "rb") as stream:
+            summary = MenuImporter(batch_size=batch_size).run(read_rows(stream, fmt or guess_format(path)))
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+        for error in summary["errors"]:
+            click.echo(f"row {error['row']} ({error['name']}): {error['error']}", err=True)
+        click.echo(f"{'Would insert' if dry_run else 'Inserted'} {summary['inserted']}, "
+                   f"updated {summary['updated']}, {len(summary['errors'])} rows rejected "
+                   f"in {time.perf_counter() - started:.2f}s")
+
+    @app.cli.command("export-menu")
+    @click.argument("path", type=click.Path(dir_okay=False, allow_dash=True), default="-")
+    @click.option("--format", "fmt", type=click.Choice(FORMATS), default=None, help="Defaults to the file extension, or csv.")
+    def export_menu_command(path, fmt):
+        """Write the menu to a CSV, JSON Lines or JSON file (or stdout)."""
+        with click.open_file(path, "w", encoding="utf-8") as out:
+            for chunk in export_menu(fmt or guess_format(path)):
+                out.write(chunk)
+
+    @app.cli.command("process-images")
+    @click.option("--folder", type=click.Path(exists=True, file_okay=False), default=None,
+                  help="Folder of original images; defaults to static/images.")
+    def process_images_command(folder):
+        """Store every original image, make its resized WebP/JPEG variants and point the menu items at them."""
+        folder = folder or os.path.join(app.static_folder, "images")
+        started = time.perf_counter()
+        keys, original_bytes = {}, 0
+        for name in source_images(folder):
+            path = os.path.join(folder, name)
+            original_bytes += os.path.getsize(path)
+            try:
+                with open(path, "rb") as source:
+                    keys[name] = process_blob(blob_store().put(source))
+            except (BlobTooLarge, ImageError) as e:
+                click.echo(f"{name}: {e}", err=True)
+
+        # items whose image_url names one of the originals get its variants
+        updates = [
+            {"item_id": menu_item_id, "new_key": keys[image_url.rsplit("/", 1)[-1]]}
+            for menu_item_id, image_url, image_key in db.session.execute(
+                select(MenuItem.menu_item_id, MenuItem.image_url, MenuItem.image_key))
+            if image_url and keys.get(image_url.rsplit("/", 1)[-1], image_key) != image_key
+        ]
+        if updates:
+            menu_items = MenuItem.__table__
+            db.session.execute(
+                update(menu_items).where(menu_items.c.menu_item_id == bindparam("item_id"))
+                .values(image_key=bindparam("new_key")),
+                updates,
+            )
+            bump_version(MENU)
+        db.session.commit()
+
+        variant_bytes = defaultdict(int)
+        derived = derived_folder()
+        for key in set(keys.values()):
+            for variant in VARIANTS:
+                for extension in ENCODINGS:
+                    variant_bytes[(variant, extension)] += os.path.getsize(
+                        os.path.join(derived, variant_name(key, variant, extension)))
+        click.echo(f"Processed {len(keys)} images ({original_bytes / 1e6:.1f} MB of originals) "
+                   f"and updated {len(updates)} menu items in {time.perf_counter() - started:.2f}s")
+        for variant in VARIANTS:
+            click.echo(f"    {variant}: " + ", ".join(
+                f"{extension} {variant_bytes[(variant, extension)] / 1e6:.2f} MB" for extension in ENCODINGS))
+
+    @app.cli.command("mail-queue")
+    @click.option("--retry-failed", is_flag=True, help="Queue the mail that ran out of attempts again.")
+    def mail_queue_command(retry_failed):
+        """Show the queued mail by status."""
+        if retry_failed:
+            requeued = db.session.execute(
+                update(mail_queue).where(mail_queue.c.status == "Failed")
+                .values(status="Pending", attempts=0, next_attempt_at=datetime.utcnow())
+            ).rowcount
+            db.session.commit()
+            click.echo(f"Queued {requeued} failed messages again")
+        for status, count in sorted(queue_counts().items()):
+            click.echo(f"{status}: {count}")
+        oldest = db.session.execute(
+            select(func.min(mail_queue.c.created_at)).where(mail_queue.c.status == "Pending")
+        ).scalar()
+        if oldest:
+            click.echo(f"oldest pending mail queued at {oldest:%Y-%m-%d %H:%M:%S} UTC")
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import db
+
+# One counter per kind of data; moved forward in the same transaction as every write to it,
+# so any process can tell whether what it cached is still current with one primary-key read.
+data_version = db.Table(
+    'data_version',
+    db.Column('name', db.String(50), primary_key=True),
+    db.Column('version', db.Integer, nullable=False),
+    db.Column('updated_at', db.DateTime, nullable=True),
+)
+
+MENU = 'menu'
+ORDERS = 'orders'
+CART_PREFIX = 'cart:'  # + customer_id, one version per cart
+
+
+def cart_key(customer_id):
+    return f'{CART_PREFIX}{customer_id}'
+
+
+class VersionCache:
+    """
+    Recently read versions, so a burst of conditional requests does not cost
+    a query each. A version this process commits a bump to is replaced with
+    the new one on commit rather than read back. Any other is re-read once
+    it is older than max_age seconds, so writes made by other processes are
+    seen within max_age; the versions under local_prefixes (a customer's
+    cart, which only that customer's requests write) are trusted for
+    local_max_age instead. The least recently used version goes once there
+    are max_entries.
+    """
+
+    def __init__(self, max_age=1.0, local_max_age=30.0, local_prefixes=(CART_PREFIX,), max_entries=10000):
+        self.max_age = max_age
+        self.local_max_age = local_max_age
+        self.local_prefixes = tuple(local_prefixes)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._versions = OrderedDict()  # name -> (version, monotonic time read)
+
+    def _max_age(self, name):
+        return self.local_max_age if name.startswith(self.local_prefixes) else self.max_age
+
+    def _store(self, name, version, now):
+        current = self._versions.get(name)
+        if current is None or current[0] <= version:  # never step back behind a newer version read meanwhile
+            self._versions[name] = (version, now)
+        self._versions.move_to_end(name)
+        while len(self._versions) > self.max_entries:
+            self._versions.popitem(last=False)
+
+    def get(self, *names):
+        now = time.monotonic()
+        with self._lock:
+            cached = {}
+            for name in names:
+                entry = cached[name] = self._versions.get(name)
+                if entry is not None:
+                    self._versions.move_to_end(name)
+        stale = [name for name, entry in cached.items() if entry is None or now - entry[1] > self._max_age(name)]
+        if stale:
+            read = dict(db.session.execute(
+                select(data_version.c.name, data_version.c.version).where(data_version.c.name.in_(stale))
+            ).all())
+            with self._lock:
+                for name in stale:
+                    cached[name] = (read.get(name, 0), now)
+                    self._store(name, cached[name][0], now)
+        return tuple(cached[name][0] for name in names)
+
+    def remember(self, name, version):
+        """Records a version this process has just committed, so it is not read back."""
+        with self._lock:
+            self._store(name, version, time.monotonic())
+
+
+version_cache = VersionCache()
+
+
+@event.listens_for(Session, 'after_commit')
+def _remember_bumped_versions(session):
+    bumped = session.info.pop('bumped_versions', None)
+    if bumped:
+        for name, version in bumped.items():
+            version_cache.remember(name, version)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_bumped_versions(session):
+    session.info.pop('bumped_versions', None)
+
+
+def bump_version(name):
+    """Moves a version forward inside the caller's transaction and returns it. The caller commits."""
+    now = datetime.utcnow()
+    result = db.session.execute(
+        update(data_version)
+        .where(data_version.c.name == name)
+        .values(version=data_version.c.version + 1, updated_at=now)
+    )
+    if result.rowcount == 0:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(data_version).values(name=name, version=1, updated_at=now))
+        except IntegrityError:
+            return bump_version(name)  # another transaction created it first
+    # the row is this transaction's until it commits, so this is the version the commit publishes
+    version = get_version(name)
+    db.session.info.setdefault('bumped_versions', {})[name] = version
+    return version
+
+
+def get_version(name):
+    """The current version, 0 for data that has never been written through bump_version."""
+    return db.session.execute(
+        select(data_version.c.version).where(data_version.c.name == name)
+    ).scalar() or 0
+
+
+def version_subquery(name):
+    """get_version as a scalar subquery, to read a version in the same statement as the data it covers."""
+    return select(data_version.c.version).where(data_version.c.name == name).scalar_subquery()
+
+
+def current_versions(*names):
+    """The versions as this process last saw them, at most VersionCache.max_age (local_max_age for a cart) old."""
+    return version_cache.get(*names)
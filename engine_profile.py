@@ -0,0 +1,80 @@
+import os
+
+from sqlalchemy import event
+
+# Applied to every new SQLite connection. Each can be overridden from the environment.
+SQLITE_PRAGMA_DEFAULTS = {
+    'journal_mode': ('SQLITE_JOURNAL_MODE', 'WAL'),       # readers no longer block on the writer
+    'synchronous': ('SQLITE_SYNCHRONOUS', 'NORMAL'),      # safe with WAL, fsync only at checkpoints
+    'busy_timeout': ('SQLITE_BUSY_TIMEOUT_MS', '5000'),   # wait for the write lock instead of failing
+    'mmap_size': ('SQLITE_MMAP_SIZE', '268435456'),       # 256 MB of the file read through mmap
+    'cache_size': ('SQLITE_CACHE_SIZE', '-64000'),        # negative means KiB, so ~64 MB page cache
+    'temp_store': ('SQLITE_TEMP_STORE', 'MEMORY'),        # sorts and temp b-trees stay in memory
+}
+
+# Pool sizing for server databases (PostgreSQL, MySQL)
+POOL_DEFAULTS = {
+    'pool_size': ('DB_POOL_SIZE', 10),
+    'max_overflow': ('DB_MAX_OVERFLOW', 20),
+    'pool_timeout': ('DB_POOL_TIMEOUT', 30),
+    'pool_recycle': ('DB_POOL_RECYCLE', 1800),
+}
+
+
+def is_sqlite(uri):
+    return (uri or '').startswith('sqlite')
+
+
+def sqlite_pragmas():
+    return {name: os.getenv(env, default) for name, (env, default) in SQLITE_PRAGMA_DEFAULTS.items()}
+
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for the given database URI."""
+    if is_sqlite(uri):
+        busy_timeout_ms = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+        # pysqlite's own lock timeout, in seconds, kept in line with busy_timeout
+        return {'connect_args': {'timeout': busy_timeout_ms / 1000}}
+
+    options = {name: int(os.getenv(env, default)) for name, (env, default) in POOL_DEFAULTS.items()}
+    options['pool_pre_ping'] = True
+    return options
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Runs the PRAGMAs on every connection the engine opens."""
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def configure_engine(app, db):
+    """Applies the engine profile to the app's engine. Call after db.init_app."""
+    if not is_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
+
+
+def effective_settings(engine):
+    """What the database actually runs with, read back from a live connection."""
+    if engine.dialect.name == 'sqlite':
+        with engine.connect() as connection:
+            return {
+                name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+                for name in SQLITE_PRAGMA_DEFAULTS
+            }
+
+    pool = engine.pool
+    return {
+        'pool_class': type(pool).__name__,
+        'pool_size': pool.size() if hasattr(pool, 'size') else None,
+        'max_overflow': getattr(pool, '_max_overflow', None),
+        'pool_timeout': pool.timeout() if hasattr(pool, 'timeout') else None,
+        'pool_recycle': getattr(pool, '_recycle', None),
+        'pool_pre_ping': getattr(pool, '_pre_ping', None),
+        'status': pool.status(),
+    }
@@ -0,0 +1,54 @@
+import functools
+
+from flask import Response, make_response, request
+
+
+def make_etag(*parts):
+    """An ETag value from the versions a response was built from."""
+    return "-".join(str(part) for part in parts)
+
+
+def not_modified(etag):
+    """Whether the client already holds the response tagged `etag`."""
+    return request.if_none_match.contains_weak(etag)
+
+
+def _tag(response, etag):
+    # weak: the same versions give the same data, not necessarily the same bytes
+    response.set_etag(etag, weak=True)
+    # the client may keep the body but has to revalidate before every use
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def conditional_response(etag, body, mimetype="application/json"):
+    """A 304 when the client's copy is current, else the body tagged with `etag`."""
+    if not_modified(etag):
+        return _tag(Response(status=304), etag)
+    return _tag(Response(body, mimetype=mimetype), etag)
+
+
+def conditional(validator):
+    """
+    Answers GET requests with 304 Not Modified while the data behind them is
+    unchanged. `validator` takes the view's arguments and returns the parts
+    of the ETag (usually data versions), or None to serve the view untagged.
+    It runs before the view reads anything, so a write landing in between
+    gives the response an older tag than its data, which only costs the
+    client one more full response.
+    """
+    def decorate(view):
+        @functools.wraps(view)
+        def wrapped(*args, **kwargs):
+            parts = validator(*args, **kwargs)
+            if parts is None:
+                return view(*args, **kwargs)
+            etag = make_etag(*parts)
+            if not_modified(etag):
+                return _tag(Response(status=304), etag)
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                _tag(response, etag)
+            return response
+        return wrapped
+    return decorate
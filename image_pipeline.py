@@ -0,0 +1,127 @@
+import os
+
+from flask import current_app, send_from_directory
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from blob_store import IMMUTABLE_MAX_AGE, blob_store
+
+# where the variants are written, relative to the static folder
+DERIVED_DIR = "images/derived"
+
+# variant name -> longest side in pixels; smaller sources are never scaled up
+VARIANTS = {"thumb": 160, "card": 480, "full": 1200}
+
+# extension -> Pillow format and encoder options
+ENCODINGS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+class ImageError(ValueError):
+    pass
+
+
+def derived_folder():
+    return os.path.join(current_app.static_folder, *DERIVED_DIR.split("/"))
+
+
+def variant_name(key, variant, extension):
+    # 64 bits of the digest are plenty to keep the names of one menu apart
+    return f"{key[:16]}-{variant}.{extension}"
+
+
+def variant_urls(key):
+    """
+    {variant: {"webp": url, "jpeg": url}} for an image key, or None for an
+    item without one. The names carry the content hash, so they can be
+    cached forever.
+    """
+    if not key:
+        return None
+    prefix = f"{current_app.static_url_path.rstrip('/')}/{DERIVED_DIR}"
+    return {
+        variant: {
+            "webp": f"{prefix}/{variant_name(key, variant, 'webp')}",
+            "jpeg": f"{prefix}/{variant_name(key, variant, 'jpg')}",
+        }
+        for variant in VARIANTS
+    }
+
+
+def variant_path(key, variant, extension="jpg"):
+    """The path of a variant relative to the static folder, as templates use it."""
+    return f"{DERIVED_DIR}/{variant_name(key, variant, extension)}"
+
+
+def menu_image_name(key):
+    """The full JPEG as a MenuItem.image_url name, which the pages resolve under /images/."""
+    return f"{DERIVED_DIR.split('/', 1)[1]}/{variant_name(key, 'full', 'jpg')}"
+
+
+def _flatten(image):
+    """Upright RGB pixels with the EXIF, ICC and comment metadata left behind."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    clean = image.convert("RGB")
+    clean.info = {}
+    return clean
+
+
+def process_blob(digest):
+    """
+    Writes the thumb, card and full variants of a stored upload (see
+    blob_store) in WebP and JPEG and returns its image key, which is the
+    blob's digest. Variants that already exist are not written again, so
+    the same picture uploaded twice costs one set of files.
+    """
+    key = digest
+    folder = derived_folder()
+    wanted = [
+        (variant, extension)
+        for variant in VARIANTS for extension in ENCODINGS
+        if not os.path.exists(os.path.join(folder, variant_name(key, variant, extension)))
+    ]
+    if not wanted:
+        return key
+
+    try:
+        with Image.open(blob_store().path(digest)) as source:
+            source.load()
+            image = _flatten(source)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ImageError("not a readable image") from e
+
+    os.makedirs(folder, exist_ok=True)
+    resized = {}
+    for variant, extension in wanted:
+        if variant not in resized:
+            resized[variant] = image.copy()
+            resized[variant].thumbnail((VARIANTS[variant], VARIANTS[variant]), Image.Resampling.LANCZOS)
+        fmt, options = ENCODINGS[extension]
+        path = os.path.join(folder, variant_name(key, variant, extension))
+        temp_path = f"{path}.tmp{os.getpid()}"
+        resized[variant].save(temp_path, fmt, **options)
+        os.replace(temp_path, path)  # readers never see a half-written file
+    return key
+
+
+def send_variant(filename):
+    response = send_from_directory(derived_folder(), filename, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def source_images(folder):
+    """The original images directly inside `folder`, by file name."""
+    return sorted(
+        name for name in os.listdir(folder)
+        if name.lower().endswith(SOURCE_EXTENSIONS) and os.path.isfile(os.path.join(folder, name))
+    )
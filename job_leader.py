@@ -0,0 +1,206 @@
+import functools
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+
+# One row per elected role: who holds it, until when, and what it last ran.
+job_lease = db.Table(
+    'job_lease',
+    db.Column('name', db.String(50), primary_key=True),
+    db.Column('holder', db.String(100), nullable=False),
+    db.Column('expires_at', db.DateTime, nullable=False),
+    db.Column('last_run_at', db.DateTime, nullable=True),
+    db.Column('last_job', db.String(100), nullable=True),
+    # earliest due time scheduled through another process, picked up by the leader within wake_poll_seconds
+    db.Column('wake_at', db.DateTime, nullable=True),
+)
+
+
+class JobLeader:
+    """
+    Elects the one process in the deployment that runs the background jobs.
+
+    Every process serving the app competes for the lease row. The holder
+    renews it every lease_seconds / 3; if it dies the lease runs out and the
+    next process to try takes over, so at most one process is leader at a time
+    and a new one is elected within lease_seconds. Jobs wrapped with
+    leader_only() are skipped everywhere else. Between renewals the leader
+    looks for due times scheduled through other processes (request_wake)
+    every wake_poll_seconds.
+    """
+
+    def __init__(self, app, name='scheduler', lease_seconds=15, wake_poll_seconds=1):
+        self.app = app
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.wake_poll_seconds = wake_poll_seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._leader = False
+        self._leader_until = 0.0  # monotonic time this process's lease runs out
+        self.on_elected = []  # called when this process becomes leader
+        self.on_wake = []     # called with a due time scheduled through another process
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def is_leader(self):
+        # a leader that has not managed to renew stops acting as one before anyone can take over
+        return self._leader and time.monotonic() < self._leader_until
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='job-leader', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self.is_leader:
+            # hand over straight away instead of waiting for the lease to run out
+            with self.app.app_context(), db.engine.begin() as connection:
+                connection.execute(
+                    update(job_lease)
+                    .where(job_lease.c.name == self.name, job_lease.c.holder == self.holder)
+                    .values(expires_at=datetime.utcnow())
+                )
+            self._leader = False
+
+    def _run(self):
+        next_renewal = 0.0
+        while not self._stopped.is_set():
+            if time.monotonic() >= next_renewal:
+                next_renewal = time.monotonic() + self.lease_seconds / 3
+                try:
+                    self.renew()
+                except Exception as e:
+                    self._leader = False
+                    print(f"Error renewing job lease: {e}")
+            elif self.is_leader:
+                try:
+                    self.check_wake()
+                except Exception as e:
+                    print(f"Error checking for scheduled wake-ups: {e}")
+            wait = next_renewal - time.monotonic()
+            if self.is_leader:
+                wait = min(wait, self.wake_poll_seconds)
+            self._stopped.wait(max(wait, 0))
+
+    def renew(self):
+        """Takes or extends the lease. Returns whether this process is the leader."""
+        now = datetime.utcnow()
+        started = time.monotonic()
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                result = connection.execute(
+                    update(job_lease)
+                    .where(
+                        job_lease.c.name == self.name,
+                        or_(job_lease.c.holder == self.holder, job_lease.c.expires_at < now),
+                    )
+                    .values(holder=self.holder, expires_at=now + timedelta(seconds=self.lease_seconds))
+                )
+                leader = result.rowcount == 1
+
+                wake_at = self._take_wake_at(connection) if leader else None
+
+            if not leader:
+                leader = self._claim_first(now)
+
+        elected = leader and not self.is_leader
+        self._leader = leader
+        self._leader_until = started + self.lease_seconds
+        if elected:
+            print(f"{self.holder} is now running the background jobs")
+            for callback in self.on_elected:
+                callback()
+        self._wake(wake_at)
+        return leader
+
+    def _take_wake_at(self, connection):
+        wake_at = connection.execute(
+            select(job_lease.c.wake_at).where(job_lease.c.name == self.name)
+        ).scalar()
+        if wake_at is not None:
+            # an earlier time requested meanwhile stays for the next look
+            connection.execute(
+                update(job_lease)
+                .where(job_lease.c.name == self.name, job_lease.c.wake_at == wake_at)
+                .values(wake_at=None)
+            )
+        return wake_at
+
+    def _wake(self, wake_at):
+        if wake_at is not None:
+            for callback in self.on_wake:
+                callback(wake_at)
+
+    def check_wake(self):
+        """Passes on a due time another process has requested since the last look; leader only."""
+        with self.app.app_context(), db.engine.begin() as connection:
+            wake_at = self._take_wake_at(connection)
+        self._wake(wake_at)
+
+    def _claim_first(self, now):
+        """Creates the lease row if no process has ever held it."""
+        try:
+            with db.engine.begin() as connection:
+                if connection.execute(select(job_lease.c.name).where(job_lease.c.name == self.name)).first():
+                    return False  # someone else holds it
+                connection.execute(insert(job_lease).values(
+                    name=self.name,
+                    holder=self.holder,
+                    expires_at=now + timedelta(seconds=self.lease_seconds),
+                ))
+            return True
+        except IntegrityError:
+            return False  # another process created it first
+
+    def leader_only(self, job):
+        """Wraps a job so it only runs on the leader and records when it last ran."""
+        @functools.wraps(job)
+        def run(*args, **kwargs):
+            if not self.is_leader:
+                return None
+            result = job(*args, **kwargs)
+            with self.app.app_context(), db.engine.begin() as connection:
+                connection.execute(
+                    update(job_lease)
+                    .where(job_lease.c.name == self.name, job_lease.c.holder == self.holder)
+                    .values(last_run_at=datetime.utcnow(), last_job=job.__name__)
+                )
+            return result
+        return run
+
+    def request_wake(self, due_at):
+        """Asks the leader, wherever it runs, to look at a newly scheduled due time."""
+        due_at = due_at.replace(tzinfo=None)
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(job_lease)
+                .where(
+                    job_lease.c.name == self.name,
+                    or_(job_lease.c.wake_at.is_(None), job_lease.c.wake_at > due_at),
+                )
+                .values(wake_at=due_at)
+            )
+
+    def status(self):
+        with self.app.app_context(), db.engine.connect() as connection:
+            row = connection.execute(
+                select(job_lease).where(job_lease.c.name == self.name)
+            ).mappings().first()
+        now = datetime.utcnow()
+        return {
+            "process": self.holder,
+            "is_leader": self.is_leader,
+            "leader": row["holder"] if row and row["expires_at"] > now else None,
+            "lease_expires_at": row["expires_at"].isoformat() if row else None,
+            "last_run_at": row["last_run_at"].isoformat() if row and row["last_run_at"] else None,
+            "last_job": row["last_job"] if row else None,
+        }
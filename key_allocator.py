@@ -0,0 +1,121 @@
+import os
+import threading
+from collections import deque
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+
+# One row per model: the next numeric id that has not been handed out yet.
+key_sequence = db.Table(
+    'key_sequence',
+    db.Column('name', db.String(50), primary_key=True),
+    db.Column('next_value', db.Integer, nullable=False),
+)
+
+
+class KeyAllocator:
+    """
+    Hi/lo primary key allocator.
+
+    Each process reserves a block of ids from the key_sequence table with one
+    UPDATE and then hands them out from memory, so inserts no longer need a
+    SELECT on the live table. The reservation runs on the flushing session's
+    own connection (a second connection would dead-lock against SQLite's write
+    lock), which means a block only becomes shared with other requests once
+    that transaction commits; if it rolls back the reservation is rolled back
+    with it and the block is discarded.
+    """
+
+    def __init__(self, block_size=50):
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._blocks = {}  # sequence name -> deque of [next, limit] committed blocks
+
+    def next_value(self, model, connection, session):
+        name = model.__tablename__
+
+        # Blocks reserved earlier in this same transaction come first
+        pending = session.info.setdefault('pending_key_blocks', {})
+        block = pending.get(name)
+        if block and block[0] < block[1]:
+            return self._take(block)
+
+        with self._lock:
+            blocks = self._blocks.get(name)
+            while blocks:
+                if blocks[0][0] < blocks[0][1]:
+                    return self._take(blocks[0])
+                blocks.popleft()
+
+        block = self._reserve(model, connection)
+        pending[name] = block
+        return self._take(block)
+
+    def _take(self, block):
+        value = block[0]
+        block[0] += 1
+        return value
+
+    def _reserve(self, model, connection):
+        """Move the sequence forward by one block and return the reserved range."""
+        name = model.__tablename__
+        result = connection.execute(
+            text("UPDATE key_sequence SET next_value = next_value + :size WHERE name = :name"),
+            {"size": self.block_size, "name": name}
+        )
+        if result.rowcount == 0:
+            # First allocation for this model: continue after the ids already in the table
+            start = self._current_max(model, connection) + 1
+            connection.execute(
+                text("INSERT INTO key_sequence (name, next_value) VALUES (:name, :next_value)"),
+                {"name": name, "next_value": start + self.block_size}
+            )
+            return [start, start + self.block_size]
+
+        limit = connection.execute(
+            text("SELECT next_value FROM key_sequence WHERE name = :name"),
+            {"name": name}
+        ).scalar()
+        return [limit - self.block_size, limit]
+
+    def _current_max(self, model, connection):
+        pk_field = list(model.__mapper__.primary_key)[0].name
+        query = text(f"SELECT MAX({pk_field}) FROM {model.__tablename__}")
+        return connection.execute(query).scalar() or 0
+
+    def commit_pending(self, session):
+        """Share what is left of the blocks reserved by a committed transaction."""
+        pending = session.info.pop('pending_key_blocks', None)
+        if not pending:
+            return
+        with self._lock:
+            for name, block in pending.items():
+                if block[0] < block[1]:
+                    self._blocks.setdefault(name, deque()).append(block)
+
+    def discard_pending(self, session):
+        """The reservation was rolled back, so the ids must not be handed out."""
+        session.info.pop('pending_key_blocks', None)
+
+
+key_allocator = KeyAllocator(block_size=int(os.getenv('KEY_BLOCK_SIZE', 50)))
+
+
+@event.listens_for(Session, 'after_commit')
+def _share_key_blocks(session):
+    key_allocator.commit_pending(session)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_key_blocks(session):
+    key_allocator.discard_pending(session)
+
+
+def allocate_id(model, connection, target=None):
+    """Return the next numeric id for the given model."""
+    session = object_session(target) if target is not None else None
+    if session is None:
+        session = db.session()
+    return key_allocator.next_value(model, connection, session)
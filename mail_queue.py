@@ -0,0 +1,220 @@
+import smtplib
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import event, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app import db
+
+# Mail waiting to be sent, written in the same transaction as the change that asks for it,
+# so a rolled-back signup sends nothing and a committed one is never lost to a restart.
+mail_queue = db.Table(
+    'mail_queue',
+    db.Column('mail_id', db.Integer, primary_key=True, autoincrement=True),
+    db.Column('subject', db.String(255), nullable=False),
+    db.Column('sender', db.String(255), nullable=True),
+    db.Column('recipients', db.Text, nullable=False),  # comma separated
+    db.Column('body', db.Text, nullable=False),
+    db.Column('status', db.String(20), nullable=False, default='Pending'),  # Pending, Sending, Sent, Failed
+    db.Column('attempts', db.Integer, nullable=False, default=0),
+    db.Column('next_attempt_at', db.DateTime, nullable=False),
+    db.Column('claimed_by', db.String(50), nullable=True),
+    db.Column('claimed_until', db.DateTime, nullable=True),
+    db.Column('last_error', db.Text, nullable=True),
+    db.Column('created_at', db.DateTime, nullable=False),
+    db.Column('sent_at', db.DateTime, nullable=True),
+    db.Index('ix_mail_queue_status_next_attempt_at', 'status', 'next_attempt_at'),
+)
+
+
+def enqueue_mail(subject, recipients, body, sender=None):
+    """Queues a mail inside the caller's transaction; it is sent once the caller commits."""
+    now = datetime.utcnow()
+    db.session.execute(insert(mail_queue).values(
+        subject=subject,
+        sender=sender,
+        recipients=",".join(recipients),
+        body=body,
+        status='Pending',
+        attempts=0,
+        next_attempt_at=now,
+        created_at=now,
+    ))
+    db.session.info['mail_enqueued'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_mail_sender(session):
+    if session.info.pop('mail_enqueued', False):
+        sender = current_app.extensions.get('mail_sender')
+        if sender is not None:
+            sender.wake()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_mail_enqueued(session):
+    session.info.pop('mail_enqueued', None)
+
+
+def queue_counts():
+    return dict(db.session.execute(
+        select(mail_queue.c.status, func.count()).group_by(mail_queue.c.status)
+    ).all())
+
+
+def due_mail_query(now, limit):
+    """Messages ready to send: pending and due, or claimed by a sender whose claim has lapsed."""
+    return (
+        select(mail_queue.c.mail_id)
+        .where(or_(
+            (mail_queue.c.status == 'Pending') & (mail_queue.c.next_attempt_at <= now),
+            (mail_queue.c.status == 'Sending') & (mail_queue.c.claimed_until < now),
+        ))
+        .order_by(mail_queue.c.next_attempt_at)
+        .limit(limit)
+    )
+
+
+class MailSender:
+    """
+    Sends the queued mail on a background thread.
+
+    Each pass claims up to batch_size due messages (guarded on their status,
+    so several processes can run a sender side by side) and sends them all
+    over one SMTP connection. A message that fails is retried after
+    retry_delay, doubling with every attempt up to max_delay, and marked
+    Failed after max_attempts. If the connection itself cannot be opened or
+    drops, the messages not yet sent are retried the same way. A claim that
+    is not finished within claim_seconds (the process died mid-batch) is
+    taken over by the next pass.
+
+    The thread sleeps until a commit queues new mail in this process, or
+    poll_seconds pass, which picks up mail queued by other processes and
+    retries that have come due.
+    """
+
+    def __init__(self, app, mail, batch_size=50, max_attempts=6, retry_delay=30, max_delay=3600,
+                 poll_seconds=30, claim_seconds=300):
+        self.app = app
+        self.mail = mail
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_delay = max_delay
+        self.poll_seconds = poll_seconds
+        self.claim_seconds = claim_seconds
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.sent = 0
+        self.failed = 0
+        self.connections = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='mail-sender', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    while self.send_batch() == self.batch_size and not self._stopped.is_set():
+                        pass  # a full batch: there may be more waiting
+            except Exception as e:
+                print(f"Error in mail sender: {e}")
+            self._wake.wait(self.poll_seconds)
+
+    def _claim(self, now):
+        token = uuid.uuid4().hex[:16]
+        ids = db.session.execute(due_mail_query(now, self.batch_size)).scalars().all()
+        if not ids:
+            return []
+        db.session.execute(
+            update(mail_queue)
+            .where(mail_queue.c.mail_id.in_(ids), or_(
+                mail_queue.c.status == 'Pending',
+                (mail_queue.c.status == 'Sending') & (mail_queue.c.claimed_until < now),
+            ))
+            .values(status='Sending', claimed_by=token, claimed_until=now + timedelta(seconds=self.claim_seconds))
+        )
+        db.session.commit()
+        # another sender may have claimed some of them in between; these are ours
+        return db.session.execute(
+            select(mail_queue).where(mail_queue.c.claimed_by == token, mail_queue.c.status == 'Sending')
+            .order_by(mail_queue.c.mail_id)
+        ).mappings().all()
+
+    def _retry_values(self, row, error, now):
+        attempts = row['attempts'] + 1
+        if attempts >= self.max_attempts:
+            return {'status': 'Failed', 'attempts': attempts, 'last_error': error, 'claimed_by': None}
+        delay = min(self.retry_delay * 2 ** (attempts - 1), self.max_delay)
+        return {
+            'status': 'Pending', 'attempts': attempts, 'last_error': error, 'claimed_by': None,
+            'next_attempt_at': now + timedelta(seconds=delay),
+        }
+
+    def _finish(self, row, values):
+        db.session.execute(update(mail_queue).where(mail_queue.c.mail_id == row['mail_id']).values(**values))
+        db.session.commit()
+
+    def send_batch(self):
+        """Claims and sends one batch; returns how many messages it claimed."""
+        batch = self._claim(datetime.utcnow())
+        if not batch:
+            return 0
+
+        pending = list(batch)
+        try:
+            with self.mail.connect() as connection:
+                self.connections += 1
+                while pending:
+                    row = pending[0]
+                    message = Message(
+                        row['subject'],
+                        sender=row['sender'],  # None falls back to MAIL_DEFAULT_SENDER
+                        recipients=row['recipients'].split(','),
+                        body=row['body'],
+                    )
+                    try:
+                        connection.send(message)
+                    except (smtplib.SMTPServerDisconnected, ConnectionError):
+                        raise  # the connection is gone: retry this one and the rest
+                    except Exception as e:
+                        # this message was refused; the connection is still good for the others
+                        pending.pop(0)
+                        self._finish(row, self._retry_values(row, str(e), datetime.utcnow()))
+                        self.failed += 1
+                        continue
+                    pending.pop(0)
+                    self._finish(row, {
+                        'status': 'Sent', 'attempts': row['attempts'] + 1, 'sent_at': datetime.utcnow(),
+                        'claimed_by': None, 'last_error': None,
+                    })
+                    self.sent += 1
+        except Exception as e:
+            # could not connect, or the connection dropped part way
+            now = datetime.utcnow()
+            for row in pending:
+                db.session.execute(
+                    update(mail_queue).where(mail_queue.c.mail_id == row['mail_id'])
+                    .values(**self._retry_values(row, f"{type(e).__name__}: {e}", now))
+                )
+            db.session.commit()
+            self.failed += len(pending)
+        return len(batch)
+
+    def stats(self):
+        return {'sent': self.sent, 'failed_attempts': self.failed, 'connections': self.connections}
@@ -0,0 +1,204 @@
+import base64
+import json
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from models import MenuItem
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+# a term found in the name counts for more than one found in the description
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+# query parameters that turn /api/menu_items into a search
+SEARCH_ARGS = (
+    "q", "category", "subcategory", "min_price", "max_price", "min_discount", "best_seller",
+    "min_calories", "max_calories", "sort", "limit", "cursor",
+)
+SORTS = ("relevance", "price_asc", "price_desc", "name", "discount")
+DEFAULT_LIMIT = 24
+MAX_LIMIT = 100
+
+
+def tokenize(text):
+    return TOKEN.findall((text or "").lower())
+
+
+class SearchError(ValueError):
+    pass
+
+
+def _number(args, name, cast=float):
+    value = args.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        raise SearchError(f"{name} is not a number: {value!r}")
+
+
+def _boolean(args, name):
+    value = args.get(name)
+    if value in (None, ""):
+        return None
+    return value.strip().lower() in ("yes", "true", "1", "y")
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise SearchError("cursor is not valid")
+    if not isinstance(key, list):
+        raise SearchError("cursor is not valid")
+    return key
+
+
+def is_search(args):
+    return any(args.get(name) not in (None, "") for name in SEARCH_ARGS)
+
+
+def parse_search_args(args):
+    """Reads and checks the search parameters of a request; raises SearchError."""
+    sort = args.get("sort") or ("relevance" if args.get("q") else None)
+    if sort is not None and sort not in SORTS:
+        raise SearchError(f"sort must be one of {', '.join(SORTS)}")
+    limit = _number(args, "limit", int)
+    limit = DEFAULT_LIMIT if limit is None else limit
+    if not 1 <= limit <= MAX_LIMIT:
+        raise SearchError(f"limit must be between 1 and {MAX_LIMIT}")
+    cursor = args.get("cursor")
+    return {
+        "q": args.get("q") or "",
+        "category": (args.get("category") or "").strip().lower() or None,
+        "subcategory": (args.get("subcategory") or "").strip().lower() or None,
+        "min_price": _number(args, "min_price"),
+        "max_price": _number(args, "max_price"),
+        "min_discount": _number(args, "min_discount"),
+        "best_seller": _boolean(args, "best_seller"),
+        "min_calories": _number(args, "min_calories", int),
+        "max_calories": _number(args, "max_calories", int),
+        "sort": sort,
+        "limit": limit,
+        "after": decode_cursor(cursor) if cursor else None,
+    }
+
+
+def _sort_key(item, sort, score):
+    # every key ends with the item id, so it orders the items totally and a cursor resumes exactly
+    item_id = MenuItem.parse_id(item["menu_item_id"])
+    if sort == "relevance":
+        return [-score, item_id]
+    if sort == "price_asc":
+        return [item["price"], item_id]
+    if sort == "price_desc":
+        return [-item["price"], item_id]
+    if sort == "name":
+        return [item["name"].lower(), item_id]
+    if sort == "discount":
+        return [-item["discount_percentage"], item_id]
+    return [item_id]
+
+
+class MenuIndex:
+    """
+    An inverted index over the names and descriptions of the catalog items,
+    built once per catalog version (see MenuCatalog.search_index).
+
+    Every term of a query has to match; the last one also matches as a
+    prefix, so results follow the customer as they type. Category and
+    subcategory filters are looked up by name, the numeric ones are checked
+    against the candidates that are left.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        postings = defaultdict(dict)  # token -> {position: weight}
+        self._by_category = defaultdict(set)
+        self._by_subcategory = defaultdict(set)
+        for position, item in enumerate(items):
+            for field, weight in (("name", NAME_WEIGHT), ("description", DESCRIPTION_WEIGHT)):
+                for token in tokenize(item[field]):
+                    postings[token][position] = postings[token].get(position, 0) + weight
+            self._by_category[item["category_name"].lower()].add(position)
+            self._by_subcategory[item["subcategory_name"].lower()].add(position)
+        self._postings = dict(postings)
+        self._tokens = sorted(self._postings)
+
+    def _term(self, term, prefix):
+        if not prefix:
+            return self._postings.get(term, {})
+        scores = {}
+        for token in self._tokens[bisect_left(self._tokens, term):]:
+            if not token.startswith(term):
+                break
+            for position, weight in self._postings[token].items():
+                scores[position] = max(scores.get(position, 0), weight)
+        return scores
+
+    def match(self, text):
+        """Positions matching every term of `text` with their scores, or None if it has no terms."""
+        terms = tokenize(text)
+        if not terms:
+            return None
+        scores = None
+        for i, term in enumerate(terms):
+            found = self._term(term, prefix=i == len(terms) - 1)
+            scores = dict(found) if scores is None else {
+                position: scores[position] + weight for position, weight in found.items() if position in scores
+            }
+            if not scores:
+                break
+        return scores
+
+    def search(self, query, in_stock_only=True):
+        """
+        The page of items for a parsed query (see parse_search_args), as
+        (items, next cursor or None, total matches).
+        """
+        scores = self.match(query["q"])
+        positions = set(range(len(self.items))) if scores is None else set(scores)
+        if query["category"]:
+            positions &= self._by_category.get(query["category"], set())
+        if query["subcategory"]:
+            positions &= self._by_subcategory.get(query["subcategory"], set())
+
+        matches = []
+        for position in positions:
+            item = self.items[position]
+            if in_stock_only and item["is_out_of_stock"]:
+                continue
+            if query["min_price"] is not None and item["price"] < query["min_price"]:
+                continue
+            if query["max_price"] is not None and item["price"] > query["max_price"]:
+                continue
+            if query["min_discount"] is not None and item["discount_percentage"] < query["min_discount"]:
+                continue
+            if query["best_seller"] is not None and bool(item["is_best_seller"]) != query["best_seller"]:
+                continue
+            calories = item["calorie_count"] or 0
+            if query["min_calories"] is not None and calories < query["min_calories"]:
+                continue
+            if query["max_calories"] is not None and calories > query["max_calories"]:
+                continue
+            score = scores[position] if scores is not None else 0
+            matches.append((_sort_key(item, query["sort"], score), position))
+        matches.sort()
+
+        start = 0
+        if query["after"] is not None:
+            keys = [key for key, _ in matches]
+            try:
+                start = bisect_right(keys, query["after"])
+            except TypeError:
+                raise SearchError("cursor does not belong to this sort")
+        page = matches[start:start + query["limit"]]
+        next_cursor = encode_cursor(page[-1][0]) if start + len(page) < len(matches) else None
+        return [self.items[position] for _, position in page], next_cursor, len(matches)
@@ -0,0 +1,39 @@
+"""stock reservations
+
+Revision ID: c6da46f038f9
+Revises: ea7359454474
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6da46f038f9'
+down_revision = 'ea7359454474'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stock_reservation',
+    sa.Column('reservation_id', sa.Integer(), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('menu_item_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['customer_id'], ['customer.customer_id'], name=op.f('fk_stock_reservation_customer_id_customer'), ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['menu_item_id'], ['menu_items.menu_item_id'], name=op.f('fk_stock_reservation_menu_item_id_menu_items'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('reservation_id', name=op.f('pk_stock_reservation')),
+    sa.UniqueConstraint('customer_id', 'menu_item_id', name=op.f('uq_stock_reservation_customer_id'))
+    )
+    with op.batch_alter_table('stock_reservation', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stock_reservation_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('stock_reservation', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stock_reservation_expires_at'))
+
+    op.drop_table('stock_reservation')
@@ -0,0 +1,88 @@
+"""integer surrogate keys
+
+Converts every VARCHAR(10) primary key and foreign key (U001, O001, MI001 ...)
+to an INTEGER holding the numeric part. The prefixed form is no longer stored;
+models derive it through BaseModel.format_id / display_id.
+
+Written against SQLite (the project database), where the app's connections
+do not enforce foreign keys: the prefixes are stripped in place first, then
+each table is rebuilt in batch mode with the new column types.
+
+Revision ID: ea7359454474
+Revises: 0b5e1a9c3d20
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ea7359454474'
+down_revision = '0b5e1a9c3d20'
+branch_labels = None
+depends_on = None
+
+
+# table -> [(column, prefix), ...]; primary key first
+KEY_COLUMNS = {
+    'admin': [('admin_id', 'A')],
+    'customer': [('customer_id', 'U')],
+    'address': [('address_id', 'ADD'), ('customer_id', 'U')],
+    'delivery_agent': [('delivery_agent_id', 'DA')],
+    'earnings': [('earnings_id', 'E'), ('delivery_agent_id', 'DA')],
+    'categories': [('category_id', 'IC')],
+    'subcategories': [('subcategory_id', 'ISC'), ('category_id', 'IC')],
+    'menu_items': [('menu_item_id', 'MI'), ('category_id', 'IC'), ('subcategory_id', 'ISC')],
+    'orders': [('order_id', 'O'), ('customer_id', 'U'), ('delivery_agent_id', 'DA')],
+    'order_item': [('order_item_id', 'OI'), ('order_id', 'O'), ('menu_item_id', 'MI')],
+    'delivery_feedback': [('delivery_feedback_id', 'DF'), ('order_id', 'O'), ('delivery_agent_id', 'DA')],
+    'cart': [('cart_id', 'C'), ('customer_id', 'U'), ('menu_item_id', 'MI')],
+}
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table('key_sequence'):
+        op.create_table(
+            'key_sequence',
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('next_value', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('name', name=op.f('pk_key_sequence'))
+        )
+
+    for table, columns in KEY_COLUMNS.items():
+        for column, prefix in columns:
+            op.execute(
+                f"UPDATE {table} SET {column} = SUBSTR({column}, {len(prefix) + 1}) "
+                f"WHERE {column} LIKE '{prefix}%'"
+            )
+
+    for table, columns in KEY_COLUMNS.items():
+        with op.batch_alter_table(table, recreate='always') as batch_op:
+            for column, _ in columns:
+                batch_op.alter_column(
+                    column,
+                    existing_type=sa.String(length=10),
+                    type_=sa.Integer(),
+                )
+
+
+def downgrade():
+    for table, columns in KEY_COLUMNS.items():
+        with op.batch_alter_table(table, recreate='always') as batch_op:
+            for column, _ in columns:
+                batch_op.alter_column(
+                    column,
+                    existing_type=sa.Integer(),
+                    type_=sa.String(length=10),
+                )
+
+    for table, columns in KEY_COLUMNS.items():
+        for column, prefix in columns:
+            op.execute(
+                f"UPDATE {table} SET {column} = printf('{prefix}%03d', CAST({column} AS INTEGER)) "
+                f"WHERE {column} IS NOT NULL"
+            )
@@ -1,6 +1,7 @@
 from flask_login import UserMixin
-from sqlalchemy import func, event, text
+from sqlalchemy import func, event
 from app import db
+from key_allocator import allocate_id
 from datetime import datetime
 
 # Define an abstract base model with our ID generator
@@ -9,24 +10,42 @@ class BaseModel(db.Model):
     PREFIX = None  # each child model must set this
 
     @classmethod
-    def generate_id(cls, connection):
+    def generate_id(cls, connection, target=None):
         """
         Generates a new primary key for the model.
-        It queries the table for the last inserted id, extracts the numeric part,
-        increments it and returns a new id string.
+        The key comes from the hi/lo key allocator, which hands out ids from
+        a block reserved in the key_sequence table instead of reading the
+        last id back from the live table on every insert.
         """
-        # Get the name of the primary key column.
-        pk_field = list(cls.__mapper__.primary_key)[0].name
-        prefix = cls.PREFIX
-        query = text(f"SELECT {pk_field} FROM {cls.__tablename__} ORDER BY {pk_field} DESC LIMIT 1")
-        result = connection.execute(query)
-        last_id = result.scalar()
-        if last_id:
-            numeric_part = int(last_id[len(prefix):])
-            new_numeric = numeric_part + 1
-        else:
-            new_numeric = 1
-        return f"{prefix}{new_numeric:03d}"
+        return allocate_id(cls, connection, target)
+
+    @classmethod
+    def format_id(cls, value):
+        """Returns the prefixed display form of a key, e.g. 7 -> 'O007'."""
+        if value is None:
+            return None
+        return f"{cls.PREFIX}{int(value):03d}"
+
+    @classmethod
+    def parse_id(cls, value):
+        """
+        Accepts either the display form ('O007') or the bare number and
+        returns the integer key, or None if the value is not a valid id.
+        """
+        if value is None or isinstance(value, int):
+            return value
+        value = str(value).strip()
+        if value.upper().startswith(cls.PREFIX):
+            value = value[len(cls.PREFIX):]
+        try:
+            return int(value)
+        except ValueError:
+            return None
+
+    @property
+    def display_id(self):
+        pk_field = list(self.__mapper__.primary_key)[0].name
+        return self.format_id(getattr(self, pk_field))
 
 def set_primary_key(mapper, connection, target):
     """
@@ -35,7 +54,7 @@ def set_primary_key(mapper, connection, target):
     """
     pk_field = list(target.__mapper__.primary_key)[0].name
     if not getattr(target, pk_field):
-        new_id = target.__class__.generate_id(connection)
+        new_id = target.__class__.generate_id(connection, target)
         setattr(target, pk_field, new_id)
 
 # -----------------------------
@@ -46,7 +65,7 @@ def set_primary_key(mapper, connection, target):
 class Admin(UserMixin, BaseModel):
     __tablename__ = 'admin'
     PREFIX = 'A'
-    admin_id = db.Column(db.String(10), primary_key=True)
+    admin_id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(100))
     email = db.Column(db.String(100), unique=True)
     password = db.Column(db.String(100), nullable=False)
@@ -65,7 +84,7 @@ event.listen(Admin, 'before_insert', set_primary_key)
 class Customer(UserMixin, BaseModel):
     __tablename__ = 'customer'
     PREFIX = 'U'
-    customer_id = db.Column(db.String(10), primary_key=True)
+    customer_id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(100))
     email = db.Column(db.String(100), unique=True)
     phone = db.Column(db.Integer, unique=True, nullable=False)
@@ -87,8 +106,8 @@ event.listen(Customer, 'before_insert', set_primary_key)
 class Address(BaseModel):
     __tablename__ = 'address'
     PREFIX = 'ADD'
-    address_id = db.Column(db.String(10), primary_key=True)
-    customer_id = db.Column(db.String(10), db.ForeignKey('customer.customer_id'), nullable=False)
+    address_id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.customer_id'), nullable=False)
     address_line = db.Column(db.String(255), nullable=False)
     city = db.Column(db.String(50), nullable=False)
     state = db.Column(db.String(50), nullable=False)
@@ -106,7 +125,7 @@ event.listen(Address, 'before_insert', set_primary_key)
 class DeliveryAgent(UserMixin, BaseModel):
     __tablename__ = 'delivery_agent'
     PREFIX = 'DA'
-    delivery_agent_id = db.Column(db.String(10), primary_key=True)
+    delivery_agent_id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(100))
     email = db.Column(db.String(100), unique=True)
     phone = db.Column(db.Integer, unique=True, nullable=False)
@@ -135,8 +154,8 @@ event.listen(DeliveryAgent, 'before_insert', set_primary_key)
 class Earnings(BaseModel):
     __tablename__ = 'earnings'
     PREFIX = 'E'
-    earnings_id = db.Column(db.String(10), primary_key=True)
-    delivery_agent_id = db.Column(db.String(10), db.ForeignKey('delivery_agent.delivery_agent_id'), nullable=False)
+    earnings_id = db.Column(db.Integer, primary_key=True)
+    delivery_agent_id = db.Column(db.Integer, db.ForeignKey('delivery_agent.delivery_agent_id'), nullable=False)
     base_pay = db.Column(db.Float, nullable=False, default=0.0)
     bonus = db.Column(db.Float, nullable=False, default=0.0)
     trips_count = db.Column(db.Integer, nullable=False, default=0)
@@ -144,6 +163,10 @@ class Earnings(BaseModel):
 
     delivery_agent = db.relationship("DeliveryAgent", back_populates="earnings")
 
+    __table_args__ = (
+        db.Index("ix_earnings_agent_earned_at", "delivery_agent_id", "earned_at"),
+    )
+
     def __repr__(self):
         return f'<Earnings {self.delivery_agent_id} - {self.earned_at}>'
 
@@ -153,9 +176,9 @@ event.listen(Earnings, 'before_insert', set_primary_key)
 class DeliveryFeedback(BaseModel):
     __tablename__ = 'delivery_feedback'
     PREFIX = 'DF'
-    delivery_feedback_id = db.Column(db.String(10), primary_key=True)
-    order_id = db.Column(db.String(10), db.ForeignKey('orders.order_id'), nullable=False)
-    delivery_agent_id = db.Column(db.String(10), db.ForeignKey('delivery_agent.delivery_agent_id'), nullable=False)
+    delivery_feedback_id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.order_id'), nullable=False)
+    delivery_agent_id = db.Column(db.Integer, db.ForeignKey('delivery_agent.delivery_agent_id'), nullable=False)
     rating = db.Column(db.Integer, nullable=False)
     feedback = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=func.now)
@@ -163,6 +186,11 @@ class DeliveryFeedback(BaseModel):
     order = db.relationship("Order", back_populates="delivery_feedbacks")
     delivery_agent = db.relationship("DeliveryAgent", back_populates="delivery_feedbacks")
 
+    __table_args__ = (
+        db.Index("ix_delivery_feedback_agent_rating", "delivery_agent_id", "rating"),
+        db.Index("ix_delivery_feedback_order_id", "order_id"),
+    )
+
     def __repr__(self):
         return f'<DeliveryFeedback Order:{self.order_id} Agent:{self.delivery_agent_id} Rating:{self.rating}>'
 
@@ -172,7 +200,7 @@ event.listen(DeliveryFeedback, 'before_insert', set_primary_key)
 class Category(BaseModel):
     __tablename__ = "categories"
     PREFIX = 'IC'
-    category_id = db.Column(db.String(10), primary_key=True)
+    category_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
 
     menu_items = db.relationship("MenuItem", back_populates="category")
@@ -183,9 +211,9 @@ event.listen(Category, 'before_insert', set_primary_key)
 class Subcategory(BaseModel):
     __tablename__ = "subcategories"
     PREFIX = 'ISC'
-    subcategory_id = db.Column(db.String(10), primary_key=True)
+    subcategory_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
-    category_id = db.Column(db.String(10), db.ForeignKey("categories.category_id", ondelete="CASCADE"), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey("categories.category_id", ondelete="CASCADE"), nullable=False)
 
     menu_items = db.relationship("MenuItem", back_populates="subcategory")
 
@@ -195,41 +223,130 @@ event.listen(Subcategory, 'before_insert', set_primary_key)
 class MenuItem(BaseModel):
     __tablename__ = "menu_items"
     PREFIX = 'MI'
-    menu_item_id = db.Column(db.String(10), primary_key=True)
+    menu_item_id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False, unique=True)
     description = db.Column(db.Text, nullable=False)
     price = db.Column(db.DECIMAL(10, 2), nullable=False)
     image_url = db.Column(db.String(500), nullable=False)
-    category_id = db.Column(db.String(10), db.ForeignKey("categories.category_id", ondelete="CASCADE"), nullable=False)
-    subcategory_id = db.Column(db.String(10), db.ForeignKey("subcategories.subcategory_id", ondelete="CASCADE"), nullable=False)
+    image_key = db.Column(db.String(64), nullable=True)  # content hash naming the resized variants (see image_pipeline)
+    category_id = db.Column(db.Integer, db.ForeignKey("categories.category_id", ondelete="CASCADE"), nullable=False)
+    subcategory_id = db.Column(db.Integer, db.ForeignKey("subcategories.subcategory_id", ondelete="CASCADE"), nullable=False)
     nutrient_value = db.Column(db.String(255), nullable=False)
     calorie_count = db.Column(db.Integer, nullable=False)
     is_best_seller = db.Column(db.Boolean, default=False)
     is_out_of_stock = db.Column(db.Boolean, default=False)
     discount_percentage = db.Column(db.DECIMAL(5, 2), nullable=True)
     stock_available = db.Column(db.Integer, default=100)
-    scheduled_update_time = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
-    pending_update = db.Column(db.Text, nullable=True)  # JSON string for pending changes
 
     category = db.relationship("Category", back_populates="menu_items")
     subcategory = db.relationship("Subcategory", back_populates="menu_items")
     order_items = db.relationship("OrderItem", back_populates="menu_item")
     cart_items = db.relationship("Cart", back_populates="menu_item")
+    scheduled_changes = db.relationship("ScheduledChange", back_populates="menu_item", cascade="all, delete-orphan")
 
     def __repr__(self):
         return f'<MenuItem {self.name}, Price: {self.price}>'
 
 event.listen(MenuItem, 'before_insert', set_primary_key)
 
+# ScheduledChange Model
+class ScheduledChange(BaseModel):
+    """
+    A change to a menu item that takes effect at due_at. Columns left NULL
+    keep their current value. An item can have any number of pending changes;
+    the scheduler applies them in due_at order and marks them Applied.
+    """
+    __tablename__ = "scheduled_change"
+    PREFIX = 'SC'
+    change_id = db.Column(db.Integer, primary_key=True)
+    menu_item_id = db.Column(db.Integer, db.ForeignKey("menu_items.menu_item_id", ondelete="CASCADE"), nullable=False)
+    due_at = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.Enum("Pending", "Applied", "Cancelled", name="scheduled_change_status"), nullable=False, default="Pending")
+    name = db.Column(db.String(255), nullable=True)
+    description = db.Column(db.Text, nullable=True)
+    price = db.Column(db.DECIMAL(10, 2), nullable=True)
+    category_id = db.Column(db.Integer, db.ForeignKey("categories.category_id", ondelete="SET NULL"), nullable=True)
+    subcategory_id = db.Column(db.Integer, db.ForeignKey("subcategories.subcategory_id", ondelete="SET NULL"), nullable=True)
+    discount_percentage = db.Column(db.DECIMAL(5, 2), nullable=True)
+    is_best_seller = db.Column(db.Boolean, nullable=True)
+    stock_available = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=True)
+
+    menu_item = db.relationship("MenuItem", back_populates="scheduled_changes")
+    category = db.relationship("Category")
+    subcategory = db.relationship("Subcategory")
+
+    # the MenuItem columns a change can set
+    FIELDS = ("name", "description", "price", "category_id", "subcategory_id",
+              "discount_percentage", "is_best_seller", "stock_available")
+
+    __table_args__ = (
+        # the scheduler's due lookup and the upcoming-changes listing read only this index
+        db.Index("ix_scheduled_change_status_due_at", "status", "due_at"),
+        db.Index("ix_scheduled_change_menu_item_id", "menu_item_id", "status"),
+    )
+
+    def changes(self):
+        """The columns this change sets, with their new values."""
+        return {field: getattr(self, field) for field in self.FIELDS if getattr(self, field) is not None}
+
+    def __repr__(self):
+        return f'<ScheduledChange {self.menu_item_id} at {self.due_at} ({self.status})>'
+
+event.listen(ScheduledChange, 'before_insert', set_primary_key)
+
+# ScheduledRule Model
+class ScheduledRule(BaseModel):
+    """
+    A price or discount change for every menu item matching a filter, applied
+    at due_at with one UPDATE. The filter columns that are set are ANDed
+    together; a rule with none of them set applies to the whole menu.
+    """
+    __tablename__ = "scheduled_rule"
+    PREFIX = 'RU'
+    rule_id = db.Column(db.Integer, primary_key=True)
+    due_at = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.Enum("Pending", "Applied", "Cancelled", name="scheduled_rule_status"), nullable=False, default="Pending")
+    field = db.Column(db.Enum("price", "discount_percentage", name="scheduled_rule_field"), nullable=False)
+    # percent: scale by value %, absolute: add value (may be negative), set: replace with value
+    operation = db.Column(db.Enum("percent", "absolute", "set", name="scheduled_rule_operation"), nullable=False)
+    value = db.Column(db.DECIMAL(10, 2), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey("categories.category_id", ondelete="CASCADE"), nullable=True)
+    subcategory_id = db.Column(db.Integer, db.ForeignKey("subcategories.subcategory_id", ondelete="CASCADE"), nullable=True)
+    is_best_seller = db.Column(db.Boolean, nullable=True)
+    min_price = db.Column(db.DECIMAL(10, 2), nullable=True)
+    max_price = db.Column(db.DECIMAL(10, 2), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=True)
+    items_updated = db.Column(db.Integer, nullable=True)
+
+    category = db.relationship("Category")
+    subcategory = db.relationship("Subcategory")
+
+    __table_args__ = (
+        db.Index("ix_scheduled_rule_status_due_at", "status", "due_at"),
+    )
+
+    def __repr__(self):
+        return f'<ScheduledRule {self.operation} {self.field} {self.value} at {self.due_at} ({self.status})>'
+
+event.listen(ScheduledRule, 'before_insert', set_primary_key)
+
 # Order Model
 class Order(BaseModel):
     __tablename__ = "orders"
     PREFIX = 'O'
-    order_id = db.Column(db.String(10), primary_key=True)
-    customer_id = db.Column(db.String(10), db.ForeignKey("customer.customer_id", ondelete="CASCADE"), nullable=False)
-    delivery_agent_id = db.Column(db.String(10), db.ForeignKey("delivery_agent.delivery_agent_id", ondelete="SET NULL"), nullable=True)
+    order_id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey("customer.customer_id", ondelete="CASCADE"), nullable=False)
+    delivery_agent_id = db.Column(db.Integer, db.ForeignKey("delivery_agent.delivery_agent_id", ondelete="SET NULL"), nullable=True)
     delivery_status = db.Column(db.Enum("Pending", "Preparing","Accepted","Picked Up","Out for Delivery", "Delivered", "Cancelled","Refunded","Declined", name="order_status"), nullable=False, default="Pending")
     total_price = db.Column(db.DECIMAL(10, 2), nullable=False)
+    # price breakdown as quoted at checkout (see pricing.Quote): total_price = subtotal - discount + tax + delivery_charge
+    subtotal = db.Column(db.DECIMAL(10, 2), nullable=False)
+    discount = db.Column(db.DECIMAL(10, 2), nullable=False)
+    tax = db.Column(db.DECIMAL(10, 2), nullable=False)
+    delivery_charge = db.Column(db.DECIMAL(10, 2), nullable=False)
     delivery_location = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     delivered_at = db.Column(db.DateTime, nullable=True)
@@ -240,6 +357,13 @@ class Order(BaseModel):
     order_items = db.relationship("OrderItem", back_populates="order")
     delivery_feedbacks = db.relationship("DeliveryFeedback", back_populates="order")
 
+    __table_args__ = (
+        db.Index("ix_orders_agent_status", "delivery_agent_id", "delivery_status"),
+        db.Index("ix_orders_customer_created_at", "customer_id", "created_at"),
+        db.Index("ix_orders_delivery_status", "delivery_status"),
+        db.Index("ix_orders_created_at", "created_at"),
+    )
+
     def __repr__(self):
         return f'<Order {self.order_id}, Status: {self.status}>'
 
@@ -249,15 +373,19 @@ event.listen(Order, 'before_insert', set_primary_key)
 class OrderItem(BaseModel):
     __tablename__ = "order_item"
     PREFIX = 'OI'
-    order_item_id = db.Column(db.String(10), primary_key=True)
-    order_id = db.Column(db.String(10), db.ForeignKey("orders.order_id", ondelete="CASCADE"), nullable=False)
-    menu_item_id = db.Column(db.String(10), db.ForeignKey("menu_items.menu_item_id", ondelete="CASCADE"), nullable=False)
+    order_item_id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey("orders.order_id", ondelete="CASCADE"), nullable=False)
+    menu_item_id = db.Column(db.Integer, db.ForeignKey("menu_items.menu_item_id", ondelete="CASCADE"), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     price = db.Column(db.DECIMAL(10, 2), nullable=False)
 
     order = db.relationship("Order", back_populates="order_items")
     menu_item = db.relationship("MenuItem", back_populates="order_items")
 
+    __table_args__ = (
+        db.Index("ix_order_item_order_id", "order_id"),
+    )
+
     def __repr__(self):
         return f'<OrderItem {self.order_item_id}, Order: {self.order_id}, Item: {self.menu_item_id}>'
 
@@ -267,13 +395,82 @@ event.listen(OrderItem, 'before_insert', set_primary_key)
 class Cart(BaseModel):
     __tablename__ = "cart"
     PREFIX = 'C'
-    cart_id = db.Column(db.String(10), primary_key=True)
-    customer_id = db.Column(db.String(10), db.ForeignKey("customer.customer_id", ondelete="CASCADE"), nullable=False)
-    menu_item_id = db.Column(db.String(10), db.ForeignKey("menu_items.menu_item_id", ondelete="CASCADE"), nullable=False)
+    cart_id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey("customer.customer_id", ondelete="CASCADE"), nullable=False)
+    menu_item_id = db.Column(db.Integer, db.ForeignKey("menu_items.menu_item_id", ondelete="CASCADE"), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     added_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     customer = db.relationship("Customer", back_populates="cart_items")
     menu_item = db.relationship("MenuItem", back_populates="cart_items")
 
+    __table_args__ = (
+        # one line per item; cart writes upsert against it (see routes/cart_utils.py)
+        db.UniqueConstraint("customer_id", "menu_item_id"),
+    )
+
 event.listen(Cart, 'before_insert', set_primary_key)
+
+# StockReservation Model
+class StockReservation(BaseModel):
+    """Stock held for a customer between delivery_details and checkout."""
+    __tablename__ = "stock_reservation"
+    PREFIX = 'SR'
+    reservation_id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey("customer.customer_id", ondelete="CASCADE"), nullable=False)
+    menu_item_id = db.Column(db.Integer, db.ForeignKey("menu_items.menu_item_id", ondelete="CASCADE"), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint("customer_id", "menu_item_id"),
+    )
+
+    def __repr__(self):
+        return f'<StockReservation {self.customer_id} x{self.quantity} of {self.menu_item_id}>'
+
+event.listen(StockReservation, 'before_insert', set_primary_key)
+
+# Archive tables: orders past the archival horizon are moved here in chunks
+# (see routes/archive_utils.py) so the live order tables stay small. Same columns
+# as the live tables, without foreign keys, so archived rows never block deletes.
+orders_archive = db.Table(
+    "orders_archive",
+    db.Column("order_id", db.Integer, primary_key=True),
+    db.Column("customer_id", db.Integer, nullable=False),
+    db.Column("delivery_agent_id", db.Integer, nullable=True),
+    db.Column("delivery_status", db.String(20), nullable=False),
+    db.Column("total_price", db.DECIMAL(10, 2), nullable=False),
+    db.Column("subtotal", db.DECIMAL(10, 2), nullable=False),
+    db.Column("discount", db.DECIMAL(10, 2), nullable=False),
+    db.Column("tax", db.DECIMAL(10, 2), nullable=False),
+    db.Column("delivery_charge", db.DECIMAL(10, 2), nullable=False),
+    db.Column("delivery_location", db.Text, nullable=False),
+    db.Column("created_at", db.DateTime, nullable=False),
+    db.Column("delivered_at", db.DateTime, nullable=True),
+    db.Column("order_feedback", db.Integer, nullable=True),
+    db.Index("ix_orders_archive_customer_created_at", "customer_id", "created_at"),
+    db.Index("ix_orders_archive_created_at", "created_at"),
+)
+
+order_item_archive = db.Table(
+    "order_item_archive",
+    db.Column("order_item_id", db.Integer, primary_key=True),
+    db.Column("order_id", db.Integer, nullable=False),
+    db.Column("menu_item_id", db.Integer, nullable=False),
+    db.Column("quantity", db.Integer, nullable=False),
+    db.Column("price", db.DECIMAL(10, 2), nullable=False),
+    db.Index("ix_order_item_archive_order_id", "order_id"),
+)
+
+delivery_feedback_archive = db.Table(
+    "delivery_feedback_archive",
+    db.Column("delivery_feedback_id", db.Integer, primary_key=True),
+    db.Column("order_id", db.Integer, nullable=False),
+    db.Column("delivery_agent_id", db.Integer, nullable=False),
+    db.Column("rating", db.Integer, nullable=False),
+    db.Column("feedback", db.Text, nullable=True),
+    db.Column("created_at", db.DateTime, nullable=True),
+    db.Index("ix_delivery_feedback_archive_agent_rating", "delivery_agent_id", "rating"),
+    db.Index("ix_delivery_feedback_archive_order_id", "order_id"),
+)
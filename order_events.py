@@ -0,0 +1,214 @@
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.orm import Session
+
+from app import db
+from data_versions import ORDERS, current_versions
+from models import Order, orders_archive
+
+# Every status an order moves to, written in the same transaction as the move, so a stream
+# that reconnects can be sent what it missed and a worker sees the changes made by the others.
+order_event = db.Table(
+    'order_event',
+    db.Column('event_id', db.Integer, primary_key=True, autoincrement=True),
+    db.Column('order_id', db.Integer, nullable=False),
+    db.Column('delivery_status', db.String(20), nullable=False),
+    db.Column('created_at', db.DateTime, nullable=False),
+    db.Index('ix_order_event_order_id_event_id', 'order_id', 'event_id'),
+)
+
+
+class StreamLimitReached(Exception):
+    pass
+
+
+def record_status_change(order):
+    """Records the order's new delivery_status inside the caller's transaction; it is pushed once the caller commits."""
+    created_at = datetime.utcnow()
+    result = db.session.execute(insert(order_event).values(
+        order_id=order.order_id,
+        delivery_status=order.delivery_status,
+        created_at=created_at,
+    ))
+    db.session.info.setdefault('order_events', []).append({
+        'event_id': result.inserted_primary_key[0],
+        'order_id': order.order_id,
+        'delivery_status': order.delivery_status,
+        'created_at': created_at,
+    })
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_order_events(session):
+    events = session.info.pop('order_events', None)
+    if events:
+        bus = current_app.extensions.get('order_event_bus')
+        if bus is not None:
+            for change in events:
+                bus.publish(change)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_order_events(session):
+    session.info.pop('order_events', None)
+
+
+def events_after_query(order_id, event_id):
+    return (
+        select(order_event)
+        .where(order_event.c.order_id == order_id, order_event.c.event_id > event_id)
+        .order_by(order_event.c.event_id)
+    )
+
+
+def events_after(order_id, event_id):
+    """The order's recorded changes after event_id, oldest first."""
+    return db.session.execute(events_after_query(order_id, event_id)).mappings().all()
+
+
+def current_status(order_id):
+    """(latest event_id, delivery_status) of an order, live or archived, or None if there is no such order."""
+    latest = select(func.max(order_event.c.event_id)).where(order_event.c.order_id == order_id).scalar_subquery()
+    for orders in (Order.__table__, orders_archive):
+        row = db.session.execute(
+            select(latest, orders.c.delivery_status).where(orders.c.order_id == order_id)
+        ).first()
+        if row is not None:
+            return row[0] or 0, row[1]
+    return None
+
+
+class OrderEventBus:
+    """
+    Hands the status changes committed in this process to the streams
+    watching those orders, one queue per stream. publish() never blocks, so
+    a slow client cannot hold up the request that changed the order. Every
+    open stream keeps a worker thread, so at most max_streams are let in.
+    """
+
+    def __init__(self, max_streams=200):
+        self.max_streams = max_streams
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)  # order_id -> {queue}
+        self._streams = 0
+        self.published = 0
+        self.delivered = 0
+        self.refused = 0
+
+    def subscribe(self, order_id):
+        with self._lock:
+            if self._streams >= self.max_streams:
+                self.refused += 1
+                raise StreamLimitReached(f"{self.max_streams} order streams are already open")
+            subscription = queue.SimpleQueue()
+            self._subscribers[order_id].add(subscription)
+            self._streams += 1
+            return subscription
+
+    def unsubscribe(self, order_id, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(order_id)
+            if subscribers and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._streams -= 1
+                if not subscribers:
+                    del self._subscribers[order_id]
+
+    def publish(self, change):
+        with self._lock:
+            subscribers = list(self._subscribers.get(change['order_id'], ()))
+            self.published += 1
+            self.delivered += len(subscribers)
+        for subscription in subscribers:
+            subscription.put(change)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'streams': self._streams,
+                'max_streams': self.max_streams,
+                'orders_watched': len(self._subscribers),
+                'published': self.published,
+                'delivered': self.delivered,
+                'refused': self.refused,
+            }
+
+
+def order_event_bus():
+    return current_app.extensions['order_event_bus']
+
+
+def _sse(event_name, data, event_id=None):
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event_name}", f"data: {json.dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+def order_status_stream(app, order_id, subscription, last_event_id=None):
+    """
+    The text/event-stream body for one order, given a subscription taken out
+    before anything is read, so no change committed in between is missed.
+
+    A new stream is sent the order's current status; one reconnecting with a
+    Last-Event-ID is sent only the changes recorded after it. Changes made in
+    this process then arrive through the bus. When none has come for
+    heartbeat seconds a comment is sent, which keeps proxies from closing the
+    idle connection, and if the orders version has moved meanwhile the event
+    table is read, which brings in the changes made by other workers. The
+    stream ends once the order is finished, or after max_seconds, when the
+    browser reconnects with the id of the last event it saw.
+    """
+    from routes.archive_utils import FINISHED_STATUSES
+
+    heartbeat = app.config['ORDER_STREAM_HEARTBEAT_SECONDS']
+    deadline = time.monotonic() + app.config['ORDER_STREAM_MAX_SECONDS']
+    formatted_id = Order.format_id(order_id)
+
+    def read(*queries):
+        with app.app_context():
+            try:
+                return [query() for query in queries]
+            finally:
+                db.session.remove()
+
+    yield f"retry: {app.config['ORDER_STREAM_RETRY_MS']}\n\n"
+    version, current, changes = read(
+        lambda: current_versions(ORDERS)[0],
+        lambda: current_status(order_id),
+        lambda: events_after(order_id, last_event_id) if last_event_id is not None else [],
+    )
+    if current is None:  # no such order
+        yield _sse('end', {'order_id': formatted_id})
+        return
+    if last_event_id is None:
+        sent, status = current
+        yield _sse('status', {'order_id': formatted_id, 'delivery_status': status}, sent)
+    else:
+        sent, status = last_event_id, current[1]
+
+    while True:
+        for change in changes:
+            if change['event_id'] > sent:
+                sent, status = change['event_id'], change['delivery_status']
+                yield _sse('status', {'order_id': formatted_id, 'delivery_status': status}, sent)
+        if status in FINISHED_STATUSES:
+            yield _sse('end', {'order_id': formatted_id})
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        try:
+            changes = [subscription.get(timeout=min(heartbeat, remaining))]
+        except queue.Empty:
+            yield ": heartbeat\n\n"
+            latest, = read(lambda: current_versions(ORDERS)[0])
+            changes = []
+            if latest != version:
+                version, changes = read(lambda: current_versions(ORDERS)[0], lambda: events_after(order_id, sent))
@@ -0,0 +1,177 @@
+import threading
+from collections import OrderedDict
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from data_versions import MENU, cart_key, version_cache, version_subquery
+from models import Cart, MenuItem
+
+TAX_RATE = Decimal("0.18")
+DELIVERY_CHARGE = Decimal("50.00")
+PAISE = Decimal("0.01")
+
+# the columns of an order that hold its price breakdown, as written at checkout
+BREAKDOWN_FIELDS = ("subtotal", "discount", "tax", "delivery_charge", "total_price")
+
+
+class PricingError(ValueError):
+    pass
+
+
+def money(value):
+    """A Decimal rounded to paise, half up, as bills are."""
+    try:
+        return Decimal(str(value)).quantize(PAISE, rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise PricingError(f"not an amount: {value!r}")
+
+
+class Quote:
+    """
+    What a cart costs, worked out once from its lines: every line's amount
+    and discount rounded to paise, 18% tax on what is left after discounts,
+    and the delivery charge. `lines` are rows with cart_id, menu_item_id,
+    name, price, quantity and discount_percentage.
+
+    `version` and `menu_version` are the cart and menu versions the lines
+    were read at; the quote holds for as long as neither moves.
+    """
+
+    def __init__(self, lines, version, menu_version):
+        self.lines = lines
+        self.version = version
+        self.menu_version = menu_version
+        subtotal = discount = Decimal("0.00")
+        for line in lines:
+            amount = money(line.price * line.quantity)
+            subtotal += amount
+            discount += money(amount * (line.discount_percentage or 0) / 100)
+        self.subtotal = subtotal
+        self.discount = discount
+        self.tax = money((subtotal - discount) * TAX_RATE)
+        self.delivery_charge = DELIVERY_CHARGE
+        self.total = subtotal - discount + self.tax + self.delivery_charge
+
+    @property
+    def net(self):
+        """The item total after discounts, which the pages show as the subtotal."""
+        return self.subtotal - self.discount
+
+    def breakdown(self):
+        """The Order columns for this quote."""
+        return dict(zip(BREAKDOWN_FIELDS, (self.subtotal, self.discount, self.tax, self.delivery_charge, self.total)))
+
+    def cart_data(self):
+        """The lines as the order and delivery pages render them."""
+        return [
+            {
+                'cart_id': Cart.format_id(line.cart_id),
+                'menu_item_id': MenuItem.format_id(line.menu_item_id),
+                'name': line.name,
+                'price': float(line.price),
+                'quantity': line.quantity,
+                'discount_percentage': float(line.discount_percentage) if line.discount_percentage else 0,
+            }
+            for line in self.lines
+        ]
+
+
+def cart_lines_query(customer_id):
+    return (
+        select(
+            Cart.cart_id,
+            Cart.menu_item_id,
+            Cart.quantity,
+            MenuItem.name,
+            MenuItem.price,
+            MenuItem.discount_percentage,
+        )
+        .join(MenuItem, Cart.menu_item_id == MenuItem.menu_item_id)
+        .where(Cart.customer_id == customer_id)
+        .order_by(Cart.cart_id)
+    )
+
+
+def _load_lines(customer_id):
+    return db.session.execute(cart_lines_query(customer_id)).all()
+
+
+class QuoteCache:
+    """
+    The latest quote of the customers who are checking out, so the order
+    page, the delivery details page and checkout price the cart once
+    between them. A quote is reused while the cart and menu versions it was
+    read at are current, checked through data_versions.VersionCache; the
+    least recently used one goes once there are max_entries.
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._quotes = OrderedDict()  # customer_id -> Quote
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, customer_id, version, menu_version):
+        with self._lock:
+            quote = self._quotes.get(customer_id)
+            if quote is not None and (quote.version, quote.menu_version) == (version, menu_version):
+                self._quotes.move_to_end(customer_id)
+                self.hits += 1
+                return quote
+            self.misses += 1
+            return None
+
+    def _put(self, customer_id, quote):
+        with self._lock:
+            self._quotes[customer_id] = quote
+            self._quotes.move_to_end(customer_id)
+            while len(self._quotes) > self.max_entries:
+                self._quotes.popitem(last=False)
+
+    def quote(self, customer_id):
+        """The customer's quote as of the versions this process last saw."""
+        version, menu_version = version_cache.get(cart_key(customer_id), MENU)  # read before the lines
+        quote = self._cached(customer_id, version, menu_version)
+        if quote is None:
+            quote = Quote(_load_lines(customer_id), version, menu_version)
+            self._put(customer_id, quote)
+        return quote
+
+    def checkout_quote(self, customer_id):
+        """
+        The customer's quote as of the caller's transaction, for checkout: the
+        versions are read from the database, and the cached quote is used only
+        if it was read at exactly those.
+        """
+        version, menu_version = db.session.execute(
+            select(version_subquery(cart_key(customer_id)), version_subquery(MENU))
+        ).one()
+        version, menu_version = version or 0, menu_version or 0
+        quote = self._cached(customer_id, version, menu_version)
+        if quote is None:
+            quote = Quote(_load_lines(customer_id), version, menu_version)
+        return quote
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._quotes),
+                "max_entries": self.max_entries,
+                "requests": requests,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / requests, 4) if requests else None,
+            }
+
+
+def quote_cache():
+    return current_app.extensions["quote_cache"]
+
+
+def cart_quote(customer_id):
+    return quote_cache().quote(customer_id)
@@ -1,7 +1,7 @@
 import base64
 import datetime
 import io
-from flask import flash, jsonify, redirect, render_template, request, redirect, url_for
+from flask import Response, flash, jsonify, redirect, render_template, request, redirect, stream_with_context, url_for
 from flask_login import current_user, login_required
 from matplotlib import pyplot as plt
 import pandas as pd
@@ -10,10 +10,22 @@ import seaborn as sns
 import matplotlib.dates as mdates
 import plotly.express as px
 from datetime import datetime, timedelta, timezone
-import os
 import json
 
-from models import Address, MenuItem, Category, Subcategory, Customer, DeliveryAgent, Order, OrderItem
+from analytics_db import analytics_session, analytics_tag
+from blob_store import BlobTooLarge, blob_store
+from cart_summary import cart_summaries
+from catalog_cache import menu_catalog
+from data_versions import MENU, ORDERS, bump_version, current_versions
+from http_cache import conditional, conditional_response
+from image_pipeline import ImageError, menu_image_name, process_blob, variant_urls
+from update_scheduler import notify_scheduled
+from models import Address, MenuItem, Category, Subcategory, Customer, DeliveryAgent, Order, OrderItem, ScheduledChange, ScheduledRule
+from order_events import order_event_bus, record_status_change
+from pricing import quote_cache
+from routes.archive_utils import all_orders
+from routes.menu_io import FORMATS, MenuImporter, export_menu, guess_format, read_rows
+from routes.schedule_utils import count_rule_items, lookup_category_id, lookup_subcategory_id, rule_number
 from routes.insight_utils import (
     calculate_average_delivery_time,
     calculate_delivery_partner_performance,
@@ -36,25 +48,29 @@ def admin_routes(app, db):
         if not current_user.is_authenticated:
             return redirect(url_for('employee_login'))
         
+        # Dashboard figures come from the read-only analytics bind
+        reports = analytics_session()
+        history = all_orders()  # live and archived orders
+
         # Aggregated order data by date for sales chart
-        orders = db.session.query(
-            func.date(Order.created_at).label("order_date"),
-            func.sum(Order.total_price).label("total_sales")
-        ).group_by(func.date(Order.created_at))\
-         .order_by(func.date(Order.created_at))\
+        orders = reports.query(
+            func.date(history.c.created_at).label("order_date"),
+            func.sum(history.c.total_price).label("total_sales")
+        ).group_by(func.date(history.c.created_at))\
+         .order_by(func.date(history.c.created_at))\
          .all()
         
         # Total orders count using proper primary key
-        total_orders = db.session.query(func.count(Order.order_id)).scalar()
+        total_orders = reports.query(func.count(history.c.order_id)).scalar()
         
         # Total users count (assuming customers represent users)
-        total_users = db.session.query(func.count(Customer.customer_id)).scalar()
+        total_users = reports.query(func.count(Customer.customer_id)).scalar()
         
         # Overall total sales from all orders
-        overall_total_sales = db.session.query(func.coalesce(func.sum(Order.total_price), 0)).scalar()
+        overall_total_sales = reports.query(func.coalesce(func.sum(history.c.total_price), 0)).scalar()
         
         # Total delivery partners count using proper primary key
-        delivery_partners = db.session.query(func.count(DeliveryAgent.delivery_agent_id)).scalar()
+        delivery_partners = reports.query(func.count(DeliveryAgent.delivery_agent_id)).scalar()
         
         # Query recent orders (limit to last 10 orders)
         recent_orders = Order.query.order_by(desc(Order.created_at)).limit(10).all()
@@ -115,7 +131,7 @@ def admin_routes(app, db):
     
     @app.route('/admin/accept/<string:id>', methods=['POST'])
     def accept_agent(id):
-        agent = DeliveryAgent.query.get(id)
+        agent = DeliveryAgent.query.get(DeliveryAgent.parse_id(id))
         if not agent:
             flash("Agent not found")
             return jsonify({"message": "Agent not found"}), 404
@@ -128,7 +144,7 @@ def admin_routes(app, db):
 
     @app.route('/admin/reject/<string:id>', methods=['POST'])
     def reject_agent(id):
-        agent = DeliveryAgent.query.get(id)
+        agent = DeliveryAgent.query.get(DeliveryAgent.parse_id(id))
         if not agent:
             flash("Agent not found")
             return jsonify({"message": "Agent not found"}), 404
@@ -142,7 +158,7 @@ def admin_routes(app, db):
     
     @app.route('/admin/deactivate/<string:id>', methods=['POST'])
     def deactivate_agent(id):
-        agent = DeliveryAgent.query.get(id)
+        agent = DeliveryAgent.query.get(DeliveryAgent.parse_id(id))
         if not agent:
             flash("Agent not found")
             return jsonify({"message": "Agent not found"}), 404
@@ -153,7 +169,7 @@ def admin_routes(app, db):
 
     @app.route('/admin/activate/<string:id>', methods=['POST'])
     def activate_agent(id):
-        agent = DeliveryAgent.query.get(id)
+        agent = DeliveryAgent.query.get(DeliveryAgent.parse_id(id))
         if not agent:
             flash("Agent not found")
             return jsonify({"message": "Agent not found"}), 404
@@ -258,9 +274,11 @@ def admin_routes(app, db):
         return_refund_percentage = calculate_return_refund_statistics()
         on_time_order_percentage = calculate_on_time_order_percentage()
         revenue_per_delivery = calculate_revenue_per_delivery()
-        delivered_orders = db.session.query(func.count(Order.order_id)).filter(Order.delivery_status == "Delivered").scalar()
-        total_revenue = db.session.query(func.sum(Order.total_price)).scalar() or 0.0
-        total_orders = db.session.query(func.count(Order.order_id)).scalar()
+        reports = analytics_session()
+        history = all_orders()
+        delivered_orders = reports.query(func.count(history.c.order_id)).filter(history.c.delivery_status == "Delivered").scalar()
+        total_revenue = reports.query(func.sum(history.c.total_price)).scalar() or 0.0
+        total_orders = reports.query(func.count(history.c.order_id)).scalar()
             
         
         
@@ -289,12 +307,12 @@ def admin_routes(app, db):
                 avg_rating = None
             
             recent_orders_list.append({
-                'order_id': order.order_id,
+                'order_id': order.display_id,
                 'customer_name': order.customer.username if order.customer else 'N/A',
                 'status': order.delivery_status,
                 'total_price': float(order.total_price),
                 'created_at': order.created_at.isoformat(),
-                'delivery_agent_id': order.delivery_agent_id or 'Not Assigned',
+                'delivery_agent_id': DeliveryAgent.format_id(order.delivery_agent_id) or 'Not Assigned',
                 'order_items': order_items_list,
                 'avg_feedback': avg_rating  # Average rating from delivery feedbacks, if any
             })
@@ -324,41 +342,9 @@ def admin_routes(app, db):
         if not current_user.is_authenticated:
             return redirect(url_for('employee_login'))
         try:
-            # Query MenuItem with joins to Category and Subcategory
-            items = (
-                db.session.query(MenuItem, Category, Subcategory)
-                .join(Category, MenuItem.category_id == Category.category_id)
-                .join(Subcategory, MenuItem.subcategory_id == Subcategory.subcategory_id)
-                .all()
-            )
-
-            # Format the results into a list of dictionaries
-            items_list = [
-                {
-                    "menu_item_id": item.MenuItem.menu_item_id,
-                    "name": item.MenuItem.name,
-                    "description": item.MenuItem.description,
-                    "price": float(item.MenuItem.price),  # Convert DECIMAL to float for JSON
-                    "category_name": item.Category.name,
-                    "subcategory_name": item.Subcategory.name,
-                    "nutrient_value": item.MenuItem.nutrient_value,
-                    "calorie_count": item.MenuItem.calorie_count,
-                    "discount_percentage": float(item.MenuItem.discount_percentage) if item.MenuItem.discount_percentage else 0.0,
-                    "image_url": item.MenuItem.image_url,
-                    "is_best_seller": item.MenuItem.is_best_seller,
-                    "is_out_of_stock": item.MenuItem.is_out_of_stock,
-                    "stock_available": item.MenuItem.stock_available,
-                    "scheduled_update_time": (
-                        item.MenuItem.scheduled_update_time.isoformat()
-                        if item.MenuItem.scheduled_update_time else None
-                    ),  # Handle None explicitly
-                    "pending_update": item.MenuItem.pending_update  # Include pending_update field
-                }
-                for item in items
-            ]
-
-            # Return JSON response
-            return jsonify(items_list), 200
+            # Served from the menu catalog cache; rebuilt only when the menu version moves
+            etag, payload = menu_catalog().get("admin")
+            return conditional_response(etag, payload)
 
         except Exception as e:
             db.session.rollback()
@@ -384,22 +370,27 @@ def admin_routes(app, db):
                     MenuItem.image_url,
                     MenuItem.is_best_seller,
                     MenuItem.stock_available,
-                    MenuItem.scheduled_update_time,
                     Category.name.label("category_name"),
                     Subcategory.name.label("subcategory_name")
                 )
                 .join(Category, MenuItem.category_id == Category.category_id, isouter=True)  # Left join for optional category
                 .join(Subcategory, MenuItem.subcategory_id == Subcategory.subcategory_id, isouter=True)  # Left join for optional subcategory
-                .filter(MenuItem.menu_item_id == menu_item_id)
+                .filter(MenuItem.menu_item_id == MenuItem.parse_id(menu_item_id))
                 .first()
             )
 
             if not item:
                 return jsonify({"error": "Item not found"}), 404  # Return 404 if item doesn't exist
 
+            scheduled_update_time = (
+                db.session.query(func.min(ScheduledChange.due_at))
+                .filter(ScheduledChange.menu_item_id == item.menu_item_id, ScheduledChange.status == "Pending")
+                .scalar()
+            )
+
             # Format the response data
             response_data = {
-                "menu_item_id": item.menu_item_id,
+                "menu_item_id": MenuItem.format_id(item.menu_item_id),
                 "name": item.name,
                 "description": item.description,
                 "price": float(item.price),  # Convert DECIMAL to float for JSON
@@ -412,7 +403,7 @@ def admin_routes(app, db):
                 "is_best_seller": item.is_best_seller,
                 "stock_available": item.stock_available,
                 "scheduled_update_time": (
-                    item.scheduled_update_time.isoformat() if item.scheduled_update_time else None
+                    scheduled_update_time.isoformat() if scheduled_update_time else None
                 )
             }
 
@@ -433,30 +424,37 @@ def admin_routes(app, db):
             data = request.get_json()
             print("\n\n\nReceived Data for Update:", data, "\n\n\n")
 
-            menu_item_id = data.get("menu_item_id")
+            menu_item_id = MenuItem.parse_id(data.get("menu_item_id"))
             if not menu_item_id:
                 return jsonify({"error": "Menu item ID not provided"}), 400
 
             scheduled_time = data.get("scheduled_update_time")
             scheduled_update_time = datetime.fromisoformat(scheduled_time) if scheduled_time else None
+            if scheduled_update_time and scheduled_update_time.tzinfo:
+                # due times are stored as naive UTC
+                scheduled_update_time = scheduled_update_time.astimezone(timezone.utc).replace(tzinfo=None)
 
             menu_item = db.session.query(MenuItem).filter_by(menu_item_id=menu_item_id).first()
             if not menu_item:
                 return jsonify({"error": "Menu item not found"}), 404
 
             if scheduled_update_time:
-                pending_update = {
-                    "name": data.get("name", menu_item.name),
-                    "description": data.get("description", menu_item.description),
-                    "price": float(data.get("price", menu_item.price)),
-                    "category_name": data.get("category_name", menu_item.category.name),
-                    "subcategory_name": data.get("subcategory_name", menu_item.subcategory.name),
-                    "discount_percentage": float(data.get("discount_percentage", menu_item.discount_percentage or 0)),
-                    "is_best_seller": data.get("is_best_seller", menu_item.is_best_seller),
-                    "stock_available": int(data.get("stock_available", menu_item.stock_available))
-                }
-                menu_item.scheduled_update_time = scheduled_update_time
-                menu_item.pending_update = json.dumps(pending_update)
+                # only the fields sent are changed when the change falls due
+                change = ScheduledChange(
+                    menu_item_id=menu_item.menu_item_id,
+                    due_at=scheduled_update_time,
+                    name=data.get("name"),
+                    description=data.get("description"),
+                    price=float(data["price"]) if data.get("price") is not None else None,
+                    category_id=lookup_category_id(data.get("category_name")),
+                    subcategory_id=lookup_subcategory_id(data.get("subcategory_name")),
+                    discount_percentage=(
+                        float(data["discount_percentage"]) if data.get("discount_percentage") is not None else None
+                    ),
+                    is_best_seller=data.get("is_best_seller"),
+                    stock_available=int(data["stock_available"]) if data.get("stock_available") is not None else None
+                )
+                db.session.add(change)
             else:
                 menu_item.name = data.get("name", menu_item.name)
                 menu_item.description = data.get("description", menu_item.description)
@@ -476,7 +474,10 @@ def admin_routes(app, db):
                     if subcategory:
                         menu_item.subcategory_id = subcategory.subcategory_id
 
+            bump_version(MENU)
             db.session.commit()
+            if scheduled_update_time:
+                notify_scheduled(scheduled_update_time)
             print("\n\nUpdated Successfully\n\n")
             return jsonify({"message": "Menu item updated successfully"}), 200
 
@@ -502,6 +503,7 @@ def admin_routes(app, db):
                 return jsonify({"error": f"Item '{item_name}' not found"}), 404
 
             db.session.delete(item)
+            bump_version(MENU)
             db.session.commit()
             return jsonify({"message": f"Item '{item_name}' deleted successfully!"}), 200
 
@@ -547,17 +549,18 @@ def admin_routes(app, db):
             if not all([item_name, description, price, category_name, subcategory_name]):
                 return jsonify({"success": False, "message": "Missing required fields"}), 400
 
-            # Handle image upload
+            # Handle image upload: stored once by content hash, served as resized variants
             image_url = ""
+            image_key = None
             BASE_URL = "https://HiFiDeliveryEats.com/"  # Replace with your actual base URL
             if "image" in request.files:
                 image = request.files["image"]
                 if image.filename:
-                    upload_folder = app.config.get("UPLOAD_FOLDER", "static/uploads")  # Default folder
-                    os.makedirs(upload_folder, exist_ok=True)  # Ensure folder exists
-                    image_path = os.path.join(upload_folder, image.filename)
-                    image.save(image_path)
-                    image_url = f"{BASE_URL}{image.filename}"
+                    try:
+                        image_key = process_blob(blob_store().put(image.stream))
+                    except (BlobTooLarge, ImageError) as e:
+                        return jsonify({"success": False, "message": str(e)}), 400
+                    image_url = f"{BASE_URL}{menu_image_name(image_key)}"
 
             # Fetch or create category
             category = db.session.query(Category).filter_by(name=category_name).first()
@@ -569,29 +572,15 @@ def admin_routes(app, db):
             if not subcategory:
                 return jsonify({"success": False, "message": f"Subcategory '{subcategory_name}' not found"}), 400
 
-            # Generate new menu_item_id (using your BaseModel's generate_id logic)
-            latest_id = db.session.query(func.max(MenuItem.menu_item_id)).scalar() or "MI000"
-            numeric_part = int(latest_id[2:]) + 1 if latest_id else 1
-            menu_item_id = f"MI{numeric_part:03d}"
-
-            # If scheduled, store as pending update
+            # menu_item_id is allocated by the BaseModel event on insert
+            # If scheduled, add a placeholder and schedule the real values
             if scheduled_update_time:
-                pending_update = {
-                    "name": item_name,
-                    "description": description,
-                    "price": price,
-                    "category_name": category_name,
-                    "subcategory_name": subcategory_name,
-                    "discount_percentage": discount,
-                    "is_best_seller": best_seller,
-                    "stock_available": stock_available
-                }
                 new_item = MenuItem(
-                    menu_item_id=menu_item_id,
                     name="Pending Item",  # Placeholder
                     description="Pending",
                     price=0.0,
                     image_url=image_url,
+                    image_key=image_key,
                     category_id=category.category_id,
                     subcategory_id=subcategory.subcategory_id,
                     nutrient_value="N/A",
@@ -599,18 +588,27 @@ def admin_routes(app, db):
                     is_best_seller=False,
                     is_out_of_stock=True,
                     discount_percentage=0.0,
-                    stock_available=0,
-                    scheduled_update_time=scheduled_update_time,
-                    pending_update=json.dumps(pending_update)
+                    stock_available=0
                 )
+                new_item.scheduled_changes.append(ScheduledChange(
+                    due_at=scheduled_update_time,
+                    name=item_name,
+                    description=description,
+                    price=price,
+                    category_id=category.category_id,
+                    subcategory_id=subcategory.subcategory_id,
+                    discount_percentage=discount,
+                    is_best_seller=best_seller,
+                    stock_available=stock_available
+                ))
             else:
                 # Add item immediately
                 new_item = MenuItem(
-                    menu_item_id=menu_item_id,
                     name=item_name,
                     description=description,
                     price=price,
                     image_url=image_url,
+                    image_key=image_key,
                     category_id=category.category_id,
                     subcategory_id=subcategory.subcategory_id,
                     nutrient_value="N/A",
@@ -623,13 +621,17 @@ def admin_routes(app, db):
 
             # Add and commit the new item
             db.session.add(new_item)
+            bump_version(MENU)
             db.session.commit()
+            if scheduled_update_time:
+                notify_scheduled(scheduled_update_time)
 
             return jsonify({
                 "success": True,
                 "message": "Item added successfully",
-                "menu_item_id": new_item.menu_item_id,
-                "image_url": new_item.image_url
+                "menu_item_id": new_item.display_id,
+                "image_url": new_item.image_url,
+                "images": variant_urls(new_item.image_key)
             }), 200
 
         except Exception as e:
@@ -639,6 +641,48 @@ def admin_routes(app, db):
         
     
     
+    # Bulk menu import: upserts every row of a CSV / JSON Lines / JSON upload in one transaction
+    @app.route('/api/admin/menu/import', methods=['POST'])
+    def import_menu():
+        if not current_user.is_authenticated:
+            return redirect(url_for('employee_login'))
+
+        upload = request.files.get("file")
+        if upload is None or not upload.filename:
+            return jsonify({"error": "No file uploaded"}), 400
+        fmt = request.args.get("format") or guess_format(upload.filename)
+        if fmt not in FORMATS:
+            return jsonify({"error": f"format must be one of {', '.join(FORMATS)}"}), 400
+        dry_run = request.args.get("dry_run", "").lower() in ("1", "true", "yes")
+
+        try:
+            importer = MenuImporter(batch_size=request.args.get("batch_size", 500, type=int))
+            summary = importer.run(read_rows(upload.stream, fmt))
+            if dry_run:
+                db.session.rollback()
+            else:
+                db.session.commit()
+            return jsonify({**summary, "dry_run": dry_run, "ok": True}), 200
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error importing menu: {e}")
+            return jsonify({"error": str(e)}), 400 if isinstance(e, ValueError) else 500
+
+    @app.route('/api/admin/menu/export', methods=['GET'])
+    def export_menu_items():
+        if not current_user.is_authenticated:
+            return redirect(url_for('employee_login'))
+
+        fmt = request.args.get("format", "csv")
+        if fmt not in FORMATS:
+            return jsonify({"error": f"format must be one of {', '.join(FORMATS)}"}), 400
+        mimetypes = {"csv": "text/csv", "jsonl": "application/x-ndjson", "json": "application/json"}
+        return Response(
+            stream_with_context(export_menu(fmt)),
+            mimetype=mimetypes[fmt],
+            headers={"Content-Disposition": f"attachment; filename=menu.{fmt}"},
+        )
+
     # FOR DASHBOARD
     @app.route('/api/admin/pending_orders', methods=['GET'])
     def get_pending_orders():
@@ -665,7 +709,7 @@ def admin_routes(app, db):
                     .all()
                 )
                 items = [{
-                    'itemId': item.OrderItem.menu_item_id,
+                    'itemId': MenuItem.format_id(item.OrderItem.menu_item_id),
                     'itemName': item.MenuItem.name,
                     'quantity': item.OrderItem.quantity,
                     'price': float(item.OrderItem.price),
@@ -677,7 +721,7 @@ def admin_routes(app, db):
                 state_pin = delivery_parts[2].split(' ') if len(delivery_parts) > 2 else ['', '']
 
                 orders_list.append({
-                    'orderId': order.order_id,
+                    'orderId': order.display_id,
                     'date': order.created_at.strftime('%Y-%m-%d %H:%M:%S'),
                     'items': items,
                     'total': float(order.total_price),
@@ -708,7 +752,7 @@ def admin_routes(app, db):
             agents_list = [{
                 'name': agent.username,  # Using username since name isn't in DeliveryAgent model
                 'status': 'available' if agent.is_active else 'busy',  # Mapping is_active to status
-                'delivery_agent_id': agent.delivery_agent_id
+                'delivery_agent_id': agent.display_id
             } for agent in agents]
             return jsonify({'data': agents_list, 'ok': True}), 200
 
@@ -725,10 +769,10 @@ def admin_routes(app, db):
 
         data = request.get_json()
         order_id = data.get('order_id')
-        delivery_agent_id = data.get('delivery_agent_id')
+        delivery_agent_id = DeliveryAgent.parse_id(data.get('delivery_agent_id'))
 
         try:
-            order = db.session.query(Order).filter_by(order_id=order_id).first()
+            order = db.session.query(Order).filter_by(order_id=Order.parse_id(order_id)).first()
             if not order or order.delivery_status != "Pending":
                 return jsonify({"error": "Order not found or not pending"}), 404
 
@@ -742,6 +786,8 @@ def admin_routes(app, db):
             order.delivery_status = "Preparing"
             #agent.is_active = False  # Mark agent as busy
 
+            record_status_change(order)
+            bump_version(ORDERS)
             db.session.commit()
             return jsonify({"message": f"Order {order_id} assigned to {agent.username}", "ok": True}), 200
 
@@ -761,11 +807,13 @@ def admin_routes(app, db):
         order_id = data.get('order_id')
 
         try:
-            order = db.session.query(Order).filter_by(order_id=order_id).first()
+            order = db.session.query(Order).filter_by(order_id=Order.parse_id(order_id)).first()
             if not order or order.delivery_status != "Pending":
                 return jsonify({"error": "Order not found or not pending"}), 404
 
             order.delivery_status = "Cancelled"
+            record_status_change(order)
+            bump_version(ORDERS)
             db.session.commit()
             return jsonify({"message": f"Order {order_id} rejected", "ok": True}), 200
 
@@ -775,17 +823,28 @@ def admin_routes(app, db):
             return jsonify({"error": str(e)}), 500
 
 
+    def analytics_validator():
+        if not current_user.is_authenticated:
+            return None
+        tag = analytics_tag()
+        if tag == ('primary',):
+            return tag + current_versions(ORDERS)
+        return tag
+
     @app.route('/api/admin/summary', methods=['GET'])
+    @conditional(analytics_validator)
     def get_summary():
         print(current_user)
         if not current_user.is_authenticated:
             return redirect(url_for('employee_login'))
 
         try:
-            total_orders = db.session.query(func.count(Order.order_id)).scalar()
-            total_revenue = db.session.query(func.sum(Order.total_price)).scalar() or 0.0
-            cancelled_orders = db.session.query(func.count(Order.order_id)).filter(Order.delivery_status == "Cancelled").scalar()
-            delivered_orders = db.session.query(func.count(Order.order_id)).filter(Order.delivery_status == "Delivered").scalar()
+            reports = analytics_session()
+            history = all_orders()
+            total_orders = reports.query(func.count(history.c.order_id)).scalar()
+            total_revenue = reports.query(func.sum(history.c.total_price)).scalar() or 0.0
+            cancelled_orders = reports.query(func.count(history.c.order_id)).filter(history.c.delivery_status == "Cancelled").scalar()
+            delivered_orders = reports.query(func.count(history.c.order_id)).filter(history.c.delivery_status == "Delivered").scalar()
             summary = {
                 "total_orders": total_orders,
                 "total_revenue": float(total_revenue),  # Convert Decimal to float
@@ -800,13 +859,15 @@ def admin_routes(app, db):
 
 
     @app.route('/api/admin/order_status_chart', methods=['GET'])
+    @conditional(analytics_validator)
     def get_order_status_chart():
         print(current_user)
         if not current_user.is_authenticated:
             return redirect(url_for('employee_login'))
 
         try:
-            status_counts = db.session.query(Order.delivery_status, func.count(Order.order_id)).group_by(Order.delivery_status).all()
+            history = all_orders()
+            status_counts = analytics_session().query(history.c.delivery_status, func.count(history.c.order_id)).group_by(history.c.delivery_status).all()
             chart_data = {status: count for status, count in status_counts}
             # Ensure all statuses from Order.delivery_status Enum are included
             all_statuses = ["Pending", "Preparing", "Out for Delivery", "Delivered", "Cancelled", "Refunded"]
@@ -820,6 +881,225 @@ def admin_routes(app, db):
             return jsonify({"error": str(e)}), 500
 
 
+    @app.route('/api/admin/catalog_cache', methods=['GET'])
+    def get_catalog_cache_stats():
+        if not current_user.is_authenticated:
+            return redirect(url_for('employee_login'))
+        return jsonify({"data": menu_catalog().stats(), "ok": True}), 200
+
+
+    @app.route('/api/admin/cart_summaries', methods=['GET'])
+    def get_cart_summary_stats():
+        if not current_user.is_authenticated:
+            return redirect(url_for('employee_login'))
+        return jsonify({"data": cart_summaries().stats(), "ok": True}), 200
+
+
+    @app.route('/api/admin/quote_cache', methods=['GET'])
+    def get_quote_cache_stats():
+        if not current_user.is_authenticated:
+            return redirect(url_for('employee_login'))
+        return jsonify({"data": quote_cache().stats(), "ok": True}), 200
+
+
+    @app.route('/api/admin/order_streams', methods=['GET'])
+    def get_order_stream_stats():
+        if not current_user.is_authenticated:
+            return redirect(url_for('employee_login'))
+        return jsonify({"data": order_event_bus().stats(), "ok": True}), 200
+
+
+    @app.route('/api/admin/job_leader', methods=['GET'])
+    def get_job_leader():
+        if not current_user.is_authenticated:
+            return redirect(url_for('employee_login'))
+
+        try:
+            return jsonify({"data": app.extensions['job_leader'].status(), "ok": True}), 200
+        except Exception as e:
+            print(f"Error fetching job leader status: {e}")
+            return jsonify({"error": str(e)}), 500
+
+
+    # Upcoming scheduled menu changes, soonest first
+    @app.route('/api/admin/scheduled_changes', methods=['GET'])
+    def get_scheduled_changes():
+        if not current_user.is_authenticated:
+            return redirect(url_for('employee_login'))
+
+        try:
+            limit = min(request.args.get('limit', 50, type=int), 500)
+            changes = (
+                db.session.query(ScheduledChange, MenuItem.name.label("item_name"))
+                .join(MenuItem, ScheduledChange.menu_item_id == MenuItem.menu_item_id)
+                .filter(ScheduledChange.status == "Pending")
+                .order_by(ScheduledChange.due_at, ScheduledChange.change_id)
+                .limit(limit)
+                .all()
+            )
+            data = [
+                {
+                    "change_id": change.display_id,
+                    "menu_item_id": MenuItem.format_id(change.menu_item_id),
+                    "item_name": item_name,
+                    "due_at": change.due_at.isoformat(),
+                    "changes": {
+                        field: float(value) if field in ("price", "discount_percentage") else value
+                        for field, value in change.changes().items()
+                    },
+                }
+                for change, item_name in changes
+            ]
+            return jsonify({"data": data, "ok": True}), 200
+        except Exception as e:
+            print(f"Error fetching scheduled changes: {e}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route('/api/admin/scheduled_changes/<string:change_id>/cancel', methods=['POST'])
+    def cancel_scheduled_change(change_id):
+        if not current_user.is_authenticated:
+            return redirect(url_for('employee_login'))
+
+        try:
+            cancelled = (
+                db.session.query(ScheduledChange)
+                .filter(ScheduledChange.change_id == ScheduledChange.parse_id(change_id),
+                        ScheduledChange.status == "Pending")
+                .update({"status": "Cancelled"}, synchronize_session=False)
+            )
+            if cancelled:
+                bump_version(MENU)  # /get_items shows the next pending change
+            db.session.commit()
+            if not cancelled:
+                return jsonify({"error": "No pending change with that ID"}), 404
+            return jsonify({"message": "Scheduled change cancelled", "ok": True}), 200
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error cancelling scheduled change: {e}")
+            return jsonify({"error": str(e)}), 500
+
+
+    # Schedule one price/discount change for a whole category, subcategory or item filter
+    @app.route('/api/admin/scheduled_rules', methods=['POST'])
+    def create_scheduled_rule():
+        if not current_user.is_authenticated:
+            return redirect(url_for('employee_login'))
+
+        try:
+            data = request.get_json() or {}
+            field = data.get("field")
+            operation = data.get("operation")
+            if field not in ("price", "discount_percentage"):
+                return jsonify({"error": "field must be 'price' or 'discount_percentage'"}), 400
+            if operation not in ("percent", "absolute", "set"):
+                return jsonify({"error": "operation must be 'percent', 'absolute' or 'set'"}), 400
+            if data.get("value") is None:
+                return jsonify({"error": "value not provided"}), 400
+
+            due_at = datetime.fromisoformat(data["due_at"]) if data.get("due_at") else datetime.utcnow()
+            if due_at.tzinfo:
+                due_at = due_at.astimezone(timezone.utc).replace(tzinfo=None)
+
+            rule = ScheduledRule(
+                due_at=due_at,
+                field=field,
+                operation=operation,
+                value=rule_number(data["value"], "value"),
+                is_best_seller=data.get("is_best_seller"),
+                min_price=rule_number(data["min_price"], "min_price") if data.get("min_price") is not None else None,
+                max_price=rule_number(data["max_price"], "max_price") if data.get("max_price") is not None else None,
+            )
+            if data.get("category_name"):
+                rule.category_id = lookup_category_id(data["category_name"])
+                if rule.category_id is None:
+                    return jsonify({"error": f"Category '{data['category_name']}' not found"}), 400
+            if data.get("subcategory_name"):
+                rule.subcategory_id = lookup_subcategory_id(data["subcategory_name"])
+                if rule.subcategory_id is None:
+                    return jsonify({"error": f"Subcategory '{data['subcategory_name']}' not found"}), 400
+
+            if not any([rule.category_id, rule.subcategory_id, rule.is_best_seller is not None,
+                        rule.min_price is not None, rule.max_price is not None]) and not data.get("all_items"):
+                # a rule without a filter reprices the whole menu, so it has to be asked for
+                return jsonify({"error": "No items selected; pass all_items to apply to the whole menu"}), 400
+            matches = count_rule_items(rule)
+
+            db.session.add(rule)
+            db.session.commit()
+            notify_scheduled(rule.due_at)
+            return jsonify({
+                "message": "Rule scheduled",
+                "rule_id": rule.display_id,
+                "due_at": rule.due_at.isoformat(),
+                "matches": matches,
+                "ok": True
+            }), 200
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error scheduling rule: {e}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route('/api/admin/scheduled_rules', methods=['GET'])
+    def get_scheduled_rules():
+        if not current_user.is_authenticated:
+            return redirect(url_for('employee_login'))
+
+        try:
+            status = request.args.get('status', 'Pending')
+            limit = min(request.args.get('limit', 50, type=int), 500)
+            rules = (
+                db.session.query(ScheduledRule)
+                .filter(ScheduledRule.status == status)
+                .order_by(ScheduledRule.due_at, ScheduledRule.rule_id)
+                .limit(limit)
+                .all()
+            )
+            data = [
+                {
+                    "rule_id": rule.display_id,
+                    "due_at": rule.due_at.isoformat(),
+                    "status": rule.status,
+                    "field": rule.field,
+                    "operation": rule.operation,
+                    "value": float(rule.value),
+                    "category_name": rule.category.name if rule.category else None,
+                    "subcategory_name": rule.subcategory.name if rule.subcategory else None,
+                    "is_best_seller": rule.is_best_seller,
+                    "min_price": float(rule.min_price) if rule.min_price is not None else None,
+                    "max_price": float(rule.max_price) if rule.max_price is not None else None,
+                    "items_updated": rule.items_updated,
+                }
+                for rule in rules
+            ]
+            return jsonify({"data": data, "ok": True}), 200
+        except Exception as e:
+            print(f"Error fetching scheduled rules: {e}")
+            return jsonify({"error": str(e)}), 500
+
+    @app.route('/api/admin/scheduled_rules/<string:rule_id>/cancel', methods=['POST'])
+    def cancel_scheduled_rule(rule_id):
+        if not current_user.is_authenticated:
+            return redirect(url_for('employee_login'))
+
+        try:
+            cancelled = (
+                db.session.query(ScheduledRule)
+                .filter(ScheduledRule.rule_id == ScheduledRule.parse_id(rule_id), ScheduledRule.status == "Pending")
+                .update({"status": "Cancelled"}, synchronize_session=False)
+            )
+            db.session.commit()
+            if not cancelled:
+                return jsonify({"error": "No pending rule with that ID"}), 404
+            return jsonify({"message": "Scheduled rule cancelled", "ok": True}), 200
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error cancelling scheduled rule: {e}")
+            return jsonify({"error": str(e)}), 500
+
+
     @app.route('/api/admin/all_orders', methods=['GET'])
     def get_all_orders():
         print(current_user)
@@ -858,12 +1138,12 @@ def admin_routes(app, db):
             orders = orders_query.all()
 
             orders_list = [{
-                'order_id': order.order_id,
+                'order_id': order.display_id,
                 'customer_name': order.customer.username,  # Using username from Customer model
                 'status': order.delivery_status,
                 'total_price': float(order.total_price),
                 'created_at': order.created_at.isoformat(),
-                'delivery_agent_id': order.delivery_agent_id or 'Not Assigned'
+                'delivery_agent_id': DeliveryAgent.format_id(order.delivery_agent_id) or 'Not Assigned'
             } for order in orders]
 
             return jsonify({
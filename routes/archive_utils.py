@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import String, cast, delete, insert, select, union_all
+
+from app import db
+from data_versions import ORDERS, bump_version
+from models import (
+    DeliveryFeedback,
+    Order,
+    OrderItem,
+    delivery_feedback_archive,
+    order_item_archive,
+    orders_archive,
+)
+from order_events import order_event
+
+orders = Order.__table__
+order_items = OrderItem.__table__
+delivery_feedback = DeliveryFeedback.__table__
+
+# Only orders that can no longer change are archived
+FINISHED_STATUSES = ("Delivered", "Cancelled", "Refunded", "Declined")
+
+# (live table, archive table), children before parents so deletes respect the foreign keys
+ARCHIVED_TABLES = (
+    (delivery_feedback, delivery_feedback_archive),
+    (order_items, order_item_archive),
+    (orders, orders_archive),
+)
+
+
+def archive_horizon():
+    return datetime.utcnow() - timedelta(days=current_app.config.get('ARCHIVE_AFTER_DAYS', 180))
+
+
+def archive_orders(before=None, chunk_size=None):
+    """
+    Moves finished orders created before `before` (default: the archival
+    horizon), with their items and delivery feedback, into the archive tables.
+    Each chunk is copied and deleted in its own transaction, so the live
+    tables are never locked for long. Returns the number of orders archived.
+    """
+    before = before or archive_horizon()
+    chunk_size = chunk_size or current_app.config.get('ARCHIVE_CHUNK_SIZE', 500)
+
+    archived = 0
+    while True:
+        order_ids = db.session.execute(
+            select(orders.c.order_id)
+            .where(orders.c.created_at < before, orders.c.delivery_status.in_(FINISHED_STATUSES))
+            .order_by(orders.c.order_id)
+            .limit(chunk_size)
+        ).scalars().all()
+        if not order_ids:
+            break
+
+        for live, archive in ARCHIVED_TABLES:
+            columns = [column.name for column in archive.columns]
+            db.session.execute(
+                insert(archive).from_select(
+                    columns,
+                    select(*[live.c[name] for name in columns]).where(live.c.order_id.in_(order_ids)),
+                )
+            )
+        for live, _ in ARCHIVED_TABLES:
+            db.session.execute(delete(live).where(live.c.order_id.in_(order_ids)))
+        # a finished order is streamed no more, so its status changes need not be kept
+        db.session.execute(delete(order_event).where(order_event.c.order_id.in_(order_ids)))
+        bump_version(ORDERS)  # archived orders drop out of the live status lookups
+        db.session.commit()
+        archived += len(order_ids)
+
+    return archived
+
+
+def _union(live, archive, alias):
+    columns = [column.name for column in archive.columns]
+    live_columns = [
+        # the live status is an Enum, the archived one a plain string
+        cast(live.c[name], String(20)).label(name) if name == "delivery_status" else live.c[name]
+        for name in columns
+    ]
+    return union_all(
+        select(*live_columns),
+        select(*[archive.c[name] for name in columns]),
+    ).subquery(alias)
+
+
+def all_orders():
+    """Live and archived orders as one selectable, for reports over the full history."""
+    return _union(orders, orders_archive, "all_orders")
+
+
+def all_order_items():
+    return _union(order_items, order_item_archive, "all_order_items")
+
+
+def all_delivery_feedback():
+    return _union(delivery_feedback, delivery_feedback_archive, "all_delivery_feedback")
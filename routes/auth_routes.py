@@ -1,29 +1,18 @@
 import secrets
 from flask import flash, jsonify, redirect, render_template, request, session, url_for
 from flask_login import current_user, login_required, login_user, logout_user
-from flask_mail import Message
-from sqlalchemy import or_, func
+from sqlalchemy import or_
 
-from models import Address, Admin, Customer, DeliveryAgent, Cart
+from cart_summary import cart_badge_count
+from mail_queue import enqueue_mail
+from models import Address, Admin, Customer, DeliveryAgent
 
 
 def register_routes(app, db, bcrypt, mail):
-    def get_the_cart_count():
-        try:
-            total_quantity = (
-                db.session.query(func.sum(Cart.quantity))
-                .filter(Cart.customer_id == current_user.customer_id)
-                .scalar()
-            ) or 0  # Return 0 if no items or result is None
-            return total_quantity
-        except Exception as e:
-            print(f"Error fetching cart count: {e}")
-            return 0
-    
     @app.route('/')
     def index():
-        cart_count = get_the_cart_count()
         if current_user.is_authenticated:
+            cart_count = cart_badge_count(current_user)
             return render_template('home.html', user=current_user,cart_count=cart_count)
         return render_template('login.html')
     
@@ -69,20 +58,13 @@ def register_routes(app, db, bcrypt, mail):
                     is_preferred=True
                 )
                 db.session.add(new_address)
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                flash('Database error occurred. Please try again.', 'error')
-                return redirect(url_for('signup'))
-            
-            # Send welcome email
-            try:
-                msg = Message(
+
+                # Welcome email, queued with the address and sent in the background
+                enqueue_mail(
                     "Welcome to HIFI Delivery Eats!",
                     sender=app.config['MAIL_USERNAME'],
-                    recipients=[email]
-                )
-                msg.body = f"""
+                    recipients=[email],
+                    body=f"""
 Hello {username},
 
 Thank you for signing up for HIFI Delivery Eats!
@@ -95,9 +77,12 @@ We are excited to have you on board.
 Regards,
 HIFI Delivery Eats Team
                 """
-                mail.send(msg)
+                )
+                db.session.commit()
             except Exception as e:
-                app.logger.error(f"Error sending email: {e}")
+                db.session.rollback()
+                flash('Database error occurred. Please try again.', 'error')
+                return redirect(url_for('signup'))
 
             flash('Signup successful!', 'success')
             return redirect(url_for('index'))
@@ -169,12 +154,12 @@ HIFI Delivery Eats Team
                 try:
                     reset_token = secrets.token_urlsafe(16)
                     reset_link = url_for('reset_password', token=reset_token, _external=True)
-                    msg = Message(
+                    # queued; the mail sender delivers it in the background and retries if the relay is down
+                    enqueue_mail(
                         'Password Reset Request',
                         sender=app.config['MAIL_USERNAME'],
-                        recipients=[email]
-                    )
-                    msg.body = f"""
+                        recipients=[email],
+                        body=f"""
 Hello {user.username},
 
 You requested to reset your password. Click the link below:
@@ -186,9 +171,11 @@ If you did not request this, please ignore this email.
 Thanks,
 HIFI Delivery Eats Team
                     """
-                    mail.send(msg)
+                    )
+                    db.session.commit()
                     return jsonify({'success': True, 'message': 'Reset link sent successfully'})
                 except Exception as e:
+                    db.session.rollback()
                     app.logger.error(e)
                     return jsonify({'success': False, 'error': f'Error sending email: {str(e)}'})
             return jsonify({'success': False, 'error': 'Email not found'})
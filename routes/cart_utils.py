@@ -0,0 +1,103 @@
+from datetime import datetime
+
+from sqlalchemy import delete, exists, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from cart_summary import bump_cart
+from key_allocator import allocate_id
+from models import Cart, MenuItem
+
+carts = Cart.__table__
+
+# add: put `quantity` more in the cart (1 by default)
+# increment: change the quantity by `quantity`, which may be negative; a line that drops to 0 goes
+# set: make the quantity exactly `quantity`; 0 removes the line
+# remove: take the line out whatever its quantity
+CART_OPERATIONS = ("add", "increment", "set", "remove")
+
+
+class CartError(ValueError):
+    pass
+
+
+def _line(customer_id, menu_item_id):
+    return (carts.c.customer_id == customer_id) & (carts.c.menu_item_id == menu_item_id)
+
+
+def _insert_line(customer_id, menu_item_id, quantity):
+    """
+    Inserts a new cart line; returns False when another request inserted
+    the same (customer, item) line first, in which case the caller updates it.
+    """
+    cart_id = allocate_id(Cart, db.session.connection())  # outside the savepoint, so a rollback cannot reuse it
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(carts).values(
+                cart_id=cart_id,
+                customer_id=customer_id,
+                menu_item_id=menu_item_id,
+                quantity=quantity,
+                added_at=datetime.utcnow(),
+            ))
+        return True
+    except IntegrityError:
+        return False
+
+
+def _add(customer_id, menu_item_id, delta):
+    line = _line(customer_id, menu_item_id)
+    add_to_line = update(carts).where(line).values(quantity=carts.c.quantity + delta)
+    if db.session.execute(add_to_line).rowcount == 0 and delta > 0:
+        if not _insert_line(customer_id, menu_item_id, delta):
+            db.session.execute(add_to_line)
+    if delta < 0:
+        db.session.execute(delete(carts).where(line, carts.c.quantity <= 0))
+
+
+def _set(customer_id, menu_item_id, quantity):
+    line = _line(customer_id, menu_item_id)
+    if quantity <= 0:
+        db.session.execute(delete(carts).where(line))
+        return
+    set_line = update(carts).where(line).values(quantity=quantity)
+    if db.session.execute(set_line).rowcount == 0:
+        if not _insert_line(customer_id, menu_item_id, quantity):
+            db.session.execute(set_line)
+
+
+def apply_cart_operation(customer_id, operation, menu_item_id, quantity=None):
+    """
+    Applies one operation to one cart line inside the caller's transaction,
+    touching only that row, and moves the cart version on. Returns the
+    line's new quantity (0 once removed) and the new cart summary (see
+    cart_summary.bump_cart). The caller commits.
+    """
+    if operation not in CART_OPERATIONS:
+        raise CartError(f"op must be one of {', '.join(CART_OPERATIONS)}")
+    item_id = MenuItem.parse_id(menu_item_id)
+    if item_id is None:
+        raise CartError("menu_item_id is missing or not valid")
+    if operation == "add" and quantity is None:
+        quantity = 1
+    if operation != "remove":
+        if isinstance(quantity, bool) or not isinstance(quantity, int):
+            raise CartError("quantity must be a whole number")
+        if operation == "add" and quantity <= 0:
+            raise CartError("quantity to add must be positive")
+
+    if operation != "remove" and quantity > 0:  # anything that can create a line
+        if not db.session.execute(select(exists().where(MenuItem.menu_item_id == item_id))).scalar():
+            raise CartError(f"Menu item {menu_item_id} not found")
+
+    if operation in ("add", "increment"):
+        _add(customer_id, item_id, quantity)
+    elif operation == "set":
+        _set(customer_id, item_id, quantity)
+    else:
+        db.session.execute(delete(carts).where(_line(customer_id, item_id)))
+
+    new_quantity = db.session.execute(
+        select(carts.c.quantity).where(_line(customer_id, item_id))
+    ).scalar() or 0
+    return new_quantity, bump_cart(customer_id)
@@ -1,88 +1,57 @@
-from flask import jsonify, render_template, request, redirect, url_for
+from flask import Response, current_app, jsonify, render_template, request, redirect, url_for
 from flask_login import current_user, login_required
+from cart_summary import cart_badge_count
+from catalog_cache import CUSTOMER_FIELDS, menu_catalog
+from data_versions import MENU, ORDERS, cart_key, current_versions
+from http_cache import conditional, conditional_response, make_etag
+from menu_search import SearchError, is_search, parse_search_args
 from models import Address, MenuItem, Category, Subcategory, Cart, Order, OrderItem, DeliveryAgent, DeliveryFeedback
-from sqlalchemy import text,func
+from order_events import StreamLimitReached, order_event_bus, order_status_stream
+from pricing import PricingError, cart_quote
+from routes.cart_utils import CartError, apply_cart_operation
+from routes.history_utils import (
+    HistoryError,
+    find_order,
+    has_delivery_feedback,
+    order_history_page,
+    order_lines,
+    order_previews,
+    parse_history_args,
+    thumbnail_url,
+)
+from routes.inventory_utils import hold_cart
+from routes.order_utils import CheckoutError, PriceChanged, place_order_from_cart
 import json
 from datetime import datetime
 
 def customer_routes(app, db):
-    def get_the_cart_count():
-        try:
-            total_quantity = (
-                db.session.query(func.sum(Cart.quantity))
-                .filter(Cart.customer_id == current_user.customer_id)
-                .scalar()
-            ) or 0  # Return 0 if no items or result is None
-            return total_quantity
-        except Exception as e:
-            print(f"Error fetching cart count: {e}")
-            return 0
-    
     @app.route('/user/profile')
     @login_required
     def customer():
-        cart_count = get_the_cart_count()
+        cart_count = cart_badge_count(current_user)
         return render_template('user/profile.html', user=current_user,cart_count=cart_count)
     
     @app.route('/show_menu')
     @login_required
     def show_menu():
-        cart_count = get_the_cart_count()
+        cart_count = cart_badge_count(current_user)
         return render_template('user/show_menu.html', user=current_user,cart_count=cart_count)
 
     # ORDER MANAGEMENT ENDPOINTS: Order page route
     @app.route('/order', methods=['GET', 'POST'])
     @login_required
     def order():
-        cart_count = get_the_cart_count()
+        cart_count = cart_badge_count(current_user)
         if request.method == 'GET':
             try:
-                cart_items = (
-                    Cart.query
-                    .join(MenuItem, Cart.menu_item_id == MenuItem.menu_item_id)
-                    .filter(Cart.customer_id == current_user.customer_id)
-                    .with_entities(
-                        Cart.cart_id,
-                        Cart.menu_item_id,
-                        Cart.quantity,
-                        MenuItem.name.label("menu_item_name"),
-                        MenuItem.price,
-                        MenuItem.discount_percentage
-                    )
-                    .all()
-                )
-
-                cart_data = [
-                    {
-                        'cart_id': item.cart_id,
-                        'menu_item_id': item.menu_item_id,
-                        'name': item.menu_item_name,
-                        'price': float(item.price),
-                        'quantity': item.quantity,
-                        'discount_percentage': float(item.discount_percentage) if item.discount_percentage else 0
-                    }
-                    for item in cart_items
-                ]
-
-                # Calculate totals
-                subtotal = 0
-                total_discount = 0
-                for item in cart_data:
-                    item_total = item['price'] * item['quantity']
-                    item_discount = (item_total * item['discount_percentage']) / 100
-                    subtotal += item_total
-                    total_discount += item_discount
-                tax = (subtotal - total_discount) * 0.18  # 18% tax
-                delivery_charge = 50.0
-                total = subtotal - total_discount + tax + delivery_charge
-
+                quote = cart_quote(current_user.customer_id)
                 return render_template(
                     'user/order.html',
-                    cart_json=json.dumps(cart_data),
-                    total=total,
-                    subtotal=subtotal - total_discount,
-                    tax=tax,
-                    delivery_charge=delivery_charge,
+                    cart_json=json.dumps(quote.cart_data()),
+                    total=float(quote.total),
+                    subtotal=float(quote.net),
+                    tax=float(quote.tax),
+                    delivery_charge=float(quote.delivery_charge),
                     user=current_user,
                     cart_count=cart_count
                 )
@@ -97,51 +66,16 @@ def customer_routes(app, db):
     @app.route('/delivery_details')
     @login_required
     def delivery_details():
-        cart_count = get_the_cart_count()
+        cart_count = cart_badge_count(current_user)
         try:
-            # Fetch cart items for the current customer.
-            cart_items = (
-                Cart.query
-                .join(MenuItem, Cart.menu_item_id == MenuItem.menu_item_id)
-                .filter(Cart.customer_id == current_user.customer_id)
-                .with_entities(
-                    Cart.cart_id,
-                    Cart.menu_item_id,
-                    Cart.quantity,
-                    MenuItem.name.label("menu_item_name"),
-                    MenuItem.price,
-                    MenuItem.discount_percentage
-                )
-                .all()
-            )
-
-            cart_data = [
-                {
-                    'cart_id': item.cart_id,
-                    'menu_item_id': item.menu_item_id,
-                    'name': item.menu_item_name,
-                    'price': float(item.price),
-                    'quantity': item.quantity,
-                    'discount_percentage': float(item.discount_percentage) if item.discount_percentage else 0
-                }
-                for item in cart_items
-            ]
-
-            if not cart_data:
+            # Priced once; the same quote is reused at checkout while the cart is unchanged
+            quote = cart_quote(current_user.customer_id)
+            if not quote.lines:
                 return redirect(url_for('order'))  # Redirect back if cart is empty
 
-            # Calculate totals.
-            subtotal = 0
-            total_discount = 0
-            for item in cart_data:
-                item_total = item['price'] * item['quantity']
-                item_discount = (item_total * item['discount_percentage']) / 100
-                subtotal += item_total
-                total_discount += item_discount
-
-            tax = (subtotal - total_discount) * 0.18  # 18% tax
-            delivery_charge = 50.0
-            total = subtotal - total_discount + tax + delivery_charge
+            # Hold the cart's stock while the customer fills in delivery details
+            hold_cart(current_user.customer_id)
+            db.session.commit()
 
             # Fetch the customer's preferred address.
             preferred_address = Address.query.filter_by(
@@ -151,11 +85,11 @@ def customer_routes(app, db):
 
             return render_template(
                 'user/delivery_details.html',
-                cart_json=json.dumps(cart_data),
-                total=total,
-                subtotal=subtotal - total_discount,
-                tax=tax,
-                delivery_charge=delivery_charge,
+                cart_json=json.dumps(quote.cart_data()),
+                total=float(quote.total),
+                subtotal=float(quote.net),
+                tax=float(quote.tax),
+                delivery_charge=float(quote.delivery_charge),
                 user=current_user,
                 address=preferred_address,
                 cart_count=cart_count
@@ -170,61 +104,22 @@ def customer_routes(app, db):
     def place_customer_order():
         data = request.get_json()
         try:
-            total = float(data.get('total', 0))
-            subtotal = float(data.get('subtotal', 0))
-            tax = float(data.get('tax', 0))
-            delivery_charge = float(data.get('delivery_charge', 0))
             delivery_details = data.get('delivery_details', {})
 
-            if total <= 0 or subtotal <= 0:
-                return jsonify({"error": "Invalid total or subtotal"}), 400
-
-            # Fetch cart from database
-            cart_items = (
-                Cart.query
-                .join(MenuItem, Cart.menu_item_id == MenuItem.menu_item_id)
-                .filter(Cart.customer_id == current_user.customer_id)
-                .all()
-            )
-            if not cart_items:
-                return jsonify({"error": "Cart is empty"}), 400
-
-            # Check stock
-            for cart_item in cart_items:
-                menu_item = cart_item.menu_item  # Use relationship
-                if menu_item.stock_available < cart_item.quantity:
-                    return jsonify({"error": f"Insufficient stock for {menu_item.name}"}), 400
-
-            # Create order (ID auto-generated by BaseModel event)
-            new_order = Order(
-                customer_id=current_user.customer_id,
-                delivery_agent_id=None,
-                delivery_status="Pending",
-                total_price=total,
-                delivery_location=f"{delivery_details.get('street', '')}, {delivery_details.get('city', '')}, {delivery_details.get('state', '')} {delivery_details.get('pincode', '')}",
-                created_at=datetime.utcnow()
-            )
-            db.session.add(new_order)
-            db.session.flush()  # Flush to assign order_id
-
-            # Create order items and update stock
-            for cart_item in cart_items:
-                menu_item = cart_item.menu_item
-                order_item = OrderItem(
-                    order_id=new_order.order_id,  # Now set from flushed order
-                    menu_item_id=cart_item.menu_item_id,
-                    quantity=cart_item.quantity,
-                    price=float(menu_item.price)
-                )
-                db.session.add(order_item)
-                db.session.flush()  # Flush each OrderItem to assign unique order_item_id
-                menu_item.stock_available -= cart_item.quantity
-
-            # Clear cart
-            Cart.query.filter_by(customer_id=current_user.customer_id).delete()
+            # Order, order items, stock and cart are written in one batch, priced on the server;
+            # the total the customer was shown only has to agree with it
+            delivery_location = f"{delivery_details.get('street', '')}, {delivery_details.get('city', '')}, {delivery_details.get('state', '')} {delivery_details.get('pincode', '')}"
+            try:
+                order_id = place_order_from_cart(current_user.customer_id, delivery_location, expected_total=data.get('total'))
+            except PriceChanged as e:
+                db.session.rollback()
+                return jsonify({"error": str(e), "total": float(e.quote.total)}), 409
+            except (CheckoutError, PricingError) as e:
+                db.session.rollback()
+                return jsonify({"error": str(e)}), 400
             db.session.commit()
 
-            return jsonify({"message": "Order placed successfully", "order_id": new_order.order_id}), 201
+            return jsonify({"message": "Order placed successfully", "order_id": Order.format_id(order_id)}), 201
         except Exception as e:
             db.session.rollback()
             print("\n\n\n", str(e), "\n\n\n")
@@ -234,33 +129,30 @@ def customer_routes(app, db):
     @app.route('/order_confirmation')
     @login_required
     def order_confirmation():
-        cart_count = get_the_cart_count()
-        order_id = request.args.get('order_id')
-        if not order_id:
+        cart_count = cart_badge_count(current_user)
+        if not request.args.get('order_id'):
             return "Order ID not provided", 400
+        # Accepts both the display form (O001) and the bare number
+        order_id = Order.parse_id(request.args.get('order_id'))
 
-        # Fetch order details from the database
-        order = Order.query.filter_by(order_id=order_id, customer_id=current_user.customer_id).first()
+        # Fetch order details from the database, archived orders included
+        order = find_order(order_id, current_user.customer_id)
         if not order:
             return "Order not found", 404
 
-        # Fetch order items using relationship
-        order_items = order.order_items  # Use the relationship defined in models.py
-
         # Prepare cart_items data for the template
         cart_data = [
             {
-                'menu_item_id': item.menu_item_id,
-                'name': item.menu_item.name,
+                'menu_item_id': MenuItem.format_id(item.menu_item_id),
+                'name': item.name,
                 'quantity': item.quantity,
                 'price': float(item.price),
-                'discount_percentage': float(item.menu_item.discount_percentage) if item.menu_item.discount_percentage else 0
+                'discount_percentage': float(item.discount_percentage) if item.discount_percentage else 0
             }
-            for item in order_items
+            for item in order_lines(order_id)
         ]
 
         # Prepare order data for the template
-        total_price = float(order.total_price)
         # Correctly parse delivery_location
         location_parts = order.delivery_location.split(', ') if order.delivery_location else []
         delivery_details = {
@@ -271,14 +163,16 @@ def customer_routes(app, db):
         }
 
         order_data = {
-            'order_id': order.order_id,
+            'order_id': Order.format_id(order.order_id),
             'ordered_at': order.created_at.strftime('%Y-%m-%d %H:%M:%S') if order.created_at else datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
-            'total': total_price,
-            'subtotal': total_price - (total_price * 0.18) - 50.0,  # Reverse calculate subtotal
-            'tax': total_price * 0.18,  # 18% tax
-            'delivery_charge': 50.0,  # Fixed delivery charge
+            # price breakdown as it was quoted at checkout
+            'total': float(order.total_price),
+            'subtotal': float(order.subtotal - order.discount),  # after discounts, as the order pages show it
+            'discount': float(order.discount),
+            'tax': float(order.tax),
+            'delivery_charge': float(order.delivery_charge),
             'delivery_details': delivery_details,
-            'tracking_id': order.order_id,  # Using order_id as tracking_id
+            'tracking_id': Order.format_id(order.order_id),  # Using order_id as tracking_id
             'delivery_status': order.delivery_status 
         }
 
@@ -306,8 +200,7 @@ def customer_routes(app, db):
                 'delivery_area': 'Not assigned by admin yet, will be done soon.'
             }
         # Check if feedback exists
-        feedback = DeliveryFeedback.query.filter_by(order_id=order_id).first()
-        has_feedback = feedback is not None
+        has_feedback = has_delivery_feedback(order_id)
         
         return render_template(
             'user/order_confirmation.html',
@@ -322,17 +215,48 @@ def customer_routes(app, db):
     @app.route('/api/order_status/<order_id>', methods=['GET'])
     @login_required
     def get_order_status(order_id):
-        order = Order.query.filter_by(order_id=order_id, customer_id=current_user.customer_id).first()
+        order_id = Order.parse_id(order_id)
+        orders_version, = current_versions(ORDERS)  # read before the order, as @conditional does
+        # the order is checked to be this customer's before a 304 can confirm anything about it
+        order = find_order(order_id, current_user.customer_id)
         if not order:
             return jsonify({'error': 'Order not found'}), 404
-        return jsonify({'delivery_status': order.delivery_status}), 200
+        etag = make_etag("order", order_id, current_user.customer_id, orders_version)
+        return conditional_response(etag, app.json.dumps({'delivery_status': order.delivery_status}))
+
+    @app.route('/api/order_status/<order_id>/events', methods=['GET'])
+    @login_required
+    def stream_order_status(order_id):
+        order_id = Order.parse_id(order_id)
+        if not find_order(order_id, current_user.customer_id):
+            return jsonify({'error': 'Order not found'}), 404
+        try:
+            last_event_id = int(request.headers.get('Last-Event-ID', ''))
+        except ValueError:
+            last_event_id = None
+
+        bus = order_event_bus()
+        try:
+            subscription = bus.subscribe(order_id)
+        except StreamLimitReached as e:
+            # the page goes back to polling /api/order_status
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '30'}
+        db.session.remove()  # the stream holds no connection between its reads
+
+        response = Response(
+            order_status_stream(current_app._get_current_object(), order_id, subscription, last_event_id),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        )
+        response.call_on_close(lambda: bus.unsubscribe(order_id, subscription))
+        return response
 
     @app.route('/api/delivery_feedback', methods=['POST'])
     @login_required
     def submit_delivery_feedback():
         try:
             data = request.get_json()
-            order_id = data.get('order_id')
+            order_id = Order.parse_id(data.get('order_id'))
             rating = data.get('rating')
             feedback_text = data.get('feedback')
 
@@ -403,7 +327,7 @@ def customer_routes(app, db):
     @login_required
     def set_preferred_address(address_id):
         # Fetch the selected address using the correct primary key name
-        address = Address.query.filter_by(address_id=address_id, customer_id=current_user.customer_id).first()
+        address = Address.query.filter_by(address_id=Address.parse_id(address_id), customer_id=current_user.customer_id).first()
         
         if not address:
             return jsonify({"error": "Address not found"}), 404
@@ -423,7 +347,7 @@ def customer_routes(app, db):
     @login_required
     def delete_address(address_id):
         # Fetch the address using the correct primary key name
-        address = Address.query.filter_by(address_id=address_id, customer_id=current_user.customer_id).first()
+        address = Address.query.filter_by(address_id=Address.parse_id(address_id), customer_id=current_user.customer_id).first()
 
         if not address:
             return jsonify({"error": "Address not found"}), 404
@@ -440,7 +364,7 @@ def customer_routes(app, db):
     @login_required
     def edit_address(address_id):
         data = request.get_json()
-        address = Address.query.filter_by(address_id=address_id, customer_id=current_user.customer_id).first()
+        address = Address.query.filter_by(address_id=Address.parse_id(address_id), customer_id=current_user.customer_id).first()
         
         if not address:
             return jsonify({"error": "Address not found"}), 404
@@ -480,116 +404,95 @@ def customer_routes(app, db):
     @login_required
     def get_menu_items():
         try:
-            # Fetch menu items with category and subcategory details
-            items = (
-                MenuItem.query
-                .outerjoin(Category, MenuItem.category_id == Category.category_id)
-                .outerjoin(Subcategory, MenuItem.subcategory_id == Subcategory.subcategory_id)
-                .filter(MenuItem.is_out_of_stock == False)
+            if not is_search(request.args):
+                # Served from the menu catalog cache; rebuilt only when the menu version moves
+                etag, payload = menu_catalog().get("customer")
+                return conditional_response(etag, payload)
+
+            # Search, filter and page through the catalog's in-memory index
+            try:
+                query = parse_search_args(request.args)
+                etag, index = menu_catalog().search_index()
+                items, next_cursor, total = index.search(query)
+            except SearchError as e:
+                return jsonify({"error": str(e)}), 400
+            payload = app.json.dumps({
+                "data": [{field: item[field] for field in CUSTOMER_FIELDS} for item in items],
+                "next_cursor": next_cursor,
+                "total": total,
+                "ok": True,
+            })
+            return conditional_response(etag, payload)
+
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 500
+        
+    # API to fetch the cart; it is changed one line at a time through PATCH below
+    def cart_validator():
+        # the cart shows menu names and prices as well
+        return ("cart", *current_versions(cart_key(current_user.customer_id), MENU))
+
+    @app.route('/api/cart', methods=['GET'])
+    @login_required
+    @conditional(cart_validator)
+    def manage_cart():
+        try:
+            version, = current_versions(cart_key(current_user.customer_id))  # read before the lines
+            cart_items = (
+                Cart.query
+                .join(MenuItem, Cart.menu_item_id == MenuItem.menu_item_id)
+                .filter(Cart.customer_id == current_user.customer_id)
                 .with_entities(
-                    MenuItem.menu_item_id,
-                    MenuItem.name,
-                    MenuItem.description,
-                    MenuItem.price,
-                    MenuItem.image_url,
-                    MenuItem.is_best_seller,
-                    MenuItem.is_out_of_stock,
-                    MenuItem.stock_available,
-                    MenuItem.discount_percentage,
-                    Category.name.label("category_name"),
-                    Subcategory.name.label("subcategory_name")
+                    Cart.cart_id,
+                    Cart.menu_item_id,
+                    Cart.quantity,
+                    MenuItem.name.label("menu_item_name"),
+                    MenuItem.price
                 )
                 .all()
             )
 
-            # Format the response data
-            items_list = [
+            data = [
                 {
-                    "menu_item_id": item.menu_item_id,
-                    "name": item.name,
-                    "description": item.description,
-                    "price": float(item.price),  # Convert DECIMAL to float for JSON
-                    "category_name": item.category_name if item.category_name else "Uncategorized",
-                    "subcategory_name": item.subcategory_name if item.subcategory_name else "Uncategorized",
-                    "image_url": item.image_url,
-                    "is_best_seller": item.is_best_seller,
-                    "is_out_of_stock": item.is_out_of_stock,
-                    "stock_available": item.stock_available,
-                    "discount_percentage": float(item.discount_percentage) if item.discount_percentage else 0,
+                    'cart_id': Cart.format_id(item.cart_id),
+                    'menu_item_id': MenuItem.format_id(item.menu_item_id),
+                    'name': item.menu_item_name,
+                    'price': float(item.price),
+                    'quantity': item.quantity
                 }
-                for item in items
+                for item in cart_items
             ]
-
-            return jsonify({'data': items_list, 'ok': True}), 200
-
+            return jsonify({'ok': True, 'data': data, 'version': version}), 200
         except Exception as e:
             db.session.rollback()
             return jsonify({"error": str(e)}), 500
-        
-    # API to fetch and update cart
-    @app.route('/api/cart', methods=['GET', 'POST'])
+    
+    # Change one cart line: {"op": "add" | "increment" | "set" | "remove", "menu_item_id": "MI001", "quantity": 2}
+    @app.route('/api/cart', methods=['PATCH'])
     @login_required
-    def manage_cart():
-        if request.method == 'GET':
-            try:
-                cart_items = (
-                    Cart.query
-                    .join(MenuItem, Cart.menu_item_id == MenuItem.menu_item_id)
-                    .filter(Cart.customer_id == current_user.customer_id)
-                    .with_entities(
-                        Cart.cart_id,
-                        Cart.menu_item_id,
-                        Cart.quantity,
-                        MenuItem.name.label("menu_item_name"),
-                        MenuItem.price
-                    )
-                    .all()
-                )
-
-                data = [
-                    {
-                        'cart_id': item.cart_id,
-                        'menu_item_id': item.menu_item_id,
-                        'name': item.menu_item_name,
-                        'price': float(item.price),
-                        'quantity': item.quantity
-                    }
-                    for item in cart_items
-                ]
-                return jsonify({'ok': True, 'data': data}), 200
-            except Exception as e:
-                db.session.rollback()
-                return jsonify({"error": str(e)}), 500
+    def update_cart_line():
+        try:
+            data = request.get_json(silent=True) or {}
+            quantity, summary = apply_cart_operation(
+                current_user.customer_id, data.get('op'), data.get('menu_item_id'), data.get('quantity')
+            )
+            db.session.commit()
+            return jsonify({
+                'ok': True,
+                'menu_item_id': MenuItem.format_id(MenuItem.parse_id(data['menu_item_id'])),
+                'quantity': quantity,
+                'item_count': summary['item_count'],
+                'subtotal': summary['subtotal'],
+                'version': summary['version'],
+            }), 200
+        except CartError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 500
 
-        elif request.method == 'POST':
-            try:
-                items = request.get_json().get('items', [])
-                # Clear existing cart for this customer
-                Cart.query.filter_by(customer_id=current_user.customer_id).delete()
-
-                # Get the latest cart_id before adding new items
-                last_id_query = text("SELECT cart_id FROM cart ORDER BY cart_id DESC LIMIT 1")
-                result = db.session.execute(last_id_query).scalar()
-                last_numeric = int(result[1:]) if result else 0
-
-                # Add new items with unique cart_ids
-                for i, item in enumerate(items, start=last_numeric + 1):
-                    if item.get('quantity', 0) > 0:  # Only add items with quantity > 0
-                        cart_id = f"C{i:03d}"  # Generate unique cart_id (e.g., C002, C003)
-                        cart_item = Cart(
-                            cart_id=cart_id,  # Set cart_id manually
-                            customer_id=current_user.customer_id,
-                            menu_item_id=item['menu_item_id'],
-                            quantity=item['quantity']
-                        )
-                        db.session.add(cart_item)
-
-                db.session.commit()
-                return jsonify({'data': items, 'message': 'Cart updated successfully'}), 200
-            except Exception as e:
-                db.session.rollback()
-                return jsonify({"error": str(e)}), 500
-    
     @app.route('/api/recommendations', methods=['GET'])
     @login_required
     def get_recommendations():
@@ -626,7 +529,7 @@ def customer_routes(app, db):
             )
             recommendations = [
                 {
-                    'menu_item_id': item.menu_item_id,
+                    'menu_item_id': item.display_id,
                     'name': item.name,
                     'price': float(item.price),
                     'subcategory_name': item.subcategory.name if item.subcategory else None,
@@ -650,29 +553,45 @@ def customer_routes(app, db):
             db.session.rollback()
             return jsonify({"error": str(e)}), 500
     
+    # /api/orders/history?limit=20&cursor=...&summary=1: newest first, one page at a time;
+    # summary adds each order's item count and the first item's thumbnail
     @app.route('/api/orders/history', methods=['GET'])
     @login_required
     def get_order_history():
         try:
-            # Fetch all orders for the current customer
-            orders = Order.query.filter_by(customer_id=current_user.customer_id).order_by(Order.created_at.desc()).all()
-            order_history = []
+            limit, after = parse_history_args(request.args)
+        except HistoryError as e:
+            return jsonify({'error': str(e)}), 400
+        try:
+            # Live and archived orders, a keyset page of each merged
+            orders, next_cursor = order_history_page(current_user.customer_id, limit, after)
+            # First item (and counts) of every order on the page, in one query
+            previews = order_previews([order.order_id for order in orders])
+            with_summary = request.args.get('summary', '').lower() in ('1', 'true', 'yes')
 
+            order_history = []
             for order in orders:
-                # Get the first item for display (you could aggregate all items if needed)
-                first_item = order.order_items[0] if order.order_items else None
-                order_history.append({
-                    'order_id': order.order_id,
+                first_item = previews.get(order.order_id)
+                entry = {
+                    'order_id': Order.format_id(order.order_id),
                     'name': current_user.username,  # Customer name
-                    'image': first_item.menu_item.image_url if first_item else '',  # Image from MenuItem
-                    'item': first_item.menu_item.name if first_item else 'N/A',  # Item name from MenuItem
+                    'image': first_item.image_url if first_item else '',  # Image from MenuItem
+                    'item': first_item.name if first_item else 'N/A',  # Item name from MenuItem
                     'price': float(order.total_price),  # Total price from Order
+                    'subtotal': float(order.subtotal),
+                    'discount': float(order.discount),
+                    'tax': float(order.tax),
+                    'delivery_charge': float(order.delivery_charge),
                     'delivery_details': order.delivery_location,  # Delivery location from Order
                     'payment_method': 'Cash on Delivery',  # Not stored, assuming COD as default
                     'date': order.created_at.strftime('%Y-%m-%d %H:%M:%S') if order.created_at else 'N/A'
-                })
+                }
+                if with_summary:
+                    entry['item_count'] = int(first_item.item_count) if first_item else 0
+                    entry['thumbnail'] = thumbnail_url(first_item) if first_item else None
+                order_history.append(entry)
 
-            return jsonify({'orders': order_history, 'ok': True}), 200
+            return jsonify({'orders': order_history, 'next_cursor': next_cursor, 'ok': True}), 200
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -1,12 +1,14 @@
 import datetime
-import os
 from flask import flash, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 from sqlalchemy import func, or_
 from sqlalchemy.orm import joinedload
-from werkzeug.utils import secure_filename
 
+from blob_store import BlobTooLarge, blob_store
+from data_versions import ORDERS, bump_version
+from image_pipeline import ImageError, process_blob, variant_path
 from models import Address, Customer, DeliveryAgent, DeliveryFeedback, Earnings, Order, OrderItem
+from order_events import record_status_change
 
 def delivery_agent_routes(app, db):
     @app.route('/delivery-agent')
@@ -163,7 +165,7 @@ def delivery_agent_routes(app, db):
             )
             .filter(
                 Order.delivery_agent_id == current_user.delivery_agent_id,
-                Order.order_id == order_id
+                Order.order_id == Order.parse_id(order_id)
             )
             .first()
         )
@@ -175,7 +177,7 @@ def delivery_agent_routes(app, db):
             db.session.query(DeliveryFeedback)
             .filter(
                 DeliveryFeedback.delivery_agent_id == current_user.delivery_agent_id,
-                DeliveryFeedback.order_id == order_id
+                DeliveryFeedback.order_id == order.order_id
             )
             .first()
         )
@@ -195,7 +197,7 @@ def delivery_agent_routes(app, db):
             )
             .filter(
                 Order.delivery_agent_id == current_user.delivery_agent_id,
-                Order.order_id == order_id
+                Order.order_id == Order.parse_id(order_id)
             )
             .first()
         )
@@ -208,7 +210,7 @@ def delivery_agent_routes(app, db):
     @app.route('/order/<string:order_id>/accept', methods=['POST'])
     @login_required
     def accept_order(order_id):
-        order = Order.query.get_or_404(order_id)
+        order = Order.query.get_or_404(Order.parse_id(order_id))
         
         # Check instance's status, not the class's attribute
         if order.delivery_status != "Preparing":
@@ -217,6 +219,8 @@ def delivery_agent_routes(app, db):
         
         order.delivery_status = "Accepted"
         order.delivery_agent_id = current_user.delivery_agent_id
+        record_status_change(order)
+        bump_version(ORDERS)
         db.session.commit()
         
         flash("Order accepted successfully")
@@ -225,7 +229,7 @@ def delivery_agent_routes(app, db):
     @app.route('/order/<string:order_id>/decline', methods=['POST'])
     @login_required
     def decline_order(order_id):
-        order = Order.query.get_or_404(order_id)
+        order = Order.query.get_or_404(Order.parse_id(order_id))
         
         if order.delivery_status != "Preparing":
             flash("Order already declined or processed.")
@@ -233,6 +237,8 @@ def delivery_agent_routes(app, db):
         
         order.delivery_status = "Pending"
         order.delivery_agent_id = None
+        record_status_change(order)
+        bump_version(ORDERS)
         db.session.commit()
         
         flash("Order declined successfully")
@@ -241,7 +247,7 @@ def delivery_agent_routes(app, db):
     @app.route('/api/orders/<string:order_id>/update_status', methods=['POST'])
     @login_required
     def edit_delivery_status(order_id):
-        order = Order.query.get_or_404(order_id)
+        order = Order.query.get_or_404(Order.parse_id(order_id))
         
         valid_statuses = ["Accepted", "Picked Up", "Out for Delivery", "Delivered"]
         data = request.get_json() or {}
@@ -285,10 +291,12 @@ def delivery_agent_routes(app, db):
                 )
                 db.session.add(today_earnings)
 
+        record_status_change(order)
+        bump_version(ORDERS)
         db.session.commit()
         
         response_data = {
-            "order_id": order.order_id,
+            "order_id": order.display_id,
             "delivery_status": order.delivery_status
         }
         if new_status == "Delivered" and order.delivery_agent_id:
@@ -306,7 +314,7 @@ def delivery_agent_routes(app, db):
 
     @app.route('/delivery_agent/<string:agent_id>/edit', methods=['POST'])
     def edit_delivery_agent(agent_id):
-        agent = DeliveryAgent.query.get_or_404(agent_id)
+        agent = DeliveryAgent.query.get_or_404(DeliveryAgent.parse_id(agent_id))
         
         agent.username = request.form.get('username', agent.username)
         agent.email = request.form.get('email', agent.email)
@@ -326,11 +334,12 @@ def delivery_agent_routes(app, db):
 
         file = request.files.get('image')
         if file and file.filename:
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
-            relative_path = os.path.join('uploads', filename).replace(os.sep, '/')
-            agent.image = relative_path
+            # stored once by content hash; the profile shows the resized card variant
+            try:
+                agent.image = variant_path(process_blob(blob_store().put(file.stream)), 'card')
+            except (BlobTooLarge, ImageError) as e:
+                flash(f"Could not use that picture: {e}", "danger")
+                return redirect(url_for('delivery_partner_profile'))
 
         try:
             db.session.commit()
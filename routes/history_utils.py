@@ -0,0 +1,144 @@
+from datetime import datetime
+
+from sqlalchemy import func, or_, select
+
+from app import db
+from image_pipeline import variant_urls
+from menu_search import SearchError, decode_cursor, encode_cursor
+from models import MenuItem, Order, orders_archive
+from routes.archive_utils import all_delivery_feedback, all_order_items
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# an order is either live or archived, never both
+ORDER_TABLES = (Order.__table__, orders_archive)
+
+
+class HistoryError(ValueError):
+    pass
+
+
+def parse_history_args(args):
+    """Reads limit and cursor from a request's arguments; raises HistoryError."""
+    try:
+        limit = int(args.get("limit") or DEFAULT_LIMIT)
+    except ValueError:
+        raise HistoryError(f"limit is not a number: {args.get('limit')!r}")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise HistoryError(f"limit must be between 1 and {MAX_LIMIT}")
+
+    after = None
+    if args.get("cursor"):
+        try:
+            created_at, order_id = decode_cursor(args["cursor"])
+            after = (datetime.fromisoformat(created_at), int(order_id))
+        except (SearchError, ValueError, TypeError):
+            raise HistoryError("cursor is not valid")
+    return limit, after
+
+
+def history_page_query(orders, customer_id, limit, after=None):
+    """One table's next `limit` orders of a customer, newest first, from the (customer_id, created_at) index."""
+    query = select(orders).where(orders.c.customer_id == customer_id)
+    if after is not None:
+        created_at, order_id = after
+        query = query.where(
+            orders.c.created_at <= created_at,  # the range the index seeks to; the rest settles ties
+            or_(orders.c.created_at < created_at, orders.c.order_id < order_id),
+        )
+    return query.order_by(orders.c.created_at.desc(), orders.c.order_id.desc()).limit(limit)
+
+
+def order_history_page(customer_id, limit=DEFAULT_LIMIT, after=None):
+    """
+    A page of the customer's orders, live and archived, newest first, by
+    keyset on (created_at, order_id): each table is read from the position
+    `after` for `limit` rows and the two are merged, so every page costs the
+    same however long the history is. Returns (orders, next cursor or None).
+    """
+    rows = []
+    for orders in ORDER_TABLES:
+        rows.extend(db.session.execute(history_page_query(orders, customer_id, limit + 1, after)).all())
+    rows.sort(key=lambda row: (row.created_at, row.order_id), reverse=True)
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor([last.created_at.isoformat(), last.order_id])
+    return page, next_cursor
+
+
+def order_previews(order_ids):
+    """
+    {order_id: preview} for a page of orders, in one query: the first item's
+    name, image and image key, the number of lines and the number of items.
+    """
+    if not order_ids:
+        return {}
+    items = all_order_items()
+    per_order = (
+        select(
+            items.c.order_id,
+            func.min(items.c.order_item_id).label("first_item_id"),
+            func.count().label("lines"),
+            func.sum(items.c.quantity).label("item_count"),
+        )
+        .where(items.c.order_id.in_(order_ids))
+        .group_by(items.c.order_id)
+        .subquery()
+    )
+    first_items = all_order_items()
+    rows = db.session.execute(
+        select(
+            per_order.c.order_id, per_order.c.lines, per_order.c.item_count,
+            MenuItem.name, MenuItem.image_url, MenuItem.image_key,
+        )
+        .join(first_items, first_items.c.order_item_id == per_order.c.first_item_id)
+        .join(MenuItem, first_items.c.menu_item_id == MenuItem.menu_item_id)
+    ).all()
+    return {row.order_id: row for row in rows}
+
+
+def thumbnail_url(preview):
+    """The first item's thumbnail, falling back to its original image until it has been processed."""
+    urls = variant_urls(preview.image_key)
+    return urls["thumb"]["jpeg"] if urls else preview.image_url
+
+
+def find_order(order_id, customer_id):
+    """A customer's order, live or else archived, or None: the live table is read first, as most lookups are of recent orders."""
+    for orders in ORDER_TABLES:
+        order = db.session.execute(
+            select(orders).where(orders.c.order_id == order_id, orders.c.customer_id == customer_id)
+        ).first()
+        if order is not None:
+            return order
+    return None
+
+
+def order_lines_query(order_id):
+    items = all_order_items()
+    return (
+        select(
+            items.c.menu_item_id, items.c.quantity, items.c.price,
+            MenuItem.name, MenuItem.discount_percentage,
+        )
+        .join(MenuItem, items.c.menu_item_id == MenuItem.menu_item_id)
+        .where(items.c.order_id == order_id)
+        .order_by(items.c.order_item_id)
+    )
+
+
+def order_lines(order_id):
+    """The items of an order, live or archived, with the menu item's name and discount, in the order they were added."""
+    return db.session.execute(order_lines_query(order_id)).all()
+
+
+def delivery_feedback_query(order_id):
+    feedback = all_delivery_feedback()
+    return select(feedback.c.order_id).where(feedback.c.order_id == order_id).limit(1)
+
+
+def has_delivery_feedback(order_id):
+    return db.session.execute(delivery_feedback_query(order_id)).first() is not None
@@ -1,17 +1,18 @@
 import plotly.graph_objects as go
 from markupsafe import Markup
 import plotly.io as pio
-from models import Address, DeliveryAgent, Order, DeliveryFeedback
+from models import Address, DeliveryAgent
 from sqlalchemy import func, extract
 from datetime import timedelta
 import matplotlib.pyplot as plt
-from app import db
+from analytics_db import analytics_session
+from routes.archive_utils import all_delivery_feedback, all_orders
 import plotly.express as px
 
 
 def generate_Customer_Demographics_Distribution(dark_mode=False):
     # Query all addresses from the database
-    addresses = Address.query.all()
+    addresses = analytics_session().query(Address).all()
 
     # Build a dictionary of counts based on the address_line category
     category_counts = {}
@@ -66,15 +67,21 @@ def generate_Customer_Demographics_Distribution(dark_mode=False):
 
 
 def generate_line_chart(dark_mode=False):
-    agents = DeliveryAgent.query.all()
+    agents = analytics_session().query(DeliveryAgent).all()
     agent_names = []
     early_counts = []
     on_time_counts = []
     late_counts = []
 
+    history = all_orders()
     for agent in agents:
         # Use the correct primary key for filtering orders
-        orders = Order.query.filter_by(delivery_agent_id=agent.delivery_agent_id).all()
+        orders = (
+            analytics_session()
+            .query(history.c.created_at, history.c.delivered_at)
+            .filter(history.c.delivery_agent_id == agent.delivery_agent_id)
+            .all()
+        )
         early = 0
         on_time = 0
         late = 0
@@ -177,18 +184,26 @@ def generate_Effectiveness_of_Promotions(dark_mode=False):
 
 def generate_agent_rating_chart(dark_mode=False):
     # Get all delivery agents and initialize a dictionary for ratings count
-    agents = DeliveryAgent.query.all()
+    agents = analytics_session().query(DeliveryAgent).all()
     agent_names = [agent.username for agent in agents]
     ratings_count_per_agent = {
         agent.username: {r: 0 for r in range(1, 6)} for agent in agents
     }
 
     # Count ratings for each agent using the correct primary key field
+    feedback = all_delivery_feedback()
     for agent in agents:
         for rating_value in range(1, 6):
-            count = DeliveryFeedback.query.filter_by(
-                delivery_agent_id=agent.delivery_agent_id, rating=rating_value
-            ).count()
+            count = (
+                analytics_session()
+                .query(func.count())
+                .select_from(feedback)
+                .filter(
+                    feedback.c.delivery_agent_id == agent.delivery_agent_id,
+                    feedback.c.rating == rating_value,
+                )
+                .scalar()
+            )
             ratings_count_per_agent[agent.username][rating_value] = count
 
     colors = {
@@ -230,8 +245,15 @@ def generate_agent_rating_chart(dark_mode=False):
 def generate_customer_feedback_chart(dark_mode=False):
     # Count ratings for each star value (1 to 5) from DeliveryFeedback entries
     feedback_counts = {}
+    feedback = all_delivery_feedback()
     for star in range(1, 6):
-        count = DeliveryFeedback.query.filter_by(rating=star).count()
+        count = (
+            analytics_session()
+            .query(func.count())
+            .select_from(feedback)
+            .filter(feedback.c.rating == star)
+            .scalar()
+        )
         feedback_counts[star] = count  
 
     ratings = list(feedback_counts.keys())
@@ -269,6 +291,7 @@ def generate_customer_feedback_chart(dark_mode=False):
 
 
 def generate_monthly_retention_chart(dark_mode=False):
+    history = all_orders()
     months = [
         "Jan",
         "Feb",
@@ -288,26 +311,26 @@ def generate_monthly_retention_chart(dark_mode=False):
     for month_num in range(1, 13):
         # Total customers who ordered in that month using the correct field name
         total_customers = (
-            db.session.query(Order.customer_id)
-            .filter(extract("month", Order.created_at) == month_num)
+            analytics_session().query(history.c.customer_id)
+            .filter(extract("month", history.c.created_at) == month_num)
             .distinct()
             .count()
         )
 
         repeat_customers = 0
         unique_users = (
-            db.session.query(Order.customer_id)
-            .filter(extract("month", Order.created_at) == month_num)
+            analytics_session().query(history.c.customer_id)
+            .filter(extract("month", history.c.created_at) == month_num)
             .distinct()
             .all()
         )
 
         for (customer_id,) in unique_users:
             order_count = (
-                db.session.query(Order.order_id)
+                analytics_session().query(history.c.order_id)
                 .filter(
-                    Order.customer_id == customer_id,
-                    extract("month", Order.created_at) <= month_num,
+                    history.c.customer_id == customer_id,
+                    extract("month", history.c.created_at) <= month_num,
                 )
                 .count()
             )
@@ -343,14 +366,15 @@ def generate_monthly_retention_chart(dark_mode=False):
 
 def calculate_average_delivery_time():
     """Calculate the average delivery time (in minutes) for delivered orders."""
+    history = all_orders()
     result = (
-        db.session.query(
+        analytics_session().query(
             func.avg(
-                func.strftime("%s", Order.delivered_at)
-                - func.strftime("%s", Order.created_at)
+                func.strftime("%s", history.c.delivered_at)
+                - func.strftime("%s", history.c.created_at)
             )
         )
-        .filter(Order.delivered_at.isnot(None))
+        .filter(history.c.delivered_at.isnot(None))
         .first()
     )
 
@@ -363,7 +387,8 @@ def calculate_average_delivery_time():
 
 def calculate_delivery_partner_performance():
     """Calculate the average delivery partner performance based on customer ratings."""
-    avg_rating = db.session.query(func.avg(DeliveryFeedback.rating)).scalar()
+    feedback = all_delivery_feedback()
+    avg_rating = analytics_session().query(func.avg(feedback.c.rating)).scalar()
     if avg_rating:
         performance_percent = round((avg_rating / 5) * 100)
         return performance_percent
@@ -375,10 +400,11 @@ def calculate_return_refund_statistics():
     Calculate return & refund statistics.
     Assumes orders with status 'Refunded' indicate a refund.
     """
-    total_orders = db.session.query(func.count(Order.order_id)).scalar()
+    history = all_orders()
+    total_orders = analytics_session().query(func.count(history.c.order_id)).scalar()
     refunded_orders = (
-        db.session.query(func.count(Order.order_id))
-        .filter(Order.delivery_status == "Refunded")
+        analytics_session().query(func.count(history.c.order_id))
+        .filter(history.c.delivery_status == "Refunded")
         .scalar()
     )
     if total_orders:
@@ -392,9 +418,10 @@ def calculate_on_time_order_percentage():
     Calculate the percentage of orders delivered on time.
     This demo assumes that orders with status 'Delivered' are on time.
     """
+    history = all_orders()
     total_delivered = (
-        db.session.query(func.count(Order.order_id))
-        .filter(Order.delivery_status == "Delivered")
+        analytics_session().query(func.count(history.c.order_id))
+        .filter(history.c.delivery_status == "Delivered")
         .scalar()
     )
     if total_delivered:
@@ -404,15 +431,16 @@ def calculate_on_time_order_percentage():
 
 def calculate_revenue_per_delivery():
     """Calculate the average revenue per delivered order."""
+    history = all_orders()
     total_revenue = (
-        db.session.query(func.sum(Order.total_price))
-        .filter(Order.delivery_status == "Delivered")
+        analytics_session().query(func.sum(history.c.total_price))
+        .filter(history.c.delivery_status == "Delivered")
         .scalar()
         or 0
     )
     total_deliveries = (
-        db.session.query(func.count(Order.order_id))
-        .filter(Order.delivery_status == "Delivered")
+        analytics_session().query(func.count(history.c.order_id))
+        .filter(history.c.delivery_status == "Delivered")
         .scalar()
         or 0
     )
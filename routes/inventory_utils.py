@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import bindparam, delete, insert, update
+
+from app import db
+from key_allocator import allocate_id
+from models import Cart, MenuItem, StockReservation
+
+menu_items = MenuItem.__table__
+reservations = StockReservation.__table__
+
+# UPDATE ... WHERE stock_available >= quantity: the check and the decrement are one
+# statement, so concurrent checkouts can never take the same unit twice.
+take_stock = (
+    update(menu_items)
+    .where(
+        menu_items.c.menu_item_id == bindparam("item_id"),
+        menu_items.c.stock_available >= bindparam("quantity"),
+    )
+    .values(stock_available=menu_items.c.stock_available - bindparam("quantity"))
+)
+
+return_stock = (
+    update(menu_items)
+    .where(menu_items.c.menu_item_id == bindparam("item_id"))
+    .values(stock_available=menu_items.c.stock_available + bindparam("quantity"))
+)
+
+
+class InsufficientStock(ValueError):
+    def __init__(self, item_name):
+        super().__init__(f"Insufficient stock for {item_name}")
+        self.item_name = item_name
+
+
+def hold_duration():
+    return timedelta(minutes=current_app.config.get('STOCK_HOLD_MINUTES', 10))
+
+
+def _delete_reservations(rows):
+    """
+    Deletes reservation rows one by one and returns the ones this call actually
+    removed, so a hold consumed by checkout is never also released by the sweep.
+    """
+    removed = []
+    for row in rows:
+        result = db.session.execute(
+            delete(reservations).where(reservations.c.reservation_id == row.reservation_id)
+        )
+        if result.rowcount == 1:
+            removed.append(row)
+    return removed
+
+
+def _credit(rows):
+    if rows:
+        db.session.execute(return_stock, [
+            {"item_id": row.menu_item_id, "quantity": row.quantity} for row in rows
+        ])
+
+
+def release_expired_holds():
+    """Gives the stock of expired holds back to the menu. Returns the number released."""
+    expired = db.session.execute(
+        reservations.select().where(reservations.c.expires_at <= datetime.utcnow())
+    ).all()
+    released = _delete_reservations(expired)
+    _credit(released)
+    return len(released)
+
+
+def release_holds(customer_id):
+    """Gives back everything currently held for the customer."""
+    held = db.session.execute(
+        reservations.select().where(reservations.c.customer_id == customer_id)
+    ).all()
+    _credit(_delete_reservations(held))
+
+
+def hold_cart(customer_id):
+    """
+    Holds stock for the customer's cart until checkout or until the hold expires.
+    Existing holds are replaced so quantity changes in the cart are picked up.
+    Items that cannot be held are skipped; checkout re-checks them atomically.
+    Returns the names of the items that could not be held. The caller commits.
+    """
+    release_expired_holds()
+    release_holds(customer_id)
+
+    cart_rows = (
+        db.session.query(Cart.menu_item_id, Cart.quantity, MenuItem.name)
+        .join(MenuItem, Cart.menu_item_id == MenuItem.menu_item_id)
+        .filter(Cart.customer_id == customer_id)
+        .all()
+    )
+    expires_at = datetime.utcnow() + hold_duration()
+    connection = db.session.connection()
+
+    held, not_held = [], []
+    for row in cart_rows:
+        result = db.session.execute(take_stock, {"item_id": row.menu_item_id, "quantity": row.quantity})
+        if result.rowcount == 1:
+            held.append({
+                "reservation_id": allocate_id(StockReservation, connection),
+                "customer_id": customer_id,
+                "menu_item_id": row.menu_item_id,
+                "quantity": row.quantity,
+                "expires_at": expires_at,
+            })
+        else:
+            not_held.append(row.name)
+
+    if held:
+        db.session.execute(insert(StockReservation), held)
+    return not_held
+
+
+def consume_stock(customer_id, cart_rows):
+    """
+    Takes the stock for an order. Quantities covered by the customer's live
+    holds are already off the shelf; the rest is taken with conditional
+    decrements. Raises InsufficientStock if any item runs out, in which case
+    the caller must roll back.
+    """
+    live_holds = db.session.execute(
+        reservations.select().where(
+            reservations.c.customer_id == customer_id,
+            reservations.c.expires_at > datetime.utcnow(),
+        )
+    ).all()
+    held = {row.menu_item_id: row.quantity for row in _delete_reservations(live_holds)}
+
+    needed = []
+    surplus = []
+    for row in cart_rows:
+        remaining = row.quantity - held.pop(row.menu_item_id, 0)
+        if remaining > 0:
+            needed.append({"item_id": row.menu_item_id, "quantity": remaining, "name": row.name})
+        elif remaining < 0:
+            surplus.append({"item_id": row.menu_item_id, "quantity": -remaining})
+    # Held items that are no longer in the cart go back as well
+    surplus.extend({"item_id": item_id, "quantity": quantity} for item_id, quantity in held.items())
+
+    for row in needed:
+        # one decrement per item, so the item that ran out is the one whose UPDATE matched nothing;
+        # the caller rolls back the ones taken before it
+        result = db.session.execute(take_stock, {"item_id": row["item_id"], "quantity": row["quantity"]})
+        if result.rowcount != 1:
+            raise InsufficientStock(row["name"])
+
+    if surplus:
+        db.session.execute(return_stock, surplus)
@@ -0,0 +1,267 @@
+import codecs
+import csv
+import io
+import json
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import bindparam, func, select, update
+
+from app import db
+from data_versions import MENU, bump_version
+from key_allocator import allocate_id
+from models import Category, MenuItem, Subcategory
+
+menu_items = MenuItem.__table__
+
+# Columns of an import/export row, in file order
+MENU_FIELDS = (
+    "name", "description", "price", "category_name", "subcategory_name",
+    "nutrient_value", "calorie_count", "discount_percentage", "image_url",
+    "is_best_seller", "stock_available",
+)
+REQUIRED_FIELDS = ("name", "description", "price", "category_name", "subcategory_name")
+# Given to a new item for an optional field its row leaves out; an existing item keeps its own value
+INSERT_DEFAULTS = {
+    "nutrient_value": "N/A",
+    "calorie_count": 0,
+    "discount_percentage": Decimal(0),
+    "image_url": "",
+    "is_best_seller": False,
+    "stock_available": 100,
+    "is_out_of_stock": False,
+}
+FORMATS = ("csv", "jsonl", "json")
+
+
+class RowError(ValueError):
+    pass
+
+
+def _decimal(value, field):
+    try:
+        number = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        raise RowError(f"{field} is not a number: {value!r}")
+    if not number.is_finite():  # NaN would raise InvalidOperation on the range checks
+        raise RowError(f"{field} is not a number: {value!r}")
+    return number
+
+
+def _integer(value, field):
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise RowError(f"{field} is not a whole number: {value!r}")
+
+
+def _boolean(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("yes", "true", "1", "y")
+
+
+def read_rows(stream, fmt):
+    """
+    Yields the rows of a binary upload one at a time. CSV and JSON Lines are
+    parsed as they are read; a JSON array has to be loaded whole.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(codecs.getreader("utf-8-sig")(stream))
+    elif fmt == "jsonl":
+        for line in codecs.getreader("utf-8")(stream):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    yield RowError(f"invalid JSON: {e}")  # reported against this row, the rest still import
+    elif fmt == "json":
+        yield from json.load(stream)
+    else:
+        raise ValueError(f"Unsupported format {fmt!r}, expected one of {', '.join(FORMATS)}")
+
+
+class MenuImporter:
+    """
+    Upserts menu items by name in batches inside the caller's transaction.
+
+    Categories and subcategories are read once up front. Each batch costs one
+    SELECT to find the items that already exist, one executemany INSERT and
+    one executemany UPDATE per set of columns the rows carry: an update
+    writes only the optional fields its row has, so a file without stock or
+    images leaves them as they are. Rows that fail validation are skipped
+    and reported with their row number; the caller decides whether to commit.
+    """
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.inserted = 0
+        self.updated = 0
+        self.errors = []
+        self._batch = {}  # lower-cased name -> (row number, values); a later row for the same name wins
+        self._categories = {
+            name.lower(): category_id
+            for category_id, name in db.session.execute(
+                select(Category.category_id, Category.name).order_by(Category.category_id.desc()))
+        }
+        self._subcategories = {
+            (category_id, name.lower()): subcategory_id
+            for subcategory_id, category_id, name in db.session.execute(
+                select(Subcategory.subcategory_id, Subcategory.category_id, Subcategory.name)
+                .order_by(Subcategory.subcategory_id.desc()))
+        }
+
+    def _values(self, row):
+        missing = [field for field in REQUIRED_FIELDS if not str(row.get(field) or "").strip()]
+        if missing:
+            raise RowError(f"missing {', '.join(missing)}")
+
+        category_id = self._categories.get(str(row["category_name"]).strip().lower())
+        if category_id is None:
+            raise RowError(f"Category '{row['category_name']}' not found")
+        subcategory_id = self._subcategories.get((category_id, str(row["subcategory_name"]).strip().lower()))
+        if subcategory_id is None:
+            raise RowError(f"Subcategory '{row['subcategory_name']}' not found in '{row['category_name']}'")
+
+        def given(field):
+            return str(row.get(field) if row.get(field) is not None else "").strip() != ""
+
+        values = {
+            "name": str(row["name"]).strip(),
+            "description": str(row["description"]),
+            "price": _decimal(row["price"], "price"),
+            "category_id": category_id,
+            "subcategory_id": subcategory_id,
+        }
+        if values["price"] < 0:
+            raise RowError("price is negative")
+        if given("discount_percentage"):
+            values["discount_percentage"] = _decimal(row["discount_percentage"], "discount_percentage")
+            if not 0 <= values["discount_percentage"] <= 100:
+                raise RowError("discount_percentage must be between 0 and 100")
+        if given("stock_available"):
+            values["stock_available"] = _integer(row["stock_available"], "stock_available")
+            if values["stock_available"] < 0:
+                raise RowError("stock_available is negative")
+            values["is_out_of_stock"] = values["stock_available"] == 0
+        if given("nutrient_value"):
+            values["nutrient_value"] = str(row["nutrient_value"])
+        if given("calorie_count"):
+            values["calorie_count"] = _integer(row["calorie_count"], "calorie_count")
+        if given("image_url"):
+            values["image_url"] = str(row["image_url"])
+        if given("is_best_seller"):
+            values["is_best_seller"] = _boolean(row["is_best_seller"])
+        return values
+
+    def add(self, row_number, row):
+        try:
+            values = self._values(row)
+        except RowError as e:
+            self.errors.append({"row": row_number, "name": row.get("name"), "error": str(e)})
+            return
+        self._batch[values["name"].lower()] = (row_number, values)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, {}
+
+        existing = dict(db.session.execute(
+            select(func.lower(menu_items.c.name), menu_items.c.menu_item_id)
+            .where(func.lower(menu_items.c.name).in_(list(batch)))
+        ).all())
+
+        connection = db.session.connection()
+        inserts, updates = [], defaultdict(list)  # updates: columns -> parameter sets
+        for key, (_, values) in batch.items():
+            if key in existing:
+                updates[tuple(values)].append({**{f"new_{column}": value for column, value in values.items()},
+                                               "item_id": existing[key]})
+            else:
+                inserts.append({**INSERT_DEFAULTS, **values, "menu_item_id": allocate_id(MenuItem, connection)})
+
+        if inserts:
+            db.session.execute(menu_items.insert(), inserts)
+        for columns, parameters in updates.items():
+            db.session.execute(
+                update(menu_items)
+                .where(menu_items.c.menu_item_id == bindparam("item_id"))
+                .values({column: bindparam(f"new_{column}") for column in columns}),
+                parameters,
+            )
+        self.inserted += len(inserts)
+        self.updated += sum(len(parameters) for parameters in updates.values())
+
+    def run(self, rows):
+        """Imports every row; row numbers count from 1 for the first data row."""
+        for row_number, row in enumerate(rows, start=1):
+            if isinstance(row, RowError):
+                self.errors.append({"row": row_number, "name": None, "error": str(row)})
+                continue
+            if not isinstance(row, dict):
+                self.errors.append({"row": row_number, "name": None, "error": "row is not an object"})
+                continue
+            self.add(row_number, row)
+        self.flush()
+        if self.inserted or self.updated:
+            bump_version(MENU)
+        return self.summary()
+
+    def summary(self):
+        return {"inserted": self.inserted, "updated": self.updated, "errors": self.errors}
+
+
+def _export_rows(chunk_size=1000):
+    statement = (
+        select(
+            MenuItem.name, MenuItem.description, MenuItem.price,
+            Category.name.label("category_name"), Subcategory.name.label("subcategory_name"),
+            MenuItem.nutrient_value, MenuItem.calorie_count, MenuItem.discount_percentage,
+            MenuItem.image_url, MenuItem.is_best_seller, MenuItem.stock_available,
+        )
+        .join(Category, MenuItem.category_id == Category.category_id)
+        .join(Subcategory, MenuItem.subcategory_id == Subcategory.subcategory_id)
+        .order_by(MenuItem.menu_item_id)
+        .execution_options(yield_per=chunk_size)
+    )
+    for row in db.session.execute(statement):
+        yield row._mapping
+
+
+def export_menu(fmt):
+    """Yields the menu as text chunks, one row at a time, reading the items in chunks."""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(MENU_FIELDS)
+        for row in _export_rows():
+            writer.writerow([row[field] for field in MENU_FIELDS])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    elif fmt in ("jsonl", "json"):
+        separator = "[\n" if fmt == "json" else ""
+        for row in _export_rows():
+            record = {
+                field: float(row[field]) if isinstance(row[field], Decimal) else row[field]
+                for field in MENU_FIELDS
+            }
+            yield separator + json.dumps(record)
+            separator = ",\n" if fmt == "json" else "\n"
+        if fmt == "json":
+            yield "[]\n" if separator == "[\n" else "\n]\n"
+        elif separator:
+            yield "\n"
+    else:
+        raise ValueError(f"Unsupported format {fmt!r}, expected one of {', '.join(FORMATS)}")
+
+
+def guess_format(filename, default="csv"):
+    extension = filename.rsplit(".", 1)[-1].lower() if filename and "." in filename else ""
+    if extension == "ndjson":
+        return "jsonl"
+    return extension if extension in FORMATS else default
@@ -0,0 +1,80 @@
+from datetime import datetime
+
+from sqlalchemy import delete, insert
+
+from app import db
+from cart_summary import bump_cart
+from data_versions import ORDERS, bump_version
+from key_allocator import allocate_id
+from models import Cart, Order, OrderItem
+from pricing import money, quote_cache
+from routes.inventory_utils import InsufficientStock, consume_stock
+
+
+class CheckoutError(ValueError):
+    """Raised when the cart cannot be turned into an order (empty, out of stock)."""
+
+
+class PriceChanged(CheckoutError):
+    """Raised when the cart no longer costs what the customer was shown."""
+
+    def __init__(self, quote):
+        super().__init__(f"The total is now ₹{quote.total}; please review your order")
+        self.quote = quote
+
+
+def place_order_from_cart(customer_id, delivery_location, expected_total=None):
+    """
+    Turns the customer's cart into an order with one batched write.
+
+    The cart is priced by pricing.QuoteCache.checkout_quote, which reuses
+    the quote the order pages showed if the cart and menu are unchanged and
+    otherwise reads the cart and its menu items in a single query. If the
+    customer was shown a different total (`expected_total`), PriceChanged
+    is raised and nothing is written. Stock is taken with conditional
+    decrements (see inventory_utils.consume_stock), ids come from the key
+    allocator so nothing needs to be flushed to learn them, and then the
+    order row with its price breakdown, all order items (one executemany)
+    and the cart delete are sent in the same transaction.
+    Returns the new order's integer key. The caller commits.
+    """
+    quote = quote_cache().checkout_quote(customer_id)
+    cart_rows = quote.lines
+    if not cart_rows:
+        raise CheckoutError("Cart is empty")
+    if expected_total is not None and money(expected_total) != quote.total:
+        raise PriceChanged(quote)
+
+    try:
+        consume_stock(customer_id, cart_rows)
+    except InsufficientStock as e:
+        raise CheckoutError(str(e))
+
+    connection = db.session.connection()
+    order_id = allocate_id(Order, connection)
+
+    db.session.execute(insert(Order), [{
+        "order_id": order_id,
+        "customer_id": customer_id,
+        "delivery_agent_id": None,
+        "delivery_status": "Pending",
+        **quote.breakdown(),
+        "delivery_location": delivery_location,
+        "created_at": datetime.utcnow(),
+    }])
+
+    db.session.execute(insert(OrderItem), [
+        {
+            "order_item_id": allocate_id(OrderItem, connection),
+            "order_id": order_id,
+            "menu_item_id": row.menu_item_id,
+            "quantity": row.quantity,
+            "price": row.price,
+        }
+        for row in cart_rows
+    ])
+
+    db.session.execute(delete(Cart).where(Cart.customer_id == customer_id))
+    bump_version(ORDERS)
+    bump_cart(customer_id)
+    return order_id
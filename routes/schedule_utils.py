@@ -0,0 +1,210 @@
+import math
+from collections import defaultdict
+
+from sqlalchemy import bindparam, case, func, literal, select, union, update
+
+from app import db
+from models import Category, MenuItem, ScheduledChange, ScheduledRule, Subcategory
+
+menu_items = MenuItem.__table__
+scheduled_changes = ScheduledChange.__table__
+scheduled_rules = ScheduledRule.__table__
+
+# bounds a rule keeps each field within
+RULE_FIELD_BOUNDS = {
+    "price": (0, None),
+    "discount_percentage": (0, 100),
+}
+
+
+def lookup_ids(model, id_column, names):
+    """Maps lower-cased names to ids in one query; the lowest id wins for duplicate names."""
+    if not names:
+        return {}
+    rows = db.session.execute(
+        select(func.lower(model.name), id_column)
+        .where(func.lower(model.name).in_(names))
+        .order_by(id_column.desc())
+    ).all()
+    return dict(rows)
+
+
+def lookup_category_id(name):
+    """The category a change names, or None if there is no such category."""
+    if not name:
+        return None
+    return lookup_ids(Category, Category.category_id, {str(name).lower()}).get(str(name).lower())
+
+
+def lookup_subcategory_id(name):
+    if not name:
+        return None
+    return lookup_ids(Subcategory, Subcategory.subcategory_id, {str(name).lower()}).get(str(name).lower())
+
+
+def rule_number(value, field):
+    """A rule's value or price bound as a float, refusing NaN and infinity along with non-numbers."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} is not a number: {value!r}")
+    if not math.isfinite(number):
+        raise ValueError(f"{field} is not a number: {value!r}")
+    return number
+
+
+def _column_values(row):
+    values = {field: row[field] for field in ScheduledChange.FIELDS if row[field] is not None}
+    if "stock_available" in values:
+        values["is_out_of_stock"] = values["stock_available"] == 0
+    return values
+
+
+def pending_due_times():
+    """Distinct due times of the pending changes and rules, read from their (status, due_at) indexes alone."""
+    return db.session.execute(
+        union(
+            select(scheduled_changes.c.due_at).where(scheduled_changes.c.status == "Pending"),
+            select(scheduled_rules.c.due_at).where(scheduled_rules.c.status == "Pending"),
+        )
+    ).scalars().all()
+
+
+def rule_filter(rule):
+    """The WHERE conditions on menu_items selecting the items a rule applies to."""
+    conditions = []
+    if rule.category_id is not None:
+        conditions.append(menu_items.c.category_id == rule.category_id)
+    if rule.subcategory_id is not None:
+        conditions.append(menu_items.c.subcategory_id == rule.subcategory_id)
+    if rule.is_best_seller is not None:
+        conditions.append(menu_items.c.is_best_seller == rule.is_best_seller)
+    if rule.min_price is not None:
+        conditions.append(menu_items.c.price >= rule.min_price)
+    if rule.max_price is not None:
+        conditions.append(menu_items.c.price <= rule.max_price)
+    return conditions
+
+
+def count_rule_items(rule):
+    return db.session.execute(
+        select(func.count()).select_from(menu_items).where(*rule_filter(rule))
+    ).scalar()
+
+
+def _rule_value(rule):
+    """The SQL expression for the new value of the rule's field."""
+    column = menu_items.c[rule.field]
+    current = func.coalesce(column, 0)
+    if rule.operation == "percent":
+        new_value = func.round(current * (100 + literal(rule.value)) / 100, 2)
+    elif rule.operation == "absolute":
+        new_value = current + literal(rule.value)
+    else:
+        new_value = literal(rule.value)
+
+    low, high = RULE_FIELD_BOUNDS[rule.field]
+    if high is not None:
+        new_value = case((new_value > high, high), else_=new_value)
+    return case((new_value < low, low), else_=new_value)
+
+
+def due_rules_query(now):
+    return (
+        select(scheduled_rules)
+        .where(scheduled_rules.c.status == "Pending", scheduled_rules.c.due_at <= now)
+        .order_by(scheduled_rules.c.due_at, scheduled_rules.c.rule_id)
+    )
+
+
+def due_changes_query(now):
+    return (
+        select(scheduled_changes)
+        .where(scheduled_changes.c.status == "Pending", scheduled_changes.c.due_at <= now)
+        .order_by(scheduled_changes.c.due_at, scheduled_changes.c.change_id)
+    )
+
+
+def apply_due_rules(now):
+    """
+    Applies every pending scheduled rule due by `now`, in due_at order, each
+    with a single UPDATE over the items it matches. A rule is marked Applied,
+    guarded on it still being Pending, in the same transaction. Returns the
+    number of item rows updated. The caller commits.
+    """
+    due = db.session.execute(due_rules_query(now)).all()
+
+    updated = 0
+    for rule in due:
+        claimed = db.session.execute(
+            update(scheduled_rules)
+            .where(scheduled_rules.c.rule_id == rule.rule_id, scheduled_rules.c.status == "Pending")
+            .values(status="Applied", applied_at=now)
+        ).rowcount
+        if not claimed:
+            continue  # cancelled in the meantime
+        count = db.session.execute(
+            update(menu_items).where(*rule_filter(rule)).values({rule.field: _rule_value(rule)})
+        ).rowcount
+        db.session.execute(
+            update(scheduled_rules).where(scheduled_rules.c.rule_id == rule.rule_id).values(items_updated=count)
+        )
+        updated += count
+    return updated
+
+
+def apply_due_updates(now):
+    """
+    Applies every pending scheduled change due by `now` (naive UTC) as a set.
+
+    The due changes are read in one query and merged per item in due_at
+    order, so a later change overrides the columns it sets. The changes are
+    marked Applied before the items are touched; one cancelled in the
+    meantime is no longer Pending and is left out. The items are then grouped
+    by the columns they change and each group is written with a single
+    executemany UPDATE. Returns the number of items updated. The caller
+    commits.
+    """
+    due = db.session.execute(due_changes_query(now)).mappings().all()
+    if not due:
+        return 0
+
+    change_ids = [row["change_id"] for row in due]
+    marked = db.session.execute(
+        update(scheduled_changes)
+        .where(scheduled_changes.c.change_id.in_(change_ids), scheduled_changes.c.status == "Pending")
+        .values(status="Applied", applied_at=now)
+    ).rowcount
+    if marked != len(change_ids):
+        # some were cancelled or applied elsewhere between the read and the update
+        still_ours = set(db.session.execute(
+            select(scheduled_changes.c.change_id)
+            .where(
+                scheduled_changes.c.change_id.in_(change_ids),
+                scheduled_changes.c.status == "Applied",
+                scheduled_changes.c.applied_at == now,
+            )
+        ).scalars())
+        due = [row for row in due if row["change_id"] in still_ours]
+
+    merged = defaultdict(dict)
+    for row in due:
+        merged[row["menu_item_id"]].update(_column_values(row))
+
+    groups = defaultdict(list)
+    for menu_item_id, values in merged.items():
+        params = {f"new_{column}": value for column, value in values.items()}
+        params["item_id"] = menu_item_id
+        groups[tuple(sorted(values))].append(params)
+
+    updated = 0
+    for columns, params in groups.items():
+        if not columns:
+            continue
+        statement = (
+            update(menu_items)
+            .where(menu_items.c.menu_item_id == bindparam("item_id"))
+            .values({column: bindparam(f"new_{column}") for column in columns})
+        )
+        updated += db.session.execute(statement, params).rowcount
+    return updated
@@ -191,7 +191,12 @@ document.addEventListener("DOMContentLoaded", function () {
             body: JSON.stringify(orderData)
         })
             .then(response => {
-                if (!response.ok) throw new Error('Failed to place order');
+                if (!response.ok) {
+                    // the server prices the order; a 409 means the cart or the prices changed since this page loaded
+                    return response.json().catch(() => ({})).then(body => {
+                        throw new Error(body.error || 'Failed to place order');
+                    });
+                }
                 return response.json();
             })
             .then(data => {
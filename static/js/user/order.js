@@ -47,27 +47,22 @@ document.addEventListener("DOMContentLoaded", async function () {
         }
     }
 
-    async function saveCart() {
-        console.log("Saving cart to server:", cart);
+    // Change one cart line on the server: op is "add", "increment", "set" or "remove"
+    async function updateCartLine(op, menuItemId, quantity) {
         try {
-            const cartData = cart.map(item => ({
-                menu_item_id: item.menu_item_id,
-                quantity: item.quantity,
-                name: item.name,
-                price: item.price
-            }));
             const response = await fetch('/api/cart', {
-                method: 'POST',
+                method: 'PATCH',
                 headers: { 'Content-Type': 'application/json' },
                 credentials: 'include',
-                body: JSON.stringify({ items: cartData })
+                body: JSON.stringify({ op, menu_item_id: menuItemId, quantity })
             });
-            if (!response.ok) throw new Error('Failed to save cart: ' + response.statusText);
+            if (!response.ok) throw new Error('Failed to update cart: ' + response.statusText);
             const result = await response.json();
-            cart = result.data || cart;
-            console.log("Cart saved to server:", cart);
+            console.log("Cart line updated:", result);
+            return result; // { menu_item_id, quantity, version }
         } catch (error) {
-            console.error("Error saving cart:", error);
+            console.error("Error updating cart:", error);
+            return null;
         }
     }
 
@@ -82,9 +77,9 @@ document.addEventListener("DOMContentLoaded", async function () {
     }
 
     // Function to populate order history
-    function populateOrderHistory(orders) {
+    function populateOrderHistory(orders, append = false) {
         const orderHistoryTable = document.getElementById('order-history-details');
-        orderHistoryTable.innerHTML = ''; // Clear existing content
+        if (!append) orderHistoryTable.innerHTML = ''; // Clear existing content
         
         console.log("we are here with previous data",orders);
         const baseUrl = "https://HiFiDeliveryEats.com/";
@@ -92,7 +87,8 @@ document.addEventListener("DOMContentLoaded", async function () {
 
         orders.forEach(order => {
             const row = document.createElement('tr');
-            image_src = `${staticImagePath}${order.image.replace(baseUrl, '')}`
+            // the thumbnail variant when the item's image has been processed
+            image_src = order.thumbnail || `${staticImagePath}${order.image.replace(baseUrl, '')}`
             row.innerHTML = `
             <td>${order.order_id}</td>
             <td>${order.name || 'Customer'}</td>
@@ -109,23 +105,36 @@ document.addEventListener("DOMContentLoaded", async function () {
             orderHistoryTable.appendChild(row);
         });
         // Show/hide the order history section based on data
-        document.getElementById('order-history').style.display = orders.length > 0 ? 'block' : 'none';
+        document.getElementById('order-history').style.display = orderHistoryTable.children.length > 0 ? 'block' : 'none';
     }
 
-    fetch('/api/orders/history', {
-        headers: {
-            'Content-Type': 'application/json'
-        }
-    })
-    .then(response => response.json())
-    .then(data => {
-        if (data.ok) {
-            populateOrderHistory(data.orders);
-        } else {
-            console.error('Error fetching order history:', data.error);
-        }
-    })
-    .catch(error => console.error('Fetch error:', error));
+    // Order history is fetched a page at a time; "Load more" follows the cursor of the last page
+    const loadMoreOrdersButton = document.getElementById('load-more-orders');
+    let orderHistoryCursor = null;
+
+    function fetchOrderHistory(append = false) {
+        const params = new URLSearchParams({ summary: '1' });
+        if (orderHistoryCursor) params.set('cursor', orderHistoryCursor);
+        fetch(`/api/orders/history?${params}`, {
+            headers: {
+                'Content-Type': 'application/json'
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.ok) {
+                populateOrderHistory(data.orders, append);
+                orderHistoryCursor = data.next_cursor;
+                if (loadMoreOrdersButton) loadMoreOrdersButton.style.display = data.next_cursor ? 'inline-block' : 'none';
+            } else {
+                console.error('Error fetching order history:', data.error);
+            }
+        })
+        .catch(error => console.error('Fetch error:', error));
+    }
+
+    if (loadMoreOrdersButton) loadMoreOrdersButton.addEventListener('click', () => fetchOrderHistory(true));
+    fetchOrderHistory();
 
     
     // Initial fetches
@@ -196,8 +205,8 @@ document.addEventListener("DOMContentLoaded", async function () {
         if (clearSelectedButton) {
             clearSelectedButton.addEventListener("click", async function () {
                 const selectedItems = Array.from(document.querySelectorAll(".cart__item-checkbox input:checked")).map(input => parseInt(input.value));
+                await Promise.all(selectedItems.map(index => updateCartLine("remove", cart[index].menu_item_id)));
                 cart = cart.filter((_, index) => !selectedItems.includes(index));
-                await saveCart();
                 displayCartItems();
                 updateCartCount();
             });
@@ -262,20 +271,19 @@ document.addEventListener("DOMContentLoaded", async function () {
             return;
         }
 
-        item.quantity = currentQuantity + 1;
-        await saveCart();
+        const result = await updateCartLine("increment", item.menu_item_id, 1);
+        item.quantity = result ? result.quantity : currentQuantity + 1;
         displayCartItems();
         updateCartCount();
     }
 
     async function decreaseQuantity(index) {
         const item = cart[index];
-        if (item.quantity > 1) {
-            item.quantity -= 1;
-        } else {
+        const result = await updateCartLine("increment", item.menu_item_id, -1);
+        item.quantity = result ? result.quantity : item.quantity - 1;
+        if (item.quantity <= 0) {
             cart.splice(index, 1);
         }
-        await saveCart();
         displayCartItems();
         updateCartCount();
     }
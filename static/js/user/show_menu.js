@@ -22,33 +22,24 @@ async function fetchCart() {
     }
 }
 
-// Function to save cart to the backend
-async function saveCart() {
-    console.log("Saving cart:", cart);
+// Function to change one cart line on the backend: op is "add", "increment", "set" or "remove"
+async function updateCartLine(op, menuItemId, quantity) {
     try {
-      // Normalize cart data to ensure consistency
-      const cartData = cart.map(item => ({
-        menu_item_id: item.menu_item_id,
-        quantity: item.quantity,
-        name: item.name,
-        price: item.price
-      }));
       const response = await fetch('/api/cart', {
-        method: 'POST',
+        method: 'PATCH',
         headers: { 'Content-Type': 'application/json' },
         credentials: 'include',
-        body: JSON.stringify({ items: cartData })
+        body: JSON.stringify({ op, menu_item_id: menuItemId, quantity })
       });
       if (!response.ok) {
-        throw new Error('Failed to save cart: ' + response.statusText);
+        throw new Error('Failed to update cart: ' + response.statusText);
       }
       const result = await response.json();
-      cart = result.data || cart; // Update local cart with server response
-      window.globalCart = cart;
-      console.log("Cart saved:", cart);
-      updateCartCount();
+      console.log("Cart line updated:", result);
+      return result; // { menu_item_id, quantity, version }
     } catch (error) {
-      console.error("Error saving cart:", error);
+      console.error("Error updating cart:", error);
+      return null;
     }
 }
 
@@ -69,15 +60,20 @@ function updateCartCount() {
     }
   }
 
+// Function to fetch the whole menu from the backend
+async function fetchAllMenuItems() {
+  const response = await fetch('/api/menu_items');
+  if (!response.ok) {
+    throw new Error('Failed to fetch menu items');
+  }
+  const result = await response.json(); // Parse the JSON response
+  return result.data; // Extract the 'data' array from your API response
+}
+
 // Function to fetch menu items from the backend
 async function fetchMenuItems() {
   try {
-    const response = await fetch('/api/menu_items');
-    if (!response.ok) {
-      throw new Error('Failed to fetch menu items');
-    }
-    const result = await response.json(); // Parse the JSON response
-    const menuItems = result.data; // Extract the 'data' array from your API response
+    const menuItems = await fetchAllMenuItems();
     console.log(menuItems); // Log to verify the data
     appendDynamicItems(menuItems);
   } catch (error) {
@@ -85,6 +81,23 @@ async function fetchMenuItems() {
   }
 }
 
+// Function to fetch the menu items matching a search, page by page, from the backend
+async function searchMenuItems(params) {
+  const items = [];
+  let cursor = null;
+  do {
+    if (cursor) params.set("cursor", cursor);
+    const response = await fetch(`/api/menu_items?${params.toString()}`);
+    if (!response.ok) {
+      throw new Error('Failed to search menu items');
+    }
+    const result = await response.json();
+    items.push(...result.data);
+    cursor = result.next_cursor;
+  } while (cursor);
+  return items;
+}
+
 // New Function: Fetch Recommendations
 async function fetchRecommendations() {
     try {
@@ -151,7 +164,7 @@ function populateRecommendations(recommendations, isNewUser) {
         console.log(`${item.image_url.replace(baseUrl, '')}  this is at location 151`);
         
         menuItem.innerHTML = `
-        <img src="${staticImagePath}${item.image_url.replace(baseUrl, '')}" alt="${item.name}" class="menu__img" />
+        ${menuImageHtml(item)}
         <h3 class="menu__name">${item.name}</h3>
         <span class="menu__detail">${item.description || "No description available"}</span>
         <div class="menu__price-row">
@@ -165,15 +178,29 @@ function populateRecommendations(recommendations, isNewUser) {
     });
 }
 
+// Function to build a menu card image: the resized WebP/JPEG variants when the item has them
+function menuImageHtml(item) {
+  const baseUrl = "https://HiFiDeliveryEats.com/";
+  const staticImagePath = "/images/";
+  if (item.images) {
+    return `
+      <picture>
+        <source type="image/webp" srcset="${item.images.card.webp} 1x, ${item.images.full.webp} 2x" />
+        <img src="${item.images.card.jpeg}" srcset="${item.images.card.jpeg} 1x, ${item.images.full.jpeg} 2x" alt="${item.name}" class="menu__img" loading="lazy" />
+      </picture>`;
+  }
+  return `<img src="${staticImagePath}${(item.image_url || "").replace(baseUrl, '')}" alt="${item.name}" class="menu__img" loading="lazy" />`;
+}
+
 // Function to append dynamic items to the menu
 function appendDynamicItems(menuItems) {
+    document.querySelectorAll(".menu__container .menu__content.dynamic").forEach(item => item.remove());
+
     if (!menuItems || menuItems.length === 0) {
       console.log("No dynamic menu items to display.");
       return;
     }
   
-    document.querySelectorAll(".menu__container .menu__content.dynamic").forEach(item => item.remove());
-  
     menuItems.forEach((item) => {
       const subcategory = item['subcategory_name'].toLowerCase();
       if (!subcategory) {
@@ -187,8 +214,6 @@ function appendDynamicItems(menuItems) {
   
       if (categorySection) {
         const menuContainer = categorySection.querySelector(".menu__container");
-        const baseUrl = "https://HiFiDeliveryEats.com/";
-        const staticImagePath = "/images/";
         if (menuContainer) {
           const cartItem = cart.find((ci) => ci.itemId === item.menu_item_id);
           const quantity = cartItem ? cartItem.quantity : 0;
@@ -222,7 +247,7 @@ function appendDynamicItems(menuItems) {
             // static\images\Paneer_Biryani.jpg
             // console.log(`${staticImagePath}, ${item.image_url.replace(baseUrl, '')} this is at 222`);
           menuItem.innerHTML = `
-            <img src="${staticImagePath}${item.image_url.replace(baseUrl, '')}" alt="${item.name}" class="menu__img" />
+            ${menuImageHtml(item)}
             <h3 class="menu__name">${item.name}</h3>
             <span class="menu__detail">${item.description || "No description available"}</span>
             <div class="menu__price-row">
@@ -359,7 +384,14 @@ async function updateQuantity(item, change, menuItem) {
     cartControl.innerHTML = cartControlHtml;
     setupCartControls(menuItem, item);
   
-    await saveCart();
+    // only this line changes on the server; the rest of the cart is left alone
+    const result = await updateCartLine("set", item.menu_item_id, newQuantity);
+    if (result) {
+      const line = cart.find(ci => ci.menu_item_id === item.menu_item_id);
+      if (line) line.quantity = result.quantity;
+      cart = cart.filter(ci => ci.quantity > 0);
+      window.globalCart = cart;
+    }
     updateCartCount();
   }
   
@@ -421,8 +453,9 @@ document.addEventListener("DOMContentLoaded",async function () {
       menuSection: !!menuSection
     });
 
-    // Function to apply filters
-    function applyFilters() {
+    // Function to apply filters: the server searches the menu, only the matches are rendered
+    let filterRequest = 0;
+    async function applyFilters() {
       const searchQuery = searchInput?.value.trim().toLowerCase() || "";
       const vegNonVegValue = vegNonVegFilter?.value.toLowerCase() || "";
       const subCategoryValue = subCategoryFilter?.value.toLowerCase() || "";
@@ -439,33 +472,35 @@ document.addEventListener("DOMContentLoaded",async function () {
         headingText = subCategoryValue.charAt(0).toUpperCase() + subCategoryValue.slice(1);
       }
   
-      if (menuHeading) menuHeading.textContent = headingText;
-      else {
+      if (!menuHeading) {
         console.error("menu-heading element not found");
         return;
       }
-  
+
+      const params = new URLSearchParams({ limit: "100" });
+      if (searchQuery) params.set("q", searchQuery);
+      if (vegNonVegValue) params.set("category", vegNonVegValue);
+      if (subCategoryValue) params.set("subcategory", subCategoryValue);
+
+      const request = ++filterRequest;
+      let menuItems;
+      try {
+        menuItems = (searchQuery || vegNonVegValue || subCategoryValue) ? await searchMenuItems(params) : await fetchAllMenuItems();
+      } catch (error) {
+        console.error("Error filtering menu items:", error);
+        return;
+      }
+      if (request !== filterRequest) return; // a newer filter has been applied meanwhile
+
+      menuHeading.textContent = headingText;
+      appendDynamicItems(menuItems);
+
       let hasResults = false;
       menuCategories.forEach((category) => {
         const categorySubcategory = category.dataset.category.toLowerCase();
         const matchesSubCategory = !subCategoryValue || categorySubcategory === subCategoryValue;
-        const items = category.querySelectorAll(".menu__content");
-        let hasVisibleItems = false;
-  
-        items.forEach((item) => {
-          const itemName = item.getAttribute("data-name")?.toLowerCase() || "";
-          const itemType = item.getAttribute("data-type")?.toLowerCase() || "";
-          const matchesSearch = !searchQuery || itemName.includes(searchQuery);
-          const matchesVegNonVeg = !vegNonVegValue || itemType === vegNonVegValue;
-  
-          if (matchesSearch && matchesVegNonVeg && matchesSubCategory) {
-            item.style.display = "flex";
-            hasVisibleItems = true;
-            hasResults = true;
-          } else {
-            item.style.display = "none";
-          }
-        });
+        const hasVisibleItems = category.querySelectorAll(".menu__content").length > 0;
+        if (hasVisibleItems) hasResults = true;
   
         category.style.display = matchesSubCategory ? "block" : "none";
         const categoryTitle = category.querySelector(".category-title");
@@ -492,9 +527,16 @@ document.addEventListener("DOMContentLoaded",async function () {
         menuHeading.classList.remove("no-results");
       }
     }
+
+    // Wait for a pause in typing before asking the server
+    let searchTimer = null;
+    function applyFiltersSoon() {
+      clearTimeout(searchTimer);
+      searchTimer = setTimeout(applyFilters, 250);
+    }
   
     // Event listeners for filters
-    searchInput?.addEventListener("input", applyFilters);
+    searchInput?.addEventListener("input", applyFiltersSoon);
     vegNonVegFilter?.addEventListener("change", applyFilters);
     subCategoryFilter?.addEventListener("change", applyFilters);
 
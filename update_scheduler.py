@@ -0,0 +1,111 @@
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+RETRY_DELAY = timedelta(seconds=5)
+
+
+class DueTimeScheduler:
+    """
+    Applies scheduled menu changes when they fall due instead of polling.
+
+    Due times are kept in a min-heap and the worker thread sleeps until the
+    earliest one. schedule() pushes a new time and wakes the thread, so a
+    change scheduled for a few seconds from now is applied on time. Every
+    resync_seconds the heap is reloaded from the database, which picks up
+    changes scheduled through another process.
+
+    Times are naive UTC, the way ScheduledChange.due_at is stored.
+    """
+
+    def __init__(self, load_due_times, apply_due, resync_seconds=300):
+        self._load_due_times = load_due_times
+        self._apply_due = apply_due
+        self.resync_seconds = resync_seconds
+        self._heap = []
+        self._condition = threading.Condition()
+        self._next_resync = 0
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="menu-update-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def schedule(self, due_at):
+        """Adds a due time and wakes the worker if it is earlier than what it sleeps towards."""
+        if due_at is None:
+            return
+        with self._condition:
+            heapq.heappush(self._heap, due_at.replace(tzinfo=None))
+            self._condition.notify()
+
+    def resync_now(self):
+        """Reloads the due times from the database on the worker thread right away."""
+        with self._condition:
+            self._next_resync = 0
+            self._condition.notify()
+
+    def next_due(self):
+        with self._condition:
+            return self._heap[0] if self._heap else None
+
+    def _resync(self):
+        self._next_resync = time.monotonic() + self.resync_seconds
+        due_times = sorted(set(self._load_due_times()))  # a sorted list is a valid heap
+        with self._condition:
+            self._heap = due_times
+
+    def _wait_until_due(self):
+        """Sleeps until a due time passes, a resync is due or stop() is called."""
+        with self._condition:
+            while not self._stopped:
+                now = datetime.utcnow()
+                if self._heap and self._heap[0] <= now:
+                    # everything due by now is handled by the same apply run
+                    while self._heap and self._heap[0] <= now:
+                        heapq.heappop(self._heap)
+                    return now
+                timeout = self._next_resync - time.monotonic()
+                if timeout <= 0:
+                    return None
+                if self._heap:
+                    timeout = min(timeout, (self._heap[0] - now).total_seconds())
+                self._condition.wait(timeout)
+            return None
+
+    def _run(self):
+        while not self._stopped:
+            try:
+                if time.monotonic() >= self._next_resync:
+                    self._resync()
+                now = self._wait_until_due()
+                if now is not None:
+                    self._apply_due(now)
+            except Exception as e:
+                print(f"Error in menu update scheduler: {e}")
+                self.schedule(datetime.utcnow() + RETRY_DELAY)
+
+
+def notify_scheduled(due_at):
+    """
+    Tells the scheduler about a newly scheduled change. Call after commit.
+    Only the elected process applies updates, so when this process is not
+    it the due time is passed on through the job lease as well.
+    """
+    if due_at is None:
+        return
+    scheduler = current_app.extensions.get("menu_update_scheduler")
+    if scheduler is not None:
+        scheduler.schedule(due_at)
+    leader = current_app.extensions.get("job_leader")
+    if leader is not None and not leader.is_leader:
+        leader.request_wake(due_at)